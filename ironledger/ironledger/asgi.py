@@ -2,6 +2,9 @@
 ASGI config for ironledger project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Workout event streams (tracker/live.py) are served ahead of Django so they
+stay on the event loop, and exports stream without a thread per chunk;
+everything else goes through Django's sync views as usual.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +15,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ironledger.settings')
+# Live event streams and async exports (see ASYNC_VIEWS in settings.py)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from tracker.live import EventsRouter  # noqa: E402  (needs the app registry loaded)
+
+application = EventsRouter(django_application)
@@ -0,0 +1,35 @@
+"""
+Non-blocking log handler for settings.LOGGING.
+
+Request threads only put records on an in-memory queue; a background
+QueueListener thread does the actual (possibly slow) stream or file I/O.
+"""
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler that owns a QueueListener feeding `handlers`.
+    Used from dictConfig as a '()' factory with
+    handlers=['cfg://handlers.<name>', ...]; the target handlers must sort
+    before this one's name so dictConfig has already built them.
+    """
+
+    def __init__(self, handlers, respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        # Index rather than iterate: dictConfig's ConvertingList only
+        # resolves 'cfg://' references in __getitem__
+        targets = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(
+            self.queue, *targets, respect_handler_level=respect_handler_level
+        )
+        self.listener.start()
+        self._listening = True
+
+    def close(self):
+        # logging.shutdown() closes every handler at exit, which drains the queue
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+        super().close()
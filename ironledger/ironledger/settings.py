@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,25 +28,51 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-t%^*pu_72hr4tq=h63qit
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 
-# For better error visibility
+# Logging
+# Everything goes through a QueueHandler so request threads never block on
+# stdout; a listener thread writes to the console. Tracker code logs under
+# 'ironledger.tracker.<module>' with lazy %-style arguments, so lines below
+# the configured level cost nothing. Levels are set per module from the
+# environment, e.g. TRACKER_VIEWS_LOG_LEVEL=DEBUG.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
+            'formatter': 'standard',
+        },
+        'queue': {
+            '()': 'ironledger.log.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console'],
         },
     },
     'root': {
-        'handlers': ['console'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
     'loggers': {
         'django': {
-            'handlers': ['console'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
+        'ironledger.tracker': {
+            'handlers': ['queue'],
+            'level': os.environ.get('TRACKER_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'ironledger.tracker.views': {
+            'level': os.environ.get('TRACKER_VIEWS_LOG_LEVEL', 'INFO'),
+        },
+        'ironledger.tracker.middleware': {
+            'level': os.environ.get('TRACKER_MIDDLEWARE_LOG_LEVEL', 'INFO'),
+        },
     },
 }
 
@@ -70,8 +97,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.middleware.QueryInstrumentationMiddleware',  # Opt-in, see QUERY_INSTRUMENTATION
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise
+    'tracker.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +110,63 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'ironledger.urls'
 
+# Served over ASGI (asgi.py turns this on): the active workout page opens the
+# live event stream and exports stream as an async iterator. Every other view,
+# the set endpoints included, stays sync; they are short transactions that
+# would only gain thread hops as coroutines.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Query instrumentation: Server-Timing headers and per-request SQL log lines
+QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION', 'False') == 'True'
+
+# Raise instead of logging a warning when a view exceeds its budget (enabled in tests)
+QUERY_BUDGETS_STRICT = False
+
+# Maximum queries per request, keyed by URL name (includes session and auth lookups)
+QUERY_BUDGETS = {
+    'home': 2,
+    'signup': 2,
+    'login': 2,
+    'logout': 4,
+    'dashboard': 6,
+    'workout_plans_list': 4,
+    'start_workout': 3,
+    'start_workout_from_plan': 5,
+    # Session, user, exercises with set counts, current sets; +1 on an exercise's first view
+    'active_workout': 5,
+    'api_workout_state': 5,
+    # Only reached under WSGI; ASGI serves the stream in tracker.live without Django
+    'workout_events': 3,
+    'workout_detail': 5,
+    'end_workout': 3,
+    'workout_history': 5,
+    'api_workouts': 3,
+    'exercise_progress': 3,
+    'export_training_log': 2,
+    # Budget is for the upload form; an import runs ~6 queries per chunk of sets
+    'import_training_log': 2,
+    # Set writes run in one atomic block, which tests see as SAVEPOINT/RELEASE (2).
+    # Session, user, exercise with workout, counter UPDATE + SELECT, set INSERT,
+    # summary UPDATE, locked record read; the first set at a rep count also
+    # inserts its records and re-reads them
+    'add_set': 12,
+    # Session, user, exercises, per exercise counter UPDATE + SELECT, set INSERT,
+    # per workout summary UPDATE, one locked record read for the whole batch
+    # (+ key lookup with idempotency keys, + INSERT and re-read for new records)
+    'add_sets_bulk': 10,
+    # Session, user, set with exercise and workout, set UPDATE, summary UPDATE,
+    # one locked read of the set's own and competing records
+    'update_set': 8,
+    # Session, user, set with exercise and workout, record SET_NULL UPDATE,
+    # DELETE, counter UPDATE, summary UPDATE, orphaned record check
+    'delete_set': 10,
+    'complete_exercise': 5,
+    # Session, user, both exercises, completion UPDATE, reorder SELECT + UPDATE
+    'select_next_exercise': 8,
+    'reorder_exercises': 6,
+    'calculate_plates': 3,
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -111,9 +196,54 @@ DATABASES = {
         ssl_require=False,
     )
 }
+if os.environ.get('TEST_DATABASE_NAME'):
+    # Tests use in-memory SQLite by default. Live server threads share that
+    # one connection, so SetNumberConcurrencyTests needs a file database:
+    # TEST_DATABASE_NAME=test_db.sqlite3 python manage.py test --tag concurrency
+    DATABASES['default']['TEST'] = {'NAME': os.environ['TEST_DATABASE_NAME']}
+
+# Cache (used for the exercise catalog). Local memory by default; set
+# CACHE_LOCATION to a directory to share it between processes on one host.
+# Without it, exercise and plan edits reach other worker processes only
+# when their cached versions expire (catalog/plans VERSION_TIMEOUT).
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION,
+    } if CACHE_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Read cache for sessions, kept apart so session churn can't evict the catalog
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_LOCATION, 'sessions'),
+    } if CACHE_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
 
 # Session configuration
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Sessions are read from the database on every request by default. Set
+# SESSION_ENGINE=tracker.sessions to serve reads from the sessions cache
+# instead: cached_db with cache entries capped at SESSION_CACHE_TIMEOUT
+# seconds. The cache must be shared by every worker, or a session deleted
+# on logout stays valid on the others, so cached engines need
+# CACHE_LOCATION. Expired rows are removed by Django's `manage.py clearsessions`
+# (cache entries expire on their own).
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHE_TIMEOUT = int(os.environ.get('SESSION_CACHE_TIMEOUT', 300))
+CACHED_SESSION_ENGINES = (
+    'tracker.sessions',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+)
+if SESSION_ENGINE in CACHED_SESSION_ENGINES and not CACHE_LOCATION:
+    raise ImproperlyConfigured(
+        f'SESSION_ENGINE={SESSION_ENGINE} needs a cache shared between workers; set CACHE_LOCATION'
+    )
 SESSION_COOKIE_SECURE = False if DEBUG else True
 SESSION_COOKIE_HTTPONLY = True
 
@@ -0,0 +1,160 @@
+"""
+Per-exercise progression time series.
+
+Sets are bucketed by day, week or month in SQL (Trunc* on the workout's
+start time) with top set, best Epley 1RM, tonnage and hard-set count per
+bucket. Long histories are downsampled with Largest-Triangle-Three-Buckets
+so the payload never exceeds a fixed point budget.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import LoggedSet
+from .records import epley_1rm_expression
+
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+DEFAULT_MAX_POINTS = 200
+MAX_POINTS = 1000
+
+
+class InvalidAnalyticsQuery(ValueError):
+    """Raised for malformed progression parameters"""
+
+
+def _parse_int(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidAnalyticsQuery(f'{name} must be an integer')
+
+
+def _parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise InvalidAnalyticsQuery(f'{name} must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_params(params):
+    """Read progression parameters from a QueryDict, raising InvalidAnalyticsQuery on bad input"""
+    global_exercise_id = _parse_int(params, 'exercise')
+    custom_exercise_id = _parse_int(params, 'custom_exercise')
+    if bool(global_exercise_id) == bool(custom_exercise_id):
+        raise InvalidAnalyticsQuery('Provide exactly one of exercise or custom_exercise')
+    bucket = params.get('bucket') or 'week'
+    if bucket not in BUCKETS:
+        raise InvalidAnalyticsQuery(f'bucket must be one of {", ".join(BUCKETS)}')
+    date_to = _parse_day(params, 'to')
+    points = _parse_int(params, 'points') or DEFAULT_MAX_POINTS
+    return {
+        'global_exercise_id': global_exercise_id,
+        'custom_exercise_id': custom_exercise_id,
+        'bucket': bucket,
+        'date_from': _parse_day(params, 'from'),
+        'date_to': date_to + timedelta(days=1) if date_to else None,
+        'points': max(3, min(points, MAX_POINTS)),
+    }
+
+
+def progression(user, global_exercise_id=None, custom_exercise_id=None, bucket='week',
+                date_from=None, date_to=None):
+    """
+    One row per bucket for a user's working sets of one exercise, oldest first.
+    Warmups and zero-rep sets are excluded; every remaining set counts as hard.
+    """
+    started_at = 'session_exercise__logged_workout__started_at'
+    sets = LoggedSet.objects.filter(
+        session_exercise__logged_workout__user=user,
+        session_exercise__logged_workout__is_active=True,
+        is_warmup=False,
+        reps__gt=0,
+    )
+    if global_exercise_id:
+        sets = sets.filter(session_exercise__global_exercise_id=global_exercise_id)
+    else:
+        sets = sets.filter(session_exercise__custom_exercise_id=custom_exercise_id)
+    if date_from:
+        sets = sets.filter(**{f'{started_at}__gte': date_from})
+    if date_to:
+        sets = sets.filter(**{f'{started_at}__lt': date_to})
+
+    rows = sets.annotate(
+        bucket=BUCKETS[bucket](started_at)
+    ).values('bucket').annotate(
+        top_weight=Max('weight'),
+        best_1rm=Max(epley_1rm_expression()),
+        tonnage=Sum(F('weight') * F('reps'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        hard_sets=Count('id'),
+    ).order_by('bucket')
+
+    return [
+        {
+            'date': row['bucket'].date().isoformat(),
+            'top_weight': float(row['top_weight']),
+            'estimated_1rm': round(row['best_1rm'], 2),
+            'tonnage': float(row['tonnage']),
+            'hard_sets': row['hard_sets'],
+        }
+        for row in rows
+    ]
+
+
+def lttb(points, threshold, key):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Keeps the first and last points and, for each bucket in between, the
+    point forming the largest triangle with its neighbours. Points are
+    evenly weighted along the x axis (their index), `key` gives the y value.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = (next_start + next_end - 1) / 2 if next_end > next_start else len(points) - 1
+        avg_y = sum(key(p) for p in next_bucket) / len(next_bucket)
+
+        anchor_x, anchor_y = selected, key(points[selected])
+        best_area = -1
+        best_index = start
+        for index in range(start, end):
+            area = abs(
+                (anchor_x - avg_x) * (key(points[index]) - anchor_y)
+                - (anchor_x - index) * (avg_y - anchor_y)
+            )
+            if area > best_area:
+                best_area = area
+                best_index = index
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
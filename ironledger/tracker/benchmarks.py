@@ -0,0 +1,225 @@
+"""
+Benchmark suite for the tracker's hot views.
+
+Each scenario issues one request through the test Client, logged in as a
+user with a synthetic multi-year history (see synthetic.py). Per scenario
+the suite records p50/p95/mean latency over the timed iterations, the
+largest query count seen, and the peak Python memory of a request under
+tracemalloc (measured in separate iterations, since tracing slows every
+allocation down). The report is plain JSON with sorted keys so two runs
+can be diffed, or checked against a baseline with compare().
+"""
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import LoggedWorkout, SessionExercise
+
+
+class Scenario:
+    """
+    One benchmarked request. `build(fixture)` runs before every iteration,
+    outside the timer, and returns (url, data); it may reset state so each
+    iteration does the same work.
+    """
+
+    def __init__(self, name, url_name, build, method='get', expected=200, json_body=False):
+        self.name = name
+        self.url_name = url_name
+        self.build = build
+        self.method = method
+        self.expected = expected
+        self.json_body = json_body
+
+    def send(self, client, url, data):
+        if self.method == 'get':
+            return client.get(url, data)
+        if self.json_body:
+            return client.post(url, data, content_type='application/json')
+        return client.post(url, data)
+
+
+def _reset_and_select(fixture):
+    # select_next_exercise completes the current exercise; undo that so every iteration moves the same pair
+    SessionExercise.objects.filter(logged_workout=fixture['active']).update(completed_at=None)
+    first, last = fixture['active_exercises'][0], fixture['active_exercises'][-1]
+    return reverse('select_next_exercise', args=[first.id, last.id]), {}
+
+
+# Reads first: the write scenarios add sets and workouts to the benchmark user
+SCENARIOS = [
+    Scenario('dashboard', 'dashboard', lambda f: (reverse('dashboard'), {})),
+    Scenario('workout_history', 'workout_history', lambda f: (reverse('workout_history'), {})),
+    Scenario('workout_plans_list', 'workout_plans_list', lambda f: (reverse('workout_plans_list'), {})),
+    Scenario('api_workouts', 'api_workouts', lambda f: (reverse('api_workouts'), {})),
+    Scenario('exercise_progress', 'exercise_progress',
+             lambda f: (reverse('exercise_progress'), {'exercise': f['exercise_id'], 'bucket': 'week'})),
+    Scenario('workout_detail', 'workout_detail',
+             lambda f: (reverse('workout_detail', args=[f['finished'].id]), {})),
+    Scenario('active_workout', 'active_workout',
+             lambda f: (reverse('active_workout', args=[f['active'].id]), {})),
+    Scenario('workout_state', 'api_workout_state',
+             lambda f: (reverse('api_workout_state', args=[f['active'].id]), {})),
+    Scenario('calculate_plates', 'calculate_plates',
+             lambda f: (reverse('calculate_plates'), {'weight': '227.5'})),
+    Scenario('add_set', 'add_set',
+             lambda f: (reverse('add_set', args=[f['active_exercises'][0].id]), {'weight': 135, 'reps': 5}),
+             method='post', json_body=True),
+    Scenario('select_next_exercise', 'select_next_exercise', _reset_and_select, method='post'),
+    Scenario('start_workout', 'start_workout_from_plan',
+             lambda f: (reverse('start_workout_from_plan', args=[f['plan'].id]), {}),
+             method='post', expected=302),
+]
+SCENARIO_NAMES = [scenario.name for scenario in SCENARIOS]
+
+
+def build_fixture(user):
+    """Objects the scenarios need, including a fresh active workout from the user's first plan"""
+    plan = user.workout_plans.filter(is_active=True).order_by('id').first()
+    finished = LoggedWorkout.objects.filter(
+        user=user, is_active=True, ended_at__isnull=False
+    ).order_by('-started_at').first()
+    if plan is None or finished is None:
+        raise ValueError(f'{user.username} has no workout plan or finished workout to benchmark')
+
+    client = Client()
+    client.force_login(user)
+    client.post(reverse('start_workout_from_plan', args=[plan.id]))
+    active = LoggedWorkout.objects.filter(user=user, ended_at__isnull=True).latest('started_at')
+    active_exercises = list(active.session_exercises.order_by('order'))
+    if len(active_exercises) < 2:
+        raise ValueError(f'Plan "{plan.name}" needs at least two exercises to benchmark')
+
+    exercise_id = (
+        SessionExercise.objects.filter(logged_workout__user=user, global_exercise__isnull=False)
+        .values_list('global_exercise_id', flat=True).first()
+    )
+    return {
+        'user': user,
+        'plan': plan,
+        'finished': finished,
+        'active': active,
+        'active_exercises': active_exercises,
+        'exercise_id': exercise_id,
+    }
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_scenario(scenario, fixture, iterations=30, warmup=3, memory_iterations=3):
+    """Latency, query and memory figures for one scenario"""
+    client = Client()
+    client.force_login(fixture['user'])
+
+    def check(response):
+        if response.status_code != scenario.expected:
+            raise RuntimeError(f'{scenario.name} returned {response.status_code}')
+
+    def call():
+        check(scenario.send(client, *scenario.build(fixture)))
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        url, data = scenario.build(fixture)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario.send(client, url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        check(response)
+        queries = max(queries, len(captured))
+
+    peak = 0
+    if memory_iterations:
+        tracemalloc.start()
+        try:
+            for _ in range(memory_iterations):
+                tracemalloc.reset_peak()
+                call()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': queries,
+        'query_budget': settings.QUERY_BUDGETS.get(scenario.url_name),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_suite(user, names=None, iterations=30, warmup=3, memory_iterations=3, dataset=None, progress=None):
+    """Run the selected scenarios (all by default) as `user`; returns the report dict"""
+    fixture = build_fixture(user)
+    results = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        results[scenario.name] = run_scenario(scenario, fixture, iterations, warmup, memory_iterations)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+    return {
+        'meta': {
+            'generated_at': timezone.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset or {},
+            'iterations': iterations,
+            'memory_iterations': memory_iterations,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, report, max_regression=25.0):
+    """
+    Regressions of `report` against `baseline`: any increase in query count,
+    and p50 latency more than `max_regression` percent slower (p95 over a
+    few dozen requests is too noisy to gate on). Returns a list of
+    human-readable lines, empty when nothing regressed.
+    """
+    regressions = []
+    for name, result in sorted(report['results'].items()):
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f'{name}: queries {before["queries"]} -> {result["queries"]}')
+        if before['p50_ms'] and result['p50_ms'] > before['p50_ms'] * (1 + max_regression / 100):
+            change = (result['p50_ms'] / before['p50_ms'] - 1) * 100
+            regressions.append(
+                f'{name}: p50_ms {before["p50_ms"]:.2f} -> {result["p50_ms"]:.2f} (+{change:.0f}%)'
+            )
+    return regressions
@@ -0,0 +1,108 @@
+"""
+Cached global exercise catalog.
+
+The catalog is loaded with one query and stored in the configured cache
+under a key that includes a version number. Saving or deleting a
+GlobalExercise bumps the version (see signals.py), so stale entries are
+simply never read again and expire on their own. Each process also keeps
+the last catalog it loaded, so a warm read costs one cache lookup for the
+version and no database queries.
+
+The version itself expires after VERSION_TIMEOUT seconds. With the
+default per-process locmem cache a bump only reaches the process that
+saved the exercise; the others keep their version, and with it their
+local catalog, until it expires and they load a fresh one. A shared
+cache (CACHE_LOCATION) reaches every process at once.
+
+Queryset.update()/bulk_create() bypass signals; call invalidate() after
+changing exercises that way.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import GlobalExercise
+
+
+VERSION_KEY = 'tracker:catalog:version'
+CATALOG_TIMEOUT = 60 * 60 * 24
+# Longest a process serves a catalog that another process has invalidated
+VERSION_TIMEOUT = 60
+
+# (version, catalog) last loaded by this process
+_local = (None, None)
+
+
+def _new_version():
+    # Time-based so a version lost to eviction is never reissued to a
+    # process still holding its old catalog
+    return time.time_ns()
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() so concurrent first readers agree on the starting version
+        cache.add(VERSION_KEY, _new_version(), timeout=VERSION_TIMEOUT)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Move every process on to a new catalog version"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key expired or was evicted; start over from a version nobody has seen
+        cache.add(VERSION_KEY, _new_version(), timeout=VERSION_TIMEOUT)
+
+
+def _build():
+    exercises = list(GlobalExercise.objects.order_by('primary_muscle_group', 'name'))
+    by_muscle = {}
+    for exercise in exercises:
+        if exercise.is_active:
+            by_muscle.setdefault(exercise.primary_muscle_group, []).append(exercise)
+    return {
+        'by_id': {exercise.id: exercise for exercise in exercises},
+        'by_muscle': list(by_muscle.items()),
+    }
+
+
+def _catalog():
+    global _local
+    version = _version()
+    local_version, catalog = _local
+    if local_version == version:
+        return catalog
+
+    key = f'tracker:catalog:{version}'
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = _build()
+        cache.set(key, catalog, timeout=CATALOG_TIMEOUT)
+    _local = (version, catalog)
+    return catalog
+
+
+def exercises_by_id():
+    """Map of id -> GlobalExercise, including inactive exercises"""
+    return _catalog()['by_id']
+
+
+def get_exercise(exercise_id):
+    """Look up one exercise by id, or None if it doesn't exist"""
+    try:
+        return exercises_by_id().get(int(exercise_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def grouped_by_muscle():
+    """Active exercises as [(muscle_group, [exercises sorted by name])]"""
+    return _catalog()['by_muscle']
+
+
+def active_exercises():
+    """Active exercises ordered by muscle group then name"""
+    return [exercise for _, exercises in grouped_by_muscle() for exercise in exercises]
@@ -0,0 +1,173 @@
+"""
+Streaming export of a user's training log.
+
+One row per LoggedSet, flattened with its SessionExercise and
+LoggedWorkout, in workout/exercise/set order. Rows are read with
+.iterator(chunk_size) and encoded into ~64KB chunks as they go, so memory
+use stays flat however long the history is. Workouts without any sets
+have no rows.
+
+Under ASGI, Django reads a sync iterator given to StreamingHttpResponse
+into a list before sending any of it; aiter_chunks() wraps the stream so
+each chunk is produced in a thread and sent as it comes.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import LoggedSet
+
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+COLUMNS = [
+    'workout_id', 'workout_name', 'workout_started_at', 'workout_ended_at',
+    'exercise', 'exercise_type', 'exercise_order',
+    'set_number', 'weight', 'reps', 'is_warmup', 'is_dropset',
+    'rest_duration', 'set_started_at', 'set_completed_at', 'notes',
+]
+
+DEFAULT_CHUNK_SIZE = 2000
+_FLUSH_BYTES = 64 * 1024
+
+
+def parse_since(value):
+    """Start of the given YYYY-MM-DD day as an aware datetime, or None if empty"""
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError('since must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def set_rows(user, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one dict per logged set for `user`, oldest workout first.
+    `since` limits the export to sets started at or after that datetime.
+    """
+    sets = LoggedSet.objects.filter(
+        session_exercise__logged_workout__user=user,
+    ).select_related(
+        'session_exercise__logged_workout',
+        'session_exercise__global_exercise',
+        'session_exercise__custom_exercise',
+    ).order_by(
+        'session_exercise__logged_workout__started_at',
+        'session_exercise__logged_workout_id',
+        'session_exercise__order',
+        'session_exercise_id',
+        'set_number',
+    )
+    if since:
+        sets = sets.filter(started_at__gte=since)
+
+    for logged_set in sets.iterator(chunk_size=chunk_size):
+        session_ex = logged_set.session_exercise
+        workout = session_ex.logged_workout
+        exercise = session_ex.global_exercise or session_ex.custom_exercise
+        yield {
+            'workout_id': workout.id,
+            'workout_name': workout.name,
+            'workout_started_at': workout.started_at.isoformat(),
+            'workout_ended_at': workout.ended_at.isoformat() if workout.ended_at else None,
+            'exercise': exercise.name if exercise else None,
+            'exercise_type': 'global' if session_ex.global_exercise_id else 'custom',
+            'exercise_order': session_ex.order,
+            'set_number': logged_set.set_number,
+            'weight': str(logged_set.weight),
+            'reps': logged_set.reps,
+            'is_warmup': logged_set.is_warmup,
+            'is_dropset': logged_set.is_dropset,
+            'rest_duration': logged_set.rest_duration,
+            'set_started_at': logged_set.started_at.isoformat(),
+            'set_completed_at': logged_set.completed_at.isoformat() if logged_set.completed_at else None,
+            'notes': logged_set.notes,
+        }
+
+
+def _chunked(pieces):
+    """Join small string pieces into ~_FLUSH_BYTES encoded chunks"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= _FLUSH_BYTES:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _csv_lines(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    # Header only, for an empty export
+    if out.tell():
+        yield out.getvalue()
+
+
+def _jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def encode(rows, fmt):
+    """Stream rows as CSV or JSON Lines bytes"""
+    lines = _csv_lines(rows) if fmt == 'csv' else _jsonl_lines(rows)
+    return _chunked(lines)
+
+
+def gzip_stream(chunks):
+    """Compress a byte stream on the fly into a gzip file"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+_DONE = object()
+
+
+async def aiter_chunks(chunks):
+    """
+    Async iterator over a sync chunk stream, producing one chunk per
+    sync_to_async call. Thread-sensitive, so the ORM iterator keeps the
+    request's connection and cursor.
+    """
+    chunks = iter(chunks)
+    produce = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await produce(chunks, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        # Close the generators (and their cursor) on that thread too if the client went away
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
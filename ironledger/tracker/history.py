@@ -0,0 +1,126 @@
+"""
+Workout history listing with keyset (seek) pagination.
+
+Pages are ordered by (started_at, id) descending and continue from an
+opaque cursor holding the last row's sort key, so a deep page costs the
+same single indexed query as the first one. Rows come with the
+denormalized summary columns, so nothing is aggregated per page.
+"""
+import base64
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import LoggedWorkout, SessionExercise
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidHistoryQuery(ValueError):
+    """Raised for malformed filters or cursors"""
+
+
+def encode_cursor(workout):
+    raw = f'{workout.started_at.isoformat()}|{workout.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        started_at, workout_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        started_at = parse_datetime(started_at)
+        if started_at is None:
+            raise ValueError
+        return started_at, int(workout_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidHistoryQuery('Invalid cursor')
+
+
+def _parse_int(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidHistoryQuery(f'{name} must be an integer')
+
+
+def _parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise InvalidHistoryQuery(f'{name} must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_filters(params):
+    """Read history filters from a QueryDict, raising InvalidHistoryQuery on bad input"""
+    limit = _parse_int(params, 'limit') or DEFAULT_PAGE_SIZE
+    return {
+        'date_from': _parse_day(params, 'from'),
+        'date_to': _parse_day(params, 'to'),
+        'plan': _parse_int(params, 'plan'),
+        'exercise': _parse_int(params, 'exercise'),
+        'custom_exercise': _parse_int(params, 'custom_exercise'),
+        'cursor': decode_cursor(params['cursor']) if params.get('cursor') else None,
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+
+
+def workout_page(user, filters):
+    """
+    Return (workouts, next_cursor) for one page of a user's history.
+    Fetches limit + 1 rows to know whether another page exists.
+    """
+    workouts = LoggedWorkout.objects.filter(user=user, is_active=True)
+
+    # Range bounds on the raw column (not __date) so the index can be used
+    if filters['date_from']:
+        workouts = workouts.filter(started_at__gte=filters['date_from'])
+    if filters['date_to']:
+        workouts = workouts.filter(started_at__lt=filters['date_to'] + timedelta(days=1))
+    if filters['plan']:
+        workouts = workouts.filter(workout_plan_id=filters['plan'])
+    if filters['exercise'] or filters['custom_exercise']:
+        exercises = SessionExercise.objects.filter(logged_workout=OuterRef('pk'))
+        if filters['exercise']:
+            exercises = exercises.filter(global_exercise_id=filters['exercise'])
+        if filters['custom_exercise']:
+            exercises = exercises.filter(custom_exercise_id=filters['custom_exercise'])
+        workouts = workouts.filter(Exists(exercises))
+
+    if filters['cursor']:
+        started_at, workout_id = filters['cursor']
+        workouts = workouts.filter(
+            Q(started_at__lt=started_at) | Q(started_at=started_at, id__lt=workout_id)
+        )
+
+    limit = filters['limit']
+    page = list(workouts.order_by('-started_at', '-id')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def serialize(workout):
+    return {
+        'id': workout.id,
+        'name': workout.name,
+        'workout_plan_id': workout.workout_plan_id,
+        'started_at': workout.started_at.isoformat(),
+        'ended_at': workout.ended_at.isoformat() if workout.ended_at else None,
+        'duration_seconds': workout.duration_seconds,
+        'exercise_count': workout.exercise_count,
+        'set_count': workout.set_count,
+        'total_volume': float(workout.total_volume),
+    }
@@ -0,0 +1,366 @@
+"""
+Bulk import of training logs from CSV or JSON Lines.
+
+The input uses the export format (exports.COLUMNS); only
+workout_started_at, exercise, weight and reps are required. Rows are read
+as a stream and grouped into workouts by consecutive rows sharing a
+workout (workout_id, or start time and name); rows of one workout must be
+adjacent, as exports write them. Workouts are written in
+chunks of about `batch_size` sets, each chunk in one transaction with one
+bulk_create per table, so memory is bounded by the chunk, not the file.
+
+Imports are resumable: a workout whose (started_at, name) already exists
+for the user is skipped, so re-running a file after a failure picks up at
+the first chunk that didn't commit. Exercise names are matched
+case-insensitively against the global catalog, then the user's custom
+exercises; unknown names become new custom exercises.
+
+Throughput target: THROUGHPUT_TARGET rows/s on SQLite for plain CSV.
+"""
+import csv
+import json
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import catalog, records, summaries
+from .models import CustomExercise, LoggedSet, LoggedWorkout, SessionExercise
+
+
+FORMATS = ('csv', 'jsonl')
+REQUIRED_FIELDS = ('workout_started_at', 'exercise', 'weight', 'reps')
+DEFAULT_BATCH_SIZE = 5000
+THROUGHPUT_TARGET = 5000
+
+_TRUE = {'1', 'true', 'yes', 'y', 't'}
+
+
+class ImportFailed(ValueError):
+    """Raised for rows that can't be imported; `line` is the 1-based input line"""
+
+    def __init__(self, message, line=None):
+        self.line = line
+        super().__init__(f'Row {line}: {message}' if line else message)
+
+
+class ScatteredWorkout(ImportFailed):
+    """Raised when a workout's rows aren't adjacent; `workout` is its (started_at, name)"""
+
+    def __init__(self, message, line, workout):
+        self.workout = workout
+        super().__init__(message, line)
+
+
+def read_rows(lines, fmt):
+    """Yield (line_number, dict) from an iterable of text lines"""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        # line_num counts physical lines; the header is line 1, the first row line 2
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ImportFailed(f'invalid JSON ({e.msg})', number)
+        if not isinstance(row, dict):
+            raise ImportFailed('expected a JSON object', number)
+        yield number, row
+
+
+def _datetime(value, field, line, required=False):
+    if value in (None, ''):
+        if required:
+            raise ImportFailed(f'{field} is required', line)
+        return None
+    try:
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            day = parse_date(str(value))
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ImportFailed(f'{field} is not a date/time: {value!r}', line)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _int(value, field, line, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ImportFailed(f'{field} must be an integer: {value!r}', line)
+    if number < 0:
+        raise ImportFailed(f'{field} must not be negative', line)
+    return number
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in _TRUE
+
+
+def parse_row(line, row):
+    """Validate one input row into the values the importer needs"""
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ImportFailed(f'missing {", ".join(missing)}', line)
+    try:
+        weight = Decimal(str(row['weight']))
+    except InvalidOperation:
+        raise ImportFailed(f'weight must be a number: {row["weight"]!r}', line)
+    if weight < 0 or weight >= 10000:
+        raise ImportFailed('weight out of range', line)
+
+    started_at = _datetime(row['workout_started_at'], 'workout_started_at', line, required=True)
+    name = (row.get('workout_name') or '').strip()[:200] or 'Imported Workout'
+    return {
+        'line': line,
+        'workout_key': row.get('workout_id') or (started_at, name),
+        'workout_name': name,
+        'workout_started_at': started_at,
+        'workout_ended_at': _datetime(row.get('workout_ended_at'), 'workout_ended_at', line),
+        'exercise': str(row['exercise']).strip()[:200],
+        'exercise_type': row.get('exercise_type') or '',
+        'exercise_order': _int(row.get('exercise_order'), 'exercise_order', line),
+        'set_number': _int(row.get('set_number'), 'set_number', line),
+        'weight': weight,
+        'reps': _int(row['reps'], 'reps', line),
+        'is_warmup': _bool(row.get('is_warmup')),
+        'is_dropset': _bool(row.get('is_dropset')),
+        'rest_duration': _int(row.get('rest_duration'), 'rest_duration', line),
+        'set_started_at': _datetime(row.get('set_started_at'), 'set_started_at', line),
+        'set_completed_at': _datetime(row.get('set_completed_at'), 'set_completed_at', line),
+        'notes': row.get('notes') or '',
+    }
+
+
+def _identity(row):
+    """What makes a row's workout unique for a user, and how re-runs recognise it"""
+    return row['workout_started_at'], row['workout_name']
+
+
+def _group_workouts(parsed_rows):
+    """
+    Group consecutive rows with the same workout key. A workout whose rows
+    turn up again after its group ended raises ScatteredWorkout: a later
+    chunk would skip them as already present, the same chunk would create
+    the workout twice.
+    """
+    finished = set()
+    current_key = None
+    current = []
+    for row in parsed_rows:
+        if current and row['workout_key'] != current_key:
+            yield current
+            finished.add(_identity(current[0]))
+            current = []
+        if not current and _identity(row) in finished:
+            raise ScatteredWorkout(
+                f'workout {row["workout_name"]!r} started {row["workout_started_at"].isoformat()} '
+                f'continues after other rows; keep each workout\'s rows together',
+                row['line'],
+                _identity(row),
+            )
+        current_key = row['workout_key']
+        current.append(row)
+    if current:
+        yield current
+
+
+class Importer:
+    """
+    Imports rows for one user. `progress` is called after every committed
+    chunk with the running stats dict.
+    """
+
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = {
+            'rows': 0,
+            'workouts_created': 0,
+            'workouts_skipped': 0,
+            'sets_created': 0,
+            'exercises_created': 0,
+        }
+        # Workouts this run created, so a scattered one can be taken out again
+        self._created = set()
+        self._global = {}
+        for exercise in catalog.exercises_by_id().values():
+            self._global.setdefault(exercise.name.lower(), exercise.id)
+        self._custom = {
+            name.lower(): pk
+            for pk, name in CustomExercise.objects.filter(user=user).values_list('id', 'name')
+        }
+
+    def run(self, rows):
+        """Import (line, dict) rows; returns the stats dict"""
+        batch = []
+        batch_sets = 0
+        parsed = (parse_row(line, row) for line, row in rows)
+        try:
+            for workout_rows in _group_workouts(parsed):
+                batch.append(workout_rows)
+                batch_sets += len(workout_rows)
+                if batch_sets >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+                    batch_sets = 0
+            if batch:
+                self._flush(batch)
+        except ScatteredWorkout as e:
+            self._discard(e.workout)
+            raise
+        finally:
+            # Committed chunks stay imported on failure, so their records are rebuilt too
+            if self.stats['sets_created']:
+                records.rebuild_user(self.user.id)
+        return self.stats
+
+    def _discard(self, workout):
+        """
+        Delete a workout this run imported before finding more of its rows,
+        so re-running the fixed file imports it whole instead of skipping it
+        """
+        if workout not in self._created:
+            return
+        started_at, name = workout
+        _, deleted = LoggedWorkout.objects.filter(user=self.user, started_at=started_at, name=name).delete()
+        self.stats['workouts_created'] -= deleted.get(LoggedWorkout._meta.label, 0)
+        self.stats['sets_created'] -= deleted.get(LoggedSet._meta.label, 0)
+
+    def _exercise(self, row):
+        """(global_id, custom_id) for a row, or (None, None) if a custom exercise must be created"""
+        key = row['exercise'].lower()
+        if row['exercise_type'] != 'custom' and key in self._global:
+            return self._global[key], None
+        if key in self._custom:
+            return None, self._custom[key]
+        if key in self._global:
+            return self._global[key], None
+        return None, None
+
+    def _create_custom_exercises(self, batch):
+        names = {}
+        for workout_rows in batch:
+            for row in workout_rows:
+                if self._exercise(row) == (None, None):
+                    names.setdefault(row['exercise'].lower(), row['exercise'])
+        if not names:
+            return
+        created = CustomExercise.objects.bulk_create([
+            CustomExercise(user=self.user, name=name, equipment_type='other', primary_muscle_group='full_body')
+            for name in names.values()
+        ])
+        for exercise in created:
+            self._custom[exercise.name.lower()] = exercise.id
+        self.stats['exercises_created'] += len(created)
+
+    def _flush(self, batch):
+        with transaction.atomic():
+            existing = set(LoggedWorkout.objects.filter(
+                user=self.user,
+                started_at__in={rows[0]['workout_started_at'] for rows in batch},
+            ).values_list('started_at', 'name'))
+            new = [rows for rows in batch if _identity(rows[0]) not in existing]
+            self._create_custom_exercises(new)
+
+            workouts = LoggedWorkout.objects.bulk_create([self._build_workout(rows) for rows in new])
+            session_plans = [
+                (workout, self._plan_sessions(rows)) for workout, rows in zip(workouts, new)
+            ]
+            session_exercises = []
+            for workout, sessions in session_plans:
+                for session_ex, _ in sessions:
+                    session_ex.logged_workout = workout
+                    session_exercises.append(session_ex)
+            SessionExercise.objects.bulk_create(session_exercises)
+
+            logged_sets = []
+            for _, sessions in session_plans:
+                for session_ex, sets in sessions:
+                    for logged_set in sets:
+                        logged_set.session_exercise = session_ex
+                        logged_sets.append(logged_set)
+            LoggedSet.objects.bulk_create(logged_sets, batch_size=1000)
+
+        self._created.update(_identity(rows[0]) for rows in new)
+        self.stats['rows'] += sum(len(rows) for rows in batch)
+        self.stats['workouts_created'] += len(new)
+        self.stats['workouts_skipped'] += len(batch) - len(new)
+        self.stats['sets_created'] += len(logged_sets)
+        if self.progress:
+            self.progress(self.stats)
+
+    def _build_workout(self, rows):
+        first = rows[0]
+        started_at = first['workout_started_at']
+        ended_at = first['workout_ended_at'] or max(
+            (row['set_completed_at'] or row['set_started_at'] or started_at for row in rows),
+            default=started_at,
+        )
+        return LoggedWorkout(
+            user=self.user,
+            name=first['workout_name'],
+            started_at=started_at,
+            ended_at=ended_at,
+            set_count=len(rows),
+            total_volume=sum(
+                (summaries.set_volume(row['weight'], row['reps'], row['is_warmup']) for row in rows),
+                Decimal('0'),
+            ),
+            exercise_count=len({(row['exercise_order'], row['exercise'].lower()) for row in rows}),
+            duration_seconds=max(int((ended_at - started_at).total_seconds()), 0),
+        )
+
+    def _plan_sessions(self, rows):
+        """Unsaved [(SessionExercise, [LoggedSet])] for one workout's rows"""
+        sessions = {}
+        for row in rows:
+            key = (row['exercise_order'], row['exercise'].lower())
+            if key not in sessions:
+                global_id, custom_id = self._exercise(row)
+                sessions[key] = (
+                    SessionExercise(
+                        global_exercise_id=global_id,
+                        custom_exercise_id=custom_id,
+                        order=row['exercise_order'] or len(sessions) + 1,
+                        started_at=row['set_started_at'],
+                        completed_at=row['set_completed_at'],
+                    ),
+                    [],
+                    set(),
+                )
+            session_ex, sets, numbers = sessions[key]
+            set_number = row['set_number'] or len(sets) + 1
+            if set_number in numbers:
+                raise ImportFailed(f'duplicate set_number {set_number} for {row["exercise"]}', row['line'])
+            numbers.add(set_number)
+            session_ex.last_set_number = max(session_ex.last_set_number, set_number)
+            if row['set_completed_at']:
+                session_ex.completed_at = row['set_completed_at']
+            sets.append(LoggedSet(
+                set_number=set_number,
+                weight=row['weight'],
+                reps=row['reps'],
+                is_warmup=row['is_warmup'],
+                is_dropset=row['is_dropset'],
+                rest_duration=row['rest_duration'],
+                started_at=row['set_started_at'] or row['workout_started_at'],
+                completed_at=row['set_completed_at'],
+                notes=row['notes'],
+            ))
+        return [(session_ex, sets) for session_ex, sets, _ in sessions.values()]
@@ -0,0 +1,253 @@
+"""
+Live workout events over Server-Sent Events.
+
+A phone logging sets and a tablet showing the same workout stay in sync
+through /api/workout/<id>/events/. The views that change a workout
+publish set-added, set-deleted and exercise-completed events to an
+in-process broker once their transaction commits; every open stream for
+that workout gets a copy.
+
+Streams are served by a plain ASGI app that asgi.py puts in front of
+Django, so they skip the middleware stack (WhiteNoise is sync-only and
+would push each request through a thread). Opening a stream costs the
+session lookup and an ownership check; after that an idle stream is one
+asyncio.Queue and a task, needing no thread and no queries, so one
+process holds thousands. The active workout page only opens a stream
+when ASYNC_VIEWS is on; under WSGI the URL resolves to a Django view
+answering 204, which tells EventSource to stop reconnecting.
+
+The broker lives in one process: events only reach streams opened on
+the process that handled the change, so live updates need the site to
+run as a single ASGI worker process.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from http import cookies
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+from .models import LoggedWorkout
+from .workout_state import set_data
+
+URL_NAME = 'workout_events'
+# Seconds between keepalive comments, so proxies don't close idle streams
+KEEPALIVE = 15
+# How long EventSource waits before reconnecting, in milliseconds
+RETRY_MS = 3000
+# Events a stream may fall behind by before it is closed (the client reconnects and reloads)
+QUEUE_SIZE = 100
+
+
+class Broker:
+    """
+    Fan-out of workout events to asyncio queues. publish() may be called
+    from any thread; each event is handed to the subscriber's own loop.
+    """
+
+    def __init__(self):
+        # workout id -> {queue: the loop it belongs to}
+        self._subscribers = defaultdict(dict)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, workout_id, loop=None):
+        """A queue receiving (id, event, data) tuples, or None when the stream should close"""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[workout_id][queue] = loop or asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, workout_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(workout_id)
+            if subscribers is not None:
+                subscribers.pop(queue, None)
+                if not subscribers:
+                    del self._subscribers[workout_id]
+
+    def subscriber_count(self, workout_id=None):
+        with self._lock:
+            if workout_id is not None:
+                return len(self._subscribers.get(workout_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, workout_id, event, data):
+        """Queue `event` for every stream of the workout; returns how many there are"""
+        message = (next(self._ids), event, data)
+        with self._lock:
+            subscribers = list(self._subscribers.get(workout_id, {}).items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(workout_id, queue)
+        return len(subscribers)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Too far behind to catch up event by event; end the stream instead
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+broker = Broker()
+
+
+def publish(workout_id, event, data):
+    """Send `event` to the workout's streams once the current transaction commits"""
+    transaction.on_commit(lambda: broker.publish(workout_id, event, data))
+
+
+def set_added(logged_set, workout_id):
+    publish(workout_id, 'set-added', {
+        'session_exercise_id': logged_set.session_exercise_id,
+        'set': set_data(logged_set),
+    })
+
+
+def set_deleted(workout_id, session_exercise_id, set_id, set_number):
+    publish(workout_id, 'set-deleted', {
+        'session_exercise_id': session_exercise_id,
+        'set_id': set_id,
+        'set_number': set_number,
+    })
+
+
+def exercise_completed(session_exercise, next_exercise_id=None):
+    publish(session_exercise.logged_workout_id, 'exercise-completed', {
+        'session_exercise_id': session_exercise.id,
+        'completed_at': session_exercise.completed_at.isoformat(),
+        'next_exercise_id': next_exercise_id,
+    })
+
+
+def encode(message):
+    """One SSE frame for a broker message"""
+    event_id, event, data = message
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def _authorized(scope, workout_id):
+    """Whether the session cookie in `scope` belongs to the workout's owner"""
+    jar = cookies.SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            try:
+                jar.load(value.decode('latin-1'))
+            except cookies.CookieError:
+                return False
+    morsel = jar.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return False
+    return await sync_to_async(_owns_workout)(scope, morsel.value, workout_id)
+
+
+def _owns_workout(scope, session_key, workout_id):
+    """
+    The session and ownership queries, bracketed by the request signals as
+    Django's handlers do: their close_old_connections receiver recycles
+    and health-checks the thread's connection, which nothing else would
+    do for streams served outside Django.
+    """
+    request_started.send(sender=EventsRouter, scope=scope)
+    try:
+        session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        # get_user() also checks the session's auth hash, as AuthenticationMiddleware does
+        user = get_user(SimpleNamespace(session=session))
+        return user.is_authenticated and LoggedWorkout.objects.filter(id=workout_id, user=user).exists()
+    finally:
+        request_finished.send(sender=EventsRouter)
+
+
+async def _respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def stream(scope, receive, send, workout_id):
+    """ASGI handler for one workout's event stream"""
+    if scope['method'] != 'GET':
+        return await _respond(send, 405)
+    if not await _authorized(scope, workout_id):
+        return await _respond(send, 404)
+
+    queue = broker.subscribe(workout_id)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': f'retry: {RETRY_MS}\n\n'.encode(), 'more_body': True})
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get, disconnect}, timeout=KEEPALIVE,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if get not in done:
+                get.cancel()
+            if disconnect in done:
+                return
+            if get in done:
+                message = get.result()
+                if message is None:
+                    break
+                body = encode(message)
+            else:
+                body = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # Client went away mid-send
+        return
+    finally:
+        broker.unsubscribe(workout_id, queue)
+        disconnect.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+class EventsRouter:
+    """
+    ASGI app serving workout event streams directly and everything else
+    through `app` (Django).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            # Under a mount point `path` includes root_path; URLconf patterns don't
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            try:
+                match = resolve(path)
+            except Resolver404:
+                match = None
+            if match is not None and match.url_name == URL_NAME:
+                return await stream(scope, receive, send, match.kwargs['workout_id'])
+        return await self.app(scope, receive, send)
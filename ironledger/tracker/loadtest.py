@@ -0,0 +1,263 @@
+"""
+HTTP load test that replays a gym session against a running server.
+
+Each virtual user is a small asyncio HTTP/1.1 client with its own cookie
+jar. It does what a browser on the active workout page does: log in,
+start a workout from a plan, then for each exercise log a few sets with
+rest gaps between them (each add_set reloads the page, as the page's
+script does), pick the next exercise via select_next_exercise, and end
+the workout. Rest gaps are real ones (60-180s) multiplied by
+`time_scale`, so a whole session fits in seconds.
+
+Only the standard library is used, so the generator runs anywhere the app
+does; the server (gunicorn, runserver, ...) is started separately.
+"""
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.urls import reverse
+
+
+CURRENT_EXERCISE_RE = re.compile(r'const currentExerciseId = (\d+);')
+INCOMPLETE_EXERCISE_RE = re.compile(r'^\s*id: (\d+),$', re.MULTILINE)
+
+
+class ScenarioError(Exception):
+    """A response the scenario can't continue from; ends that virtual user's session"""
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+
+async def _http(host, port, method, path, headers, body=b'', timeout=30):
+    """One request on its own connection (gunicorn's sync workers close after each response anyway)"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        head = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close',
+                f'Content-Length: {len(body)}']
+        head += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, body = raw.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        raise ScenarioError(f'Malformed response to {method} {path}')
+    response_headers = defaultdict(list)
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        response_headers[name.strip().lower()].append(value.strip())
+    if b'chunked' in b''.join(value.encode() for value in response_headers.get('transfer-encoding', [])):
+        body = _dechunk(body)
+    return Response(status, response_headers, body)
+
+
+def _dechunk(body):
+    out = []
+    while body:
+        size_line, _, rest = body.partition(b'\r\n')
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        out.append(rest[:size])
+        body = rest[size + 2:]
+    return b''.join(out)
+
+
+class Recorder:
+    """Latency per request label, plus error and session counts"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions_completed = 0
+        self.sessions_failed = 0
+
+    def summary(self, duration):
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        requests = len(all_latencies)
+        return {
+            'duration_s': round(duration, 3),
+            'requests': requests,
+            'errors': sum(self.errors.values()),
+            'throughput_rps': round(requests / duration, 2) if duration else 0,
+            'sessions_completed': self.sessions_completed,
+            'sessions_failed': self.sessions_failed,
+            'latency_ms': _percentiles(all_latencies),
+            'endpoints': {
+                label: {**_percentiles(values), 'count': len(values), 'errors': self.errors.get(label, 0)}
+                for label, values in sorted(self.latencies.items())
+            },
+        }
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    ordered = sorted(values)
+
+    def at(fraction):
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 2)
+
+    return {'p50': round(statistics.median(ordered), 2), 'p95': at(0.95), 'p99': at(0.99),
+            'max': round(ordered[-1], 2)}
+
+
+class VirtualUser:
+    """One logged-in user replaying workouts from `plan_id`"""
+
+    def __init__(self, base_url, username, password, plan_id, recorder, rng, time_scale=0.01, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.username = username
+        self.password = password
+        self.plan_id = plan_id
+        self.recorder = recorder
+        self.rng = rng
+        self.time_scale = time_scale
+        self.timeout = timeout
+        self.cookies = {}
+
+    async def call(self, label, method, path, form=None, json_body=None, expected=(200,)):
+        headers = {}
+        body = b''
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.cookies.get(settings.CSRF_COOKIE_NAME, '')
+            if json_body is not None:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(json_body).encode()
+            else:
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+                body = urlencode({'csrfmiddlewaretoken': headers['X-CSRFToken'], **(form or {})}).encode()
+
+        start = time.perf_counter()
+        try:
+            response = await _http(self.host, self.port, method, path, headers, body, self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.recorder.errors[label] += 1
+            raise ScenarioError(f'{method} {path}: {e!r}')
+        self.recorder.latencies[label].append((time.perf_counter() - start) * 1000)
+
+        for cookie in response.headers.get('set-cookie', []):
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            if value.strip('"'):
+                self.cookies[name.strip()] = value
+            else:
+                self.cookies.pop(name.strip(), None)
+        if response.status not in expected:
+            self.recorder.errors[label] += 1
+            raise ScenarioError(f'{method} {path} returned {response.status}')
+        return response
+
+    async def follow(self, label, response):
+        """GET the redirect target of a 302, like the browser would"""
+        location = response.headers.get('location', [''])[0]
+        return await self.call(label, 'GET', urlsplit(location).path or '/')
+
+    async def rest(self, low=60, high=180):
+        if self.time_scale:
+            await asyncio.sleep(self.rng.uniform(low, high) * self.time_scale)
+
+    async def login(self):
+        login = reverse('login')
+        await self.call('login_page', 'GET', login)
+        response = await self.call('login', 'POST', login, form={
+            'username': self.username, 'password': self.password,
+        }, expected=(302,))
+        await self.follow('dashboard', response)
+
+    async def workout(self):
+        response = await self.call('start_workout', 'POST', reverse('start_workout_from_plan', args=[self.plan_id]),
+                                   expected=(302,))
+        workout_path = urlsplit(response.headers['location'][0]).path
+        page = await self.follow('active_workout', response)
+
+        while True:
+            current = CURRENT_EXERCISE_RE.search(page.text)
+            if current is None:
+                break
+            current = int(current.group(1))
+            incomplete = [int(pk) for pk in INCOMPLETE_EXERCISE_RE.findall(page.text)]
+
+            weight = self.rng.randrange(40, 90) * 2.5
+            for _ in range(self.rng.randint(3, 4)):
+                await self.rest()
+                await self.call('add_set', 'POST', reverse('add_set', args=[current]), json_body={
+                    'weight': weight, 'reps': self.rng.randint(5, 12),
+                    'rest_duration': self.rng.randint(60, 180),
+                })
+                page = await self.call('active_workout', 'GET', workout_path)
+
+            others = [pk for pk in incomplete if pk != current]
+            await self.rest(30, 120)
+            if others:
+                await self.call('select_next_exercise', 'POST',
+                                reverse('select_next_exercise', args=[current, self.rng.choice(others)]))
+            else:
+                await self.call('complete_exercise', 'POST', reverse('complete_exercise', args=[current]))
+            page = await self.call('active_workout', 'GET', workout_path)
+
+        workout_id = int(workout_path.rstrip('/').rsplit('/', 1)[1])
+        end = reverse('end_workout', args=[workout_id])
+        await self.call('end_workout_page', 'GET', end)
+        response = await self.call('end_workout', 'POST', end, form={'workout_notes': ''}, expected=(302,))
+        await self.follow('workout_detail', response)
+
+    async def run(self, sessions, delay=0):
+        await asyncio.sleep(delay)
+        try:
+            await self.login()
+        except ScenarioError:
+            self.recorder.sessions_failed += sessions
+            return
+        for _ in range(sessions):
+            try:
+                await self.workout()
+                self.recorder.sessions_completed += 1
+            except ScenarioError:
+                self.recorder.sessions_failed += 1
+
+
+def run(base_url, accounts, password, sessions=1, time_scale=0.01, ramp_up=0, seed=0, timeout=30):
+    """
+    Replay `sessions` workouts for each (username, plan_id) in `accounts`
+    concurrently, starting users evenly over `ramp_up` seconds. Returns the
+    Recorder summary; `errors` counts failed requests.
+    """
+    recorder = Recorder()
+    users = [
+        VirtualUser(base_url, username, password, plan_id, recorder,
+                    random.Random(f'{seed}:{username}'), time_scale, timeout)
+        for username, plan_id in accounts
+    ]
+
+    async def main():
+        step = ramp_up / len(users) if users else 0
+        await asyncio.gather(*(user.run(sessions, delay=i * step) for i, user in enumerate(users)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return recorder.summary(time.perf_counter() - start)
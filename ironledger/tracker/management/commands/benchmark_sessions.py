@@ -0,0 +1,70 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tracker.models import GlobalExercise, LoggedWorkout, SessionExercise
+
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'tracker.sessions',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare add_set latency under each session engine (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='add_set requests per engine (default: 200)')
+        parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES),
+                            help='Session engines to compare (default: all)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"engine":<11}{"median ms":>10}{"p95 ms":>9}{"queries":>9}{"session queries":>17}')
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+            user = User.objects.create_user(username='__benchmark_sessions__')
+            exercise = GlobalExercise.objects.create(
+                name='Benchmark Exercise',
+                equipment_type='barbell',
+                primary_muscle_group='chest'
+            )
+            for name in options['engines']:
+                with override_settings(SESSION_ENGINE=ENGINES[name]):
+                    self._run(name, user, exercise, options['requests'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete (data rolled back)'))
+
+    def _run(self, name, user, exercise, count):
+        workout = LoggedWorkout.objects.create(user=user, name='Benchmark')
+        session_ex = SessionExercise.objects.create(logged_workout=workout, global_exercise=exercise, order=1)
+        url = reverse('add_set', args=[session_ex.id])
+        body = json.dumps({'weight': 100, 'reps': 5})
+
+        client = Client()
+        client.force_login(user)
+        client.post(url, body, content_type='application/json')  # warm up caches
+
+        timings = []
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.post(url, body, content_type='application/json')
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f'add_set returned {response.status_code}')
+        session_queries = sum('django_session' in query['sql'] for query in captured)
+        client.logout()
+
+        p95 = statistics.quantiles(timings, n=20)[-1] if count > 1 else timings[0]
+        self.stdout.write(
+            f'{name:<11}{statistics.median(timings):>10.2f}{p95:>9.2f}'
+            f'{len(captured) / count:>9.1f}{session_queries / count:>17.1f}'
+        )
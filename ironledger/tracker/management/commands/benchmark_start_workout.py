@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tracker import catalog
+from tracker.models import GlobalExercise, PlannedExercise, WorkoutPlan
+
+
+class Command(BaseCommand):
+    help = 'Benchmark starting workouts of various sizes (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[5, 20, 50],
+                            help='Exercise counts to benchmark (default: 5 20 50)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Workouts started per size and mode (default: 20)')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        repeat = options['repeat']
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark can be pointed at a real database
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+            user = User.objects.create_user(username='__benchmark_start_workout__')
+            exercises = GlobalExercise.objects.bulk_create([
+                GlobalExercise(
+                    name=f'Benchmark Exercise {i}',
+                    equipment_type='barbell',
+                    primary_muscle_group='chest'
+                )
+                for i in range(max(sizes))
+            ])
+            catalog.invalidate()  # bulk_create skips the catalog's signals
+            client = Client()
+            client.force_login(user)
+
+            self.stdout.write(f'{"mode":<8}{"exercises":>10}{"median ms":>12}{"max ms":>10}{"queries":>9}')
+            for size in sizes:
+                plan = WorkoutPlan.objects.create(user=user, name=f'Benchmark {size}')
+                PlannedExercise.objects.bulk_create([
+                    PlannedExercise(workout_plan=plan, global_exercise=exercise, order=order)
+                    for order, exercise in enumerate(exercises[:size], 1)
+                ])
+                runs = {
+                    'plan': (reverse('start_workout_from_plan', args=[plan.id]), {}),
+                    'quick': (reverse('start_workout'), {
+                        'exercise_order': ','.join(str(exercise.id) for exercise in exercises[:size]),
+                    }),
+                }
+                for mode, (url, data) in runs.items():
+                    client.post(url, data)  # warm up session and catalog caches
+                    timings, queries = self._measure(client, url, data, repeat)
+                    self.stdout.write(
+                        f'{mode:<8}{size:>10}{statistics.median(timings):>12.2f}'
+                        f'{max(timings):>10.2f}{queries:>9}'
+                    )
+
+            transaction.set_rollback(True)
+        catalog.invalidate()
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete (data rolled back)'))
+
+    def _measure(self, client, url, data, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.post(url, data)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 302:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            queries = len(captured)
+        return timings, queries
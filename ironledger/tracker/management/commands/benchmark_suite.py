@@ -0,0 +1,118 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from tracker import benchmarks, catalog, plans, plates, synthetic
+from tracker.models import LoggedSet, LoggedWorkout
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main tracker views against a synthetic dataset and write a JSON report '
+        '(all data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5,
+                            help='Synthetic users to generate (default: 5)')
+        parser.add_argument('--years', type=float, default=2,
+                            help='Years of history per synthetic user (default: 2)')
+        parser.add_argument('--seed', type=int, default=0, help='Dataset seed (default: 0)')
+        parser.add_argument('--dataset-prefix', type=str,
+                            help='Benchmark an existing generate_synthetic_data dataset with this '
+                                 'username prefix instead of generating one')
+        parser.add_argument('--scenarios', nargs='+', choices=benchmarks.SCENARIO_NAMES,
+                            help='Scenarios to run (default: all)')
+        parser.add_argument('--iterations', type=int, default=30,
+                            help='Timed requests per scenario (default: 30)')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Untimed requests per scenario first (default: 3)')
+        parser.add_argument('--memory-iterations', type=int, default=3,
+                            help='Requests per scenario traced for peak memory, 0 to skip (default: 3)')
+        parser.add_argument('--output', type=str, default='benchmark_report.json',
+                            help="Report path, or '-' for stdout (default: benchmark_report.json)")
+        parser.add_argument('--compare', type=str,
+                            help='Baseline report; fail if any scenario regressed')
+        parser.add_argument('--max-regression', type=float, default=25.0,
+                            help='Allowed p50 slowdown against --compare, in percent (default: 25)')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+
+        self.stdout.write(f'{"scenario":<22}{"p50 ms":>9}{"p95 ms":>9}{"queries":>9}{"budget":>8}{"peak KB":>10}')
+        user = None
+        try:
+            # Everything runs in one transaction that is rolled back at the end,
+            # so the suite can be pointed at a real database
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+                if options['dataset_prefix']:
+                    user = User.objects.filter(
+                        username__startswith=options['dataset_prefix']
+                    ).order_by('username').first()
+                    if user is None:
+                        raise CommandError(f'No users start with "{options["dataset_prefix"]}"')
+                    dataset = {'prefix': options['dataset_prefix']}
+                else:
+                    generator = synthetic.Generator(
+                        users=options['users'], years=options['years'], seed=options['seed'],
+                        prefix='__benchmark__', with_records=True,
+                    )
+                    generator.run()
+                    user = User.objects.get(username=generator.username(0))
+                    dataset = {'users': options['users'], 'years': options['years'], 'seed': options['seed']}
+                dataset['user_workouts'] = LoggedWorkout.objects.filter(user=user).count()
+                dataset['user_sets'] = LoggedSet.objects.filter(session_exercise__logged_workout__user=user).count()
+
+                try:
+                    report = benchmarks.run_suite(
+                        user,
+                        names=options['scenarios'],
+                        iterations=options['iterations'],
+                        warmup=options['warmup'],
+                        memory_iterations=options['memory_iterations'],
+                        dataset=dataset,
+                        progress=self._progress,
+                    )
+                except (ValueError, RuntimeError) as e:
+                    raise CommandError(str(e))
+                transaction.set_rollback(True)
+        finally:
+            # Rolled-back rows may still be cached
+            catalog.invalidate()
+            plans.invalidate()
+            plans.invalidate_leaderboard()
+            if user is not None:
+                plates.invalidate_user(user.id)
+
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if options['output'] == '-':
+            self.stdout.write(text)
+        else:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✓ Report written to {options["output"]} (data rolled back)'))
+
+        if baseline is not None:
+            regressions = benchmarks.compare(baseline, report, options['max_regression'])
+            if regressions:
+                raise CommandError('Regressions against {}:\n  {}'.format(
+                    options['compare'], '\n  '.join(regressions)
+                ))
+            self.stdout.write(self.style.SUCCESS(f'✓ No regressions against {options["compare"]}'))
+
+    def _progress(self, name, result):
+        budget = result['query_budget'] if result['query_budget'] is not None else '-'
+        self.stdout.write(
+            f'{name:<22}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}{result["queries"]:>9}'
+            f'{budget:>8}{result["peak_memory_kb"]:>10.1f}'
+        )
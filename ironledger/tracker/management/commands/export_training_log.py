@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tracker import exports
+
+
+class Command(BaseCommand):
+    help = "Stream a user's training log (one row per set) to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='User whose log is exported')
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv', help='Output format (default: csv)')
+        parser.add_argument('--since', type=str, help='Only export sets started on or after YYYY-MM-DD')
+        parser.add_argument('--output', '-o', type=str, help='File to write (default: stdout)')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--chunk-size', type=int, default=exports.DEFAULT_CHUNK_SIZE,
+                            help=f'Rows fetched per database round trip (default: {exports.DEFAULT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+        try:
+            since = exports.parse_since(options['since'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = exports.set_rows(user, since=since, chunk_size=options['chunk_size'])
+        stream = exports.encode(self._counted(rows), options['format'])
+        if options['gzip']:
+            stream = exports.gzip_stream(stream)
+
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                for chunk in stream:
+                    out.write(chunk)
+        else:
+            buffer = getattr(self.stdout, 'buffer', None)
+            if buffer is not None:
+                for chunk in stream:
+                    buffer.write(chunk)
+                buffer.flush()
+            elif options['gzip']:
+                raise CommandError('--gzip needs --output or a binary stdout')
+            else:
+                for chunk in stream:
+                    self.stdout.write(chunk.decode(), ending='')
+
+        self.stderr.write(self.style.SUCCESS(f'✓ Exported {self.row_count} sets for {user.username}'))
+
+    def _counted(self, rows):
+        self.row_count = 0
+        for row in rows:
+            self.row_count += 1
+            yield row
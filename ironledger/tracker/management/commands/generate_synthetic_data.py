@@ -0,0 +1,86 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from tracker import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate users with multi-year synthetic training histories for benchmarking. '
+        'The same --seed and --end-date always produce the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Users to create (default: 10)')
+        parser.add_argument('--start', type=int, default=0,
+                            help='Index of the first user, to extend an existing dataset (default: 0)')
+        parser.add_argument('--years', type=float, default=3, help='Years of history per user (default: 3)')
+        parser.add_argument('--workouts-per-week', type=float, default=3.5,
+                            help='Average workouts per week (default: 3.5)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--end-date', type=str,
+                            help='Day the histories end, YYYY-MM-DD (default: today)')
+        parser.add_argument('--prefix', type=str, default='synthetic',
+                            help='Username prefix (default: synthetic)')
+        parser.add_argument('--password', type=str, default='synthetic',
+                            help='Password for every generated user (default: synthetic)')
+        parser.add_argument('--shared-ratio', type=float, default=0.3,
+                            help='Fraction of users whose plans are shared (default: 0.3)')
+        parser.add_argument('--batch-size', type=int, default=synthetic.DEFAULT_BATCH_SIZE,
+                            help=f'Sets written per transaction (default: {synthetic.DEFAULT_BATCH_SIZE})')
+        parser.add_argument('--skip-records', action='store_true',
+                            help="Don't rebuild personal records for the generated users")
+
+    def handle(self, *args, **options):
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = parse_date(options['end_date'])
+            except ValueError:
+                end_date = None
+            if end_date is None:
+                raise CommandError('--end-date must be a date (YYYY-MM-DD)')
+        if options['users'] < 1 or options['years'] <= 0 or options['workouts_per_week'] <= 0:
+            raise CommandError('--users, --years and --workouts-per-week must be positive')
+
+        generator = synthetic.Generator(
+            users=options['users'],
+            years=options['years'],
+            workouts_per_week=options['workouts_per_week'],
+            seed=options['seed'],
+            start=options['start'],
+            end_date=end_date,
+            prefix=options['prefix'],
+            password=options['password'],
+            shared_ratio=options['shared_ratio'],
+            batch_size=options['batch_size'],
+            with_records=not options['skip_records'],
+            progress=self._progress,
+        )
+        usernames = [generator.username(i) for i in range(options['start'], options['start'] + options['users'])]
+        taken = User.objects.filter(username__in=usernames).count()
+        if taken:
+            raise CommandError(
+                f'{taken} of the usernames already exist; use a different --prefix or --start'
+            )
+
+        self.started = time.perf_counter()
+        stats = generator.run()
+        elapsed = time.perf_counter() - self.started
+
+        if stats['global_exercises_created']:
+            self.stdout.write(f'  Added {stats["global_exercises_created"]} exercises to the catalog')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Generated {stats["users"]} users, {stats["plans"]} plans, '
+            f'{stats["custom_exercises"]} custom exercises, {stats["workouts"]} workouts and '
+            f'{stats["sets"]} sets in {elapsed:.1f}s ({stats["sets"] / elapsed if elapsed else 0:.0f} sets/s)'
+        ))
+
+    def _progress(self, stats):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'  {stats["users"]} users, {stats["workouts"]} workouts, {stats["sets"]} sets '
+            f'({stats["sets"] / elapsed if elapsed else 0:.0f} sets/s)'
+        )
@@ -0,0 +1,64 @@
+import gzip
+import io
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tracker import imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a training log (CSV or JSON Lines, optionally gzipped) for a user. '
+        'Safe to re-run after a failure: workouts that were already imported are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='User to import into')
+        parser.add_argument('path', type=str, help='File to import (.csv, .jsonl, optionally .gz)')
+        parser.add_argument('--format', choices=imports.FORMATS,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=imports.DEFAULT_BATCH_SIZE,
+                            help=f'Sets written per transaction (default: {imports.DEFAULT_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['format'] or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        self.start = time.perf_counter()
+        importer = imports.Importer(user, batch_size=options['batch_size'], progress=self._progress)
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rb') as raw:
+                lines = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+                stats = importer.run(imports.read_rows(lines, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+        except imports.ImportFailed as e:
+            raise CommandError(f'{e} (re-run after fixing it; {importer.stats["workouts_created"]} '
+                               f'workouts already imported will be skipped)')
+
+        elapsed = time.perf_counter() - self.start
+        rate = stats['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {stats["sets_created"]} sets in {stats["workouts_created"]} workouts '
+            f'({stats["workouts_skipped"]} already present, {stats["exercises_created"]} new exercises) '
+            f'at {rate:.0f} rows/s'
+        ))
+        if stats['rows'] >= imports.DEFAULT_BATCH_SIZE and rate < imports.THROUGHPUT_TARGET:
+            self.stdout.write(self.style.WARNING(
+                f'Below the {imports.THROUGHPUT_TARGET} rows/s throughput target'
+            ))
+
+    def _progress(self, stats):
+        elapsed = time.perf_counter() - self.start
+        self.stdout.write(
+            f'  {stats["rows"]} rows, {stats["sets_created"]} sets imported '
+            f'({stats["rows"] / elapsed if elapsed else 0:.0f} rows/s)'
+        )
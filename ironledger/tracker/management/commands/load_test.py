@@ -0,0 +1,218 @@
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from tracker import loadtest, synthetic
+from tracker.models import WorkoutPlan
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the workout flow over HTTP: virtual users log in, start a workout from a plan, '
+        'log sets, pick the next exercise and end the workout. Starts gunicorn (wsgi) and/or uvicorn '
+        '(asgi) once per --workers value, or targets --url. With --memory-budget each server gets as '
+        'many workers as fit in that much RSS, to compare them at equal memory. Users and workouts '
+        'are created in the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Virtual users (default: 20)')
+        parser.add_argument('--sessions', type=int, default=1,
+                            help='Workouts each virtual user runs (default: 1)')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], nargs='+', default=['wsgi'],
+                            help='wsgi runs gunicorn sync workers, asgi runs uvicorn workers (default: wsgi)')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                            help='Worker counts to compare (default: 1 2 4)')
+        parser.add_argument('--memory-budget', type=int, metavar='MB',
+                            help='Instead of --workers, run each server with as many workers as fit in this '
+                                 'much RSS, measured after a warm-up run (Linux only)')
+        parser.add_argument('--url', type=str,
+                            help='Test an already running server instead of starting gunicorn')
+        parser.add_argument('--port', type=int, default=8765,
+                            help='Port for the servers this command starts (default: 8765)')
+        parser.add_argument('--time-scale', type=float, default=0.01,
+                            help='Multiplier for the 60-180s rest gaps; 0 disables them (default: 0.01)')
+        parser.add_argument('--ramp-up', type=float, default=2.0,
+                            help='Seconds over which virtual users start (default: 2)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--prefix', type=str, default='loadtest',
+                            help='Username prefix of the load test accounts (default: loadtest)')
+        parser.add_argument('--password', type=str, default='loadtest',
+                            help='Password of the load test accounts (default: loadtest)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--output', type=str, help='Write the full results as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['sessions'] < 1:
+            raise CommandError('--users and --sessions must be positive')
+        if options['memory_budget'] is not None and options['memory_budget'] < 1:
+            raise CommandError('--memory-budget must be positive')
+        if 'asgi' in options['server'] and not options['url'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('--server asgi needs uvicorn (pip install -r requirements.txt)')
+        accounts = self._accounts(options)
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite serializes writes across workers; expect lock waits to dominate the tail'
+            ))
+
+        base_url = options['url'] or f'http://127.0.0.1:{options["port"]}'
+        if options['url']:
+            runs = [('external', '-')]
+        elif options['memory_budget']:
+            runs = [(server, self._workers_for_budget(server, accounts, options)) for server in options['server']]
+        else:
+            runs = [(server, workers) for server in options['server'] for workers in options['workers']]
+
+        self.stdout.write(f'{"server":<10}{"workers":>8}{"sessions":>9}{"failed":>8}{"req/s":>9}{"p50 ms":>9}'
+                          f'{"p95 ms":>9}{"p99 ms":>9}{"errors":>8}{"rss MB":>8}')
+        results = []
+        for server, workers in runs:
+            process = None if server == 'external' else self._start_server(server, workers, options['port'])
+            try:
+                summary = loadtest.run(
+                    base_url, accounts, options['password'],
+                    sessions=options['sessions'],
+                    time_scale=options['time_scale'],
+                    ramp_up=options['ramp_up'],
+                    seed=options['seed'],
+                    timeout=options['timeout'],
+                )
+                summary['rss_mb'] = _rss_mb(process.pid) if process else None
+            finally:
+                if process:
+                    self._stop(process)
+            summary['server'] = server
+            summary['workers'] = workers
+            results.append(summary)
+            latency = summary['latency_ms']
+            rss = f'{summary["rss_mb"]:.0f}' if summary['rss_mb'] else '-'
+            self.stdout.write(
+                f'{server:<10}{workers!s:>8}{summary["sessions_completed"]:>9}{summary["sessions_failed"]:>8}'
+                f'{summary["throughput_rps"]:>9.1f}{latency["p50"] or 0:>9.1f}{latency["p95"] or 0:>9.1f}'
+                f'{latency["p99"] or 0:>9.1f}{summary["errors"]:>8}{rss:>8}'
+            )
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {"request":<22}{"count":>6}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>7}')
+                for label, endpoint in summary['endpoints'].items():
+                    self.stdout.write(
+                        f'  {label:<22}{endpoint["count"]:>6}{endpoint["p50"]:>9.1f}{endpoint["p95"]:>9.1f}'
+                        f'{endpoint["p99"]:>9.1f}{endpoint["errors"]:>7}'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'users': options['users'], 'sessions': options['sessions'],
+                           'time_scale': options['time_scale'], 'memory_budget_mb': options['memory_budget'],
+                           'runs': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(f'  Results written to {options["output"]}')
+        self.stdout.write(self.style.SUCCESS('✓ Load test complete'))
+
+    def _accounts(self, options):
+        """(username, plan_id) per virtual user, generating missing accounts with synthetic histories"""
+        usernames = [synthetic.username(options['prefix'], i) for i in range(options['users'])]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        missing = [i for i, username in enumerate(usernames) if username not in existing]
+        if missing:
+            self.stdout.write(f'  Creating {len(missing)} load test accounts...')
+        # Generate each contiguous run of missing indexes in one pass
+        while missing:
+            start = missing[0]
+            count = 1
+            while count < len(missing) and missing[count] == start + count:
+                count += 1
+            synthetic.Generator(users=count, start=start, years=0.25, prefix=options['prefix'],
+                                password=options['password'], seed=options['seed']).run()
+            missing = missing[count:]
+
+        plans = {}
+        for plan_id, username in WorkoutPlan.objects.filter(
+            user__username__in=usernames, is_active=True
+        ).order_by('id').values_list('id', 'user__username'):
+            plans.setdefault(username, plan_id)
+        without_plan = [username for username in usernames if username not in plans]
+        if without_plan:
+            raise CommandError(f'{len(without_plan)} load test accounts have no workout plan, '
+                               f'e.g. {without_plan[0]}; use a different --prefix')
+        return [(username, plans[username]) for username in usernames]
+
+    def _workers_for_budget(self, server, accounts, options):
+        """
+        Workers of `server` that fit in --memory-budget: RSS is measured with
+        two and three warmed-up workers, the difference being one worker's
+        cost and the rest the server's fixed overhead (uvicorn only starts a
+        supervisor process from two workers up).
+        """
+        rss = {}
+        for workers in (2, 3):
+            process = self._start_server(server, workers, options['port'])
+            try:
+                # Warm up every worker's imports, connections and caches before measuring
+                loadtest.run(f'http://127.0.0.1:{options["port"]}', accounts[:2 * workers], options['password'],
+                             time_scale=0, seed=options['seed'], timeout=options['timeout'])
+                rss[workers] = _rss_mb(process.pid)
+            finally:
+                self._stop(process)
+        per_worker = max(rss[3] - rss[2], 1.0)
+        fixed = max(rss[2] - 2 * per_worker, 0.0)
+        workers = max(1, int((options['memory_budget'] - fixed) // per_worker))
+        self.stdout.write(f'  {server}: {per_worker:.0f} MB per worker + {fixed:.0f} MB fixed; '
+                          f'{workers} workers fit in {options["memory_budget"]} MB')
+        return workers
+
+    def _start_server(self, server, workers, port):
+        if server == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', '--app-dir', str(settings.BASE_DIR),
+                       'ironledger.asgi:application', '--workers', str(workers),
+                       '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '--pythonpath', str(settings.BASE_DIR),
+                       'ironledger.wsgi:application', '--workers', str(workers),
+                       '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+        process = subprocess.Popen(command, env=os.environ.copy())
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{command[2]} exited with status {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'{command[2]} did not start listening on port {port}')
+
+    def _stop(self, process):
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def _rss_mb(pid):
+    """Resident memory of a process and all its descendants in MB, from /proc"""
+    parents = {}
+    rss = {}
+    for status in Path('/proc').glob('[0-9]*/status'):
+        try:
+            fields = dict(line.split(':', 1) for line in status.read_text().splitlines() if ':' in line)
+        except OSError:
+            continue
+        process = int(status.parent.name)
+        parents[process] = int(fields['PPid'])
+        rss[process] = int(fields.get('VmRSS', '0 kB').split()[0])
+    if pid not in rss:
+        raise CommandError('Measuring memory needs /proc (Linux)')
+    tree = {pid}
+    while True:
+        children = {process for process, parent in parents.items() if parent in tree} - tree
+        if not children:
+            break
+        tree |= children
+    return sum(rss[process] for process in tree) / 1024
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from tracker import records
+
+
+class Command(BaseCommand):
+    help = 'Rebuild personal records from logged sets, one user per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='Only rebuild records for this username')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of users fetched per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        chunk_size = options['chunk_size']
+        last_id = 0
+        total_users = 0
+        total_records = 0
+
+        # Keyset over user ids so each batch is a cheap index range scan,
+        # and each user is rebuilt in its own short transaction
+        while True:
+            user_ids = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                total_records += records.rebuild_user(user_id)
+            total_users += len(user_ids)
+            last_id = user_ids[-1]
+            self.stdout.write(f'  Rebuilt {total_users} users ({total_records} records)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rebuilt {total_records} personal records for {total_users} users'
+        ))
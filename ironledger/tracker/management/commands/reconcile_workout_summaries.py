@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from tracker import summaries
+from tracker.models import LoggedWorkout
+
+
+class Command(BaseCommand):
+    help = 'Check per-workout summaries against the logged sets in batches and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of workouts checked per query (default: 500)')
+        parser.add_argument('--user', type=str, help='Only check workouts for this username')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        workouts = LoggedWorkout.objects.all()
+        if options['user']:
+            workouts = workouts.filter(user__username=options['user'])
+
+        checked = 0
+        drifted = 0
+        for batch_checked, drifted_ids in summaries.reconcile(
+            workouts, batch_size=options['batch_size'], dry_run=options['dry_run']
+        ):
+            checked += batch_checked
+            drifted += len(drifted_ids)
+            if drifted_ids:
+                self.stdout.write(f'  Drift in workouts: {", ".join(str(pk) for pk in drifted_ids)}')
+            self.stdout.write(f'  Checked {checked} workouts')
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Checked {checked} workouts, {action} {drifted} with drift'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from tracker import plans
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the cached leaderboard of popular shared plans shown on the dashboard. '
+        'Run it periodically (e.g. every few minutes from cron); plan starts update it in between.'
+    )
+
+    def handle(self, *args, **options):
+        board = plans.refresh_leaderboard()
+        if options['verbosity'] > 1:
+            for rank, entry in enumerate(board, 1):
+                self.stdout.write(
+                    f'  {rank:>3}. {entry["name"]} by {entry["username"]} '
+                    f'({entry["exercise_count"]} exercises, used {entry["times_used"]} times)'
+                )
+        self.stdout.write(self.style.SUCCESS(f'✓ Leaderboard refreshed: {len(board)} shared plans'))
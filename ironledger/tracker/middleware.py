@@ -0,0 +1,180 @@
+"""
+Per-request SQL and template instrumentation.
+
+Enable with QUERY_INSTRUMENTATION = True. Every request then gets a
+Server-Timing header and a structured log line with its query count,
+total DB time, duplicated query fingerprints and template render time.
+Views listed in QUERY_BUDGETS are checked against their query budget;
+with QUERY_BUDGETS_STRICT the request fails instead of just logging.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger('ironledger.tracker.middleware')
+
+_active_recorder = ContextVar('query_recorder', default=None)
+
+# Collapses "IN (%s, %s, %s)" so queries differing only in list length share a fingerprint
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a view runs more queries than its budget"""
+
+
+def fingerprint(sql):
+    """Normalize a parameterized SQL statement for duplicate detection"""
+    return _IN_LIST.sub('IN (...)', ' '.join(sql.split()))
+
+
+class QueryRecorder:
+    """
+    Context manager that records every query run on any database connection,
+    plus time spent rendering templates, while it is active.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.fingerprints = Counter()
+        self._template_depth = 0
+        self._stack = None
+        self._token = None
+
+    def __enter__(self):
+        _instrument_templates()
+        self._stack = ExitStack()
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self._record_query))
+        self._token = _active_recorder.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_recorder.reset(self._token)
+        self._stack.close()
+        return False
+
+    def _record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints executed more than once, most repeated first"""
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > 1}
+
+
+def _instrument_templates():
+    """Wrap Template.render once so active recorders see render time"""
+    if getattr(template_base.Template.render, '_instrumented', False):
+        return
+    original_render = template_base.Template.render
+
+    def render(self, context):
+        recorder = _active_recorder.get()
+        # Only time the outermost render; includes are part of their parent
+        if recorder is None or recorder._template_depth:
+            return original_render(self, context)
+        recorder._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            recorder.template_time += time.perf_counter() - start
+            recorder._template_depth -= 1
+
+    render._instrumented = True
+    template_base.Template.render = render
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in middleware reporting per-request SQL and template metrics.
+    Sync-only, so while enabled ASGI requests run on a thread.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        total_time = time.perf_counter() - start
+
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.query_count} queries"',
+            f'tpl;dur={recorder.template_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ])
+        logger.info('request_metrics %s', json.dumps({
+            'path': request.path,
+            'method': request.method,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': recorder.query_count,
+            'db_ms': round(recorder.db_time * 1000, 2),
+            'template_ms': round(recorder.template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+            'duplicates': recorder.duplicates,
+        }))
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and recorder.query_count > budget:
+            message = f'{view_name} ran {recorder.query_count} queries (budget {budget})'
+            if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning('query_budget_exceeded %s', message)
+
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also works in an async middleware chain. WhiteNoise 6 is
+    sync-only, and one sync middleware makes Django run every ASGI request,
+    async views included, on a thread. Static files are still served from
+    a thread; every other request passes straight through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
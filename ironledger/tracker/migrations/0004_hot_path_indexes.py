@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_sessionexercise_rest_before_duration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loggedset',
+            index=models.Index(fields=['session_exercise', 'set_number'], name='set_session_ex_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loggedworkout',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-started_at'], name='workout_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loggedworkout',
+            index=models.Index(condition=models.Q(('ended_at__isnull', True)), fields=['user'], name='workout_user_in_progress_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionexercise',
+            index=models.Index(fields=['logged_workout', 'completed_at', 'order'], name='session_ex_progress_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['privacy', 'is_active', '-times_used'], name='plan_privacy_popular_idx'),
+        ),
+    ]
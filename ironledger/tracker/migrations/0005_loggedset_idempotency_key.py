@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loggedset',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client-supplied key used to deduplicate retries', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='loggedset',
+            constraint=models.UniqueConstraint(fields=('session_exercise', 'idempotency_key'), name='unique_set_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:41
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def renumber_duplicate_sets(apps, schema_editor):
+    """Renumber exercises that already contain duplicate set numbers so the unique constraint can be added"""
+    LoggedSet = apps.get_model('tracker', 'LoggedSet')
+
+    duplicated_exercise_ids = set(
+        LoggedSet.objects.values('session_exercise_id', 'set_number')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+        .values_list('session_exercise_id', flat=True)
+    )
+    for session_exercise_id in duplicated_exercise_ids:
+        sets = list(
+            LoggedSet.objects.filter(session_exercise_id=session_exercise_id).order_by('set_number', 'id')
+        )
+        for number, logged_set in enumerate(sets, 1):
+            logged_set.set_number = number
+        LoggedSet.objects.bulk_update(sets, ['set_number'])
+
+
+def backfill_last_set_number(apps, schema_editor):
+    """Seed each counter with the highest set number already logged"""
+    LoggedSet = apps.get_model('tracker', 'LoggedSet')
+    SessionExercise = apps.get_model('tracker', 'SessionExercise')
+
+    highest = (
+        LoggedSet.objects.filter(session_exercise_id=OuterRef('pk'))
+        .values('session_exercise_id')
+        .annotate(highest=Max('set_number'))
+        .values('highest')
+    )
+    SessionExercise.objects.update(last_set_number=Coalesce(Subquery(highest), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_loggedset_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionexercise',
+            name='last_set_number',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(renumber_duplicate_sets, migrations.RunPython.noop),
+        migrations.RunPython(backfill_last_set_number, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='loggedset',
+            name='set_session_ex_number_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='loggedset',
+            constraint=models.UniqueConstraint(fields=('session_exercise', 'set_number'), name='unique_set_number'),
+        ),
+    ]
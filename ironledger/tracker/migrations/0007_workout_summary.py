@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:20
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    """Compute summaries for existing workouts with correlated subqueries, then durations in batches"""
+    LoggedWorkout = apps.get_model('tracker', 'LoggedWorkout')
+    SessionExercise = apps.get_model('tracker', 'SessionExercise')
+    LoggedSet = apps.get_model('tracker', 'LoggedSet')
+
+    sets = LoggedSet.objects.filter(session_exercise__logged_workout_id=OuterRef('pk')).values(
+        'session_exercise__logged_workout_id'
+    )
+    set_count = sets.annotate(total=Count('id')).values('total')
+    volume = sets.annotate(
+        total=Sum(F('weight') * F('reps'), filter=Q(is_warmup=False))
+    ).values('total')
+    exercise_count = SessionExercise.objects.filter(logged_workout_id=OuterRef('pk')).values(
+        'logged_workout_id'
+    ).annotate(total=Count('id')).values('total')
+
+    decimal = DecimalField(max_digits=12, decimal_places=2)
+    LoggedWorkout.objects.update(
+        set_count=Coalesce(Subquery(set_count), 0),
+        total_volume=Coalesce(Subquery(volume, output_field=decimal), Value(0), output_field=decimal),
+        exercise_count=Coalesce(Subquery(exercise_count), 0),
+    )
+
+    batch = []
+    for workout in LoggedWorkout.objects.filter(ended_at__isnull=False).only('id', 'started_at', 'ended_at').iterator(chunk_size=2000):
+        workout.duration_seconds = max(int((workout.ended_at - workout.started_at).total_seconds()), 0)
+        batch.append(workout)
+        if len(batch) >= 2000:
+            LoggedWorkout.objects.bulk_update(batch, ['duration_seconds'])
+            batch = []
+    if batch:
+        LoggedWorkout.objects.bulk_update(batch, ['duration_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_set_number_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loggedworkout',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, help_text='Set when the workout ends', null=True),
+        ),
+        migrations.AddField(
+            model_name='loggedworkout',
+            name='exercise_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of exercises in the session'),
+        ),
+        migrations.AddField(
+            model_name='loggedworkout',
+            name='set_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of logged sets, warmups included'),
+        ),
+        migrations.AddField(
+            model_name='loggedworkout',
+            name='total_volume',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of weight × reps over working (non-warmup) sets', max_digits=12),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
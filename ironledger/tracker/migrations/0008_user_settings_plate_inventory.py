@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_workout_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersettings',
+            name='has_microplates',
+            field=models.BooleanField(default=False, help_text='Include fractional plates in plate loading'),
+        ),
+        migrations.AddField(
+            model_name='usersettings',
+            name='plate_inventory',
+            field=models.JSONField(blank=True, default=dict, help_text='Plate weight -> pairs available, e.g. {"45": 4}; empty uses the standard set for the unit'),
+        ),
+    ]
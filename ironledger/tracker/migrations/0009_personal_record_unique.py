@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_duplicate_records(apps, schema_editor):
+    """Keep only the best record per key so the unique constraints can be added"""
+    PersonalRecord = apps.get_model('tracker', 'PersonalRecord')
+
+    passes = (
+        ('weight_at_reps', ('user_id', 'global_exercise_id', 'custom_exercise_id', 'reps'), '-weight'),
+        ('one_rep_max', ('user_id', 'global_exercise_id', 'custom_exercise_id'), '-estimated_1rm'),
+    )
+    duplicates = []
+    for pr_type, key_fields, best_first in passes:
+        seen = set()
+        records = PersonalRecord.objects.filter(pr_type=pr_type).order_by(best_first, '-achieved_at', '-id')
+        for record_id, *key in records.values_list('id', *key_fields):
+            key = tuple(key)
+            if key in seen:
+                duplicates.append(record_id)
+            seen.add(key)
+    PersonalRecord.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_user_settings_plate_inventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='personalrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('global_exercise__isnull', False), ('pr_type', 'weight_at_reps')), fields=('user', 'global_exercise', 'reps'), name='unique_pr_global_weight_at_reps'),
+        ),
+        migrations.AddConstraint(
+            model_name='personalrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('custom_exercise__isnull', False), ('pr_type', 'weight_at_reps')), fields=('user', 'custom_exercise', 'reps'), name='unique_pr_custom_weight_at_reps'),
+        ),
+        migrations.AddConstraint(
+            model_name='personalrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('global_exercise__isnull', False), ('pr_type', 'one_rep_max')), fields=('user', 'global_exercise'), name='unique_pr_global_one_rep_max'),
+        ),
+        migrations.AddConstraint(
+            model_name='personalrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('custom_exercise__isnull', False), ('pr_type', 'one_rep_max')), fields=('user', 'custom_exercise'), name='unique_pr_custom_one_rep_max'),
+        ),
+    ]
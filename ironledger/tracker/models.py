@@ -1,7 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.dispatch import Signal
 from django.utils import timezone
+from decimal import Decimal
+
+
+# Sent by WorkoutPlan.increment_usage with plan=<the plan>; its F() UPDATE fires no post_save
+plan_used = Signal()
 
 
 class GlobalExercise(models.Model):
@@ -136,14 +143,23 @@ class WorkoutPlan(models.Model):
         ordering = ['-updated_at']
         verbose_name = "Workout Plan"
         verbose_name_plural = "Workout Plans"
+        indexes = [
+            # Shared plan listings ranked by popularity
+            models.Index(fields=['privacy', 'is_active', '-times_used'], name='plan_privacy_popular_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.user.username})"
     
     def increment_usage(self):
-        """Increment usage counter when plan is used to start a workout"""
+        """
+        Increment usage counter when plan is used to start a workout.
+        A single F() UPDATE, so concurrent starts are never lost; the
+        in-memory value is only bumped locally, not re-read.
+        """
+        WorkoutPlan.objects.filter(pk=self.pk).update(times_used=F('times_used') + 1)
         self.times_used += 1
-        self.save(update_fields=['times_used'])
+        plan_used.send(sender=WorkoutPlan, plan=self)
 
 
 class PlannedExercise(models.Model):
@@ -202,10 +218,31 @@ class LoggedWorkout(models.Model):
     # Soft delete
     is_active = models.BooleanField(default=True, help_text="Soft delete flag")
     
+    # Denormalized summary, kept in sync on set writes (see tracker.summaries)
+    set_count = models.PositiveIntegerField(default=0, help_text="Number of logged sets, warmups included")
+    total_volume = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                       help_text="Sum of weight × reps over working (non-warmup) sets")
+    exercise_count = models.PositiveIntegerField(default=0, help_text="Number of exercises in the session")
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True, help_text="Set when the workout ends")
+    
     class Meta:
         ordering = ['-started_at']
         verbose_name = "Logged Workout"
         verbose_name_plural = "Logged Workouts"
+        indexes = [
+            # Recent workouts for a user (dashboard, history), soft-deleted rows excluded
+            models.Index(
+                fields=['user', '-started_at'],
+                condition=models.Q(is_active=True),
+                name='workout_user_recent_idx',
+            ),
+            # Partial index: only in-progress workouts, so it stays tiny
+            models.Index(
+                fields=['user'],
+                condition=models.Q(ended_at__isnull=True),
+                name='workout_user_in_progress_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.user.username} ({self.started_at.date()})"
@@ -221,6 +258,31 @@ class LoggedWorkout(models.Model):
     def is_in_progress(self):
         """Check if workout is currently active"""
         return self.ended_at is None
+    
+    def reorder_exercises(self, exercise_ids, start=1):
+        """
+        Give the listed session exercises consecutive orders (start, start+1, ...)
+        in a single CASE WHEN UPDATE. Exercises not listed keep their order.
+        """
+        if not exercise_ids:
+            return 0
+        positions = [When(pk=pk, then=Value(order)) for order, pk in enumerate(exercise_ids, start)]
+        return self.session_exercises.filter(pk__in=exercise_ids).update(
+            order=Case(*positions, output_field=models.PositiveIntegerField())
+        )
+    
+    def move_exercise(self, exercise_id, position, incomplete_only=False):
+        """
+        Move a session exercise to 1-based `position`, shifting the others
+        but keeping their relative order. One SELECT plus one UPDATE.
+        """
+        exercises = self.session_exercises.all()
+        if incomplete_only:
+            exercises = exercises.filter(completed_at__isnull=True)
+        exercise_ids = [pk for pk in exercises.order_by('order', 'id').values_list('id', flat=True)
+                        if pk != exercise_id]
+        exercise_ids.insert(max(position, 1) - 1, exercise_id)
+        return self.reorder_exercises(exercise_ids)
 
 
 class SessionExercise(models.Model):
@@ -248,10 +310,17 @@ class SessionExercise(models.Model):
     rest_before_duration = models.PositiveIntegerField(null=True, blank=True, 
                                                        help_text="Rest time in seconds before starting this exercise")
     
+    # Highest set number handed out so far; bumped atomically when sets are logged
+    last_set_number = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['logged_workout', 'order']
         verbose_name = "Session Exercise"
         verbose_name_plural = "Session Exercises"
+        indexes = [
+            # Current/next exercise lookup in the active workout
+            models.Index(fields=['logged_workout', 'completed_at', 'order'], name='session_ex_progress_idx'),
+        ]
     
     def __str__(self):
         exercise_name = self.global_exercise.name if self.global_exercise else self.custom_exercise.name
@@ -260,6 +329,35 @@ class SessionExercise(models.Model):
     def get_exercise_name(self):
         """Helper to get exercise name regardless of type"""
         return self.global_exercise.name if self.global_exercise else self.custom_exercise.name
+    
+    def allocate_set_numbers(self, count=1, rest_before=None):
+        """
+        Reserve the next `count` set numbers and return the first one.
+        The F() increment is a single atomic UPDATE, so concurrent requests
+        never receive the same number; the row lock it takes is held only
+        until the surrounding transaction commits. `rest_before` becomes
+        rest_before_duration in the same UPDATE if these are the exercise's
+        first sets and it has none yet.
+        """
+        changes = {'last_set_number': F('last_set_number') + count}
+        if rest_before is not None:
+            changes['rest_before_duration'] = Case(
+                When(last_set_number=0, rest_before_duration__isnull=True, then=Value(rest_before)),
+                default=F('rest_before_duration'),
+                output_field=models.PositiveIntegerField(),
+            )
+        with transaction.atomic(savepoint=False):
+            SessionExercise.objects.filter(pk=self.pk).update(**changes)
+            self.last_set_number, self.rest_before_duration = SessionExercise.objects.values_list(
+                'last_set_number', 'rest_before_duration'
+            ).get(pk=self.pk)
+        return self.last_set_number - count + 1
+    
+    def release_set_number(self, set_number):
+        """Give back the last set number if its set was deleted"""
+        SessionExercise.objects.filter(pk=self.pk, last_set_number=set_number).update(
+            last_set_number=F('last_set_number') - 1
+        )
 
 
 class LoggedSet(models.Model):
@@ -289,10 +387,19 @@ class LoggedSet(models.Model):
     # Optional notes per set
     notes = models.TextField(blank=True, help_text="E.g., 'Felt great', 'Knee pain on rep 5'")
     
+    # Client-generated key so replayed requests don't log the same set twice
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True,
+                                       help_text="Client-supplied key used to deduplicate retries")
+    
     class Meta:
         ordering = ['session_exercise', 'set_number']
         verbose_name = "Logged Set"
         verbose_name_plural = "Logged Sets"
+        constraints = [
+            # Also serves as the (session_exercise, set_number) lookup index
+            models.UniqueConstraint(fields=['session_exercise', 'set_number'], name='unique_set_number'),
+            models.UniqueConstraint(fields=['session_exercise', 'idempotency_key'], name='unique_set_idempotency_key'),
+        ]
     
     def __str__(self):
         return f"{self.session_exercise.get_exercise_name()} - Set {self.set_number}: {self.weight}lbs x {self.reps}"
@@ -320,6 +427,10 @@ class UserSettings(models.Model):
     default_bar_weight = models.DecimalField(max_digits=5, decimal_places=2, default=45.00,
                                             help_text="Standard barbell weight")
     weight_unit = models.CharField(max_length=3, choices=UNIT_CHOICES, default='lbs')
+    plate_inventory = models.JSONField(default=dict, blank=True,
+                                       help_text="Plate weight -> pairs available, e.g. {\"45\": 4}; "
+                                                 "empty uses the standard set for the unit")
+    has_microplates = models.BooleanField(default=False, help_text="Include fractional plates in plate loading")
     
     # Rest timer preferences
     default_rest_time = models.PositiveIntegerField(default=90, help_text="Default rest time in seconds")
@@ -371,6 +482,30 @@ class PersonalRecord(models.Model):
         ordering = ['-achieved_at']
         verbose_name = "Personal Record"
         verbose_name_plural = "Personal Records"
+        constraints = [
+            # One best weight per rep count and one 1RM per user/exercise; the
+            # exercise FK that is NULL can't be part of the key, hence one pair per type
+            models.UniqueConstraint(
+                fields=['user', 'global_exercise', 'reps'],
+                condition=models.Q(pr_type='weight_at_reps', global_exercise__isnull=False),
+                name='unique_pr_global_weight_at_reps',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'custom_exercise', 'reps'],
+                condition=models.Q(pr_type='weight_at_reps', custom_exercise__isnull=False),
+                name='unique_pr_custom_weight_at_reps',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'global_exercise'],
+                condition=models.Q(pr_type='one_rep_max', global_exercise__isnull=False),
+                name='unique_pr_global_one_rep_max',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'custom_exercise'],
+                condition=models.Q(pr_type='one_rep_max', custom_exercise__isnull=False),
+                name='unique_pr_custom_one_rep_max',
+            ),
+        ]
     
     def __str__(self):
         exercise_name = self.global_exercise.name if self.global_exercise else self.custom_exercise.name
@@ -387,6 +522,7 @@ class PersonalRecord(models.Model):
         """
         Calculate estimated 1RM using Epley formula: weight × (1 + reps/30)
         """
+        weight = Decimal(str(weight))
         if reps == 1:
             return weight
-        return weight * (1 + reps / 30)
+        return weight * (1 + Decimal(reps) / 30)
@@ -0,0 +1,170 @@
+"""
+Workout plan listings.
+
+Listings annotate each plan's exercise count and join its owner, so a
+page of plans is one query however many plans it shows. Shared plans are
+served as "popular plans": pages ranked by times_used, cached under a
+versioned key like the exercise catalog. Editing a plan or its exercises
+bumps the version (see signals.py); usage counts only move on the next
+rebuild, so the ranking can lag by up to POPULAR_TIMEOUT. As with the
+catalog, the version expires after VERSION_TIMEOUT so processes that
+don't share a cache pick up edits made on another one.
+
+Pages are the same for everyone, so the viewer's own shared plans are
+dropped in Python rather than in the cached query.
+
+The dashboard reads a precomputed leaderboard instead: the top
+LEADERBOARD_SIZE shared plans as plain dicts (id, name, owner, exercise
+count, times_used) in one cache entry. refresh_popular_plans rebuilds it
+from the database; in between, record_use() applies each plan start to
+the cached copy, moving the plan up or letting it onto the board.
+Concurrent starts can race on the cached copy, which only skews counts
+until the next refresh; WorkoutPlan.times_used stays exact.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import WorkoutPlan
+
+
+VERSION_KEY = 'tracker:plans:popular:version'
+POPULAR_TIMEOUT = 5 * 60
+# Longest a process serves pages that another process has invalidated
+VERSION_TIMEOUT = 60
+PAGE_SIZE = 24
+MAX_PAGE = 500
+
+LEADERBOARD_KEY = 'tracker:plans:leaderboard'
+LEADERBOARD_SIZE = 50
+# Safety net in case refresh_popular_plans isn't scheduled
+LEADERBOARD_TIMEOUT = 60 * 60
+
+
+def with_listing(queryset):
+    """Annotate exercise_count and join the owner for plan cards"""
+    return queryset.select_related('user').annotate(exercise_count=Count('planned_exercises'))
+
+
+def user_plans(user):
+    """The user's active plans, most recently edited first"""
+    return with_listing(WorkoutPlan.objects.filter(user=user, is_active=True)).order_by('-updated_at')
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=VERSION_TIMEOUT)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Drop every cached popular plans page"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=VERSION_TIMEOUT)
+
+
+def parse_page(value):
+    """1-based page number from a query parameter; anything invalid is page 1"""
+    try:
+        page = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(page, 1), MAX_PAGE)
+
+
+def popular_page(page=1):
+    """
+    (plans, has_next) for one page of active shared plans ranked by
+    times_used. Fetches one extra row to know whether a next page exists,
+    so no COUNT over all shared plans is needed.
+    """
+    key = f'tracker:plans:popular:{_version()}:{page}'
+    cached = cache.get(key)
+    if cached is None:
+        offset = (page - 1) * PAGE_SIZE
+        rows = list(with_listing(
+            WorkoutPlan.objects.filter(privacy='shared', is_active=True)
+        ).order_by('-times_used', 'id')[offset:offset + PAGE_SIZE + 1])
+        cached = (rows[:PAGE_SIZE], len(rows) > PAGE_SIZE)
+        cache.set(key, cached, timeout=POPULAR_TIMEOUT)
+    return cached
+
+
+def popular_for(user, page=1):
+    """A popular plans page without `user`'s own plans: (plans, has_next)"""
+    plans, has_next = popular_page(page)
+    return [plan for plan in plans if plan.user_id != user.id], has_next
+
+
+def _ranked(entries):
+    return sorted(entries, key=lambda entry: (-entry['times_used'], entry['id']))[:LEADERBOARD_SIZE]
+
+
+def _entry(plan):
+    return {
+        'id': plan.id,
+        'name': plan.name,
+        'user_id': plan.user_id,
+        'username': plan.user.username,
+        'exercise_count': plan.exercise_count,
+        'times_used': plan.times_used,
+    }
+
+
+def refresh_leaderboard():
+    """Rebuild the leaderboard from the database with one query; returns it"""
+    board = [
+        _entry(plan) for plan in with_listing(
+            WorkoutPlan.objects.filter(privacy='shared', is_active=True)
+        ).order_by('-times_used', 'id')[:LEADERBOARD_SIZE]
+    ]
+    cache.set(LEADERBOARD_KEY, board, timeout=LEADERBOARD_TIMEOUT)
+    return board
+
+
+def leaderboard():
+    """The top shared plans as dicts, most used first"""
+    board = cache.get(LEADERBOARD_KEY)
+    if board is None:
+        board = refresh_leaderboard()
+    return board
+
+
+def invalidate_leaderboard():
+    cache.delete(LEADERBOARD_KEY)
+
+
+def record_use(plan):
+    """
+    Apply one start of `plan` (times_used already incremented) to the
+    cached leaderboard. A plan not on the board joins it once it beats the
+    last entry, at the cost of one query.
+    """
+    board = cache.get(LEADERBOARD_KEY)
+    if board is None:
+        # Nothing cached; the next read builds it with current counts
+        return
+    for entry in board:
+        if entry['id'] == plan.id:
+            entry['times_used'] = max(entry['times_used'] + 1, plan.times_used)
+            break
+    else:
+        if plan.privacy != 'shared' or not plan.is_active:
+            return
+        if len(board) >= LEADERBOARD_SIZE and plan.times_used <= board[-1]['times_used']:
+            return
+        fresh = with_listing(WorkoutPlan.objects.filter(pk=plan.pk)).first()
+        if fresh is None:
+            return
+        board.append(_entry(fresh))
+    cache.set(LEADERBOARD_KEY, _ranked(board), timeout=LEADERBOARD_TIMEOUT)
+
+
+def leaderboard_for(user, limit=5):
+    """Leaderboard entries not owned by `user`"""
+    return [entry for entry in leaderboard() if entry['user_id'] != user.id][:limit]
@@ -0,0 +1,187 @@
+"""
+Plate loading solver.
+
+For a given plate inventory (plate weight -> pairs available) every
+reachable per-side load is computed once with a bounded-knapsack pass,
+keeping the loading with the fewest plates for each total. A dense table
+over the inventory's weight step then maps any target straight to the
+heaviest reachable load not above it, so a lookup is a list index plus a
+dict hit. Tables are memoized per inventory, and each user's bar weight
+and inventory are kept in the cache so the endpoint doesn't read
+UserSettings on every keystroke.
+
+Weights are handled in hundredths of the user's unit so 1.25 and 0.25
+plates stay exact.
+"""
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache, reduce
+from math import gcd
+
+from django.core.cache import cache
+
+from .models import UserSettings
+
+
+# Pairs of each plate (one per side) in a typical commercial gym
+STANDARD_PLATES = {
+    'lbs': {'45': 8, '35': 2, '25': 2, '10': 2, '5': 2, '2.5': 2},
+    'kg': {'25': 8, '20': 2, '15': 2, '10': 2, '5': 2, '2.5': 2, '1.25': 2},
+}
+MICROPLATES = {
+    'lbs': {'1.25': 1, '1': 1, '0.5': 1, '0.25': 1},
+    'kg': {'1': 1, '0.5': 1, '0.25': 1},
+}
+
+_SCALE = 100
+SETUP_TIMEOUT = 60 * 60
+
+
+class InvalidInventory(ValueError):
+    """Raised for plate inventories that can't be solved"""
+
+
+def _to_units(weight):
+    return int(Decimal(str(weight)) * _SCALE)
+
+
+def _from_units(units):
+    return Decimal(units) / _SCALE
+
+
+def normalize_inventory(unit, plate_inventory=None, has_microplates=False):
+    """
+    Build a hashable ((plate_units, pairs), ...) inventory, heaviest first.
+    An empty plate_inventory means the standard set for the unit.
+    """
+    plates = dict(plate_inventory or STANDARD_PLATES[unit])
+    if has_microplates:
+        for weight, pairs in MICROPLATES[unit].items():
+            plates.setdefault(weight, pairs)
+
+    inventory = {}
+    for weight, pairs in plates.items():
+        try:
+            units = _to_units(weight)
+            pairs = int(pairs)
+        except (InvalidOperation, TypeError, ValueError):
+            raise InvalidInventory(f'Invalid plate entry {weight!r}: {pairs!r}')
+        if units <= 0 or pairs < 0:
+            raise InvalidInventory(f'Invalid plate entry {weight!r}: {pairs!r}')
+        if pairs:
+            inventory[units] = inventory.get(units, 0) + pairs
+    return tuple(sorted(inventory.items(), reverse=True))
+
+
+class PlateTable:
+    """Every reachable per-side load for one inventory"""
+
+    def __init__(self, inventory):
+        self.plates = [plate for plate, _ in inventory]
+
+        # Bounded knapsack over plate types: total -> counts per plate,
+        # keeping the fewest plates (then the heaviest plates) per total
+        loadings = {0: ()}
+        for plate, pairs in inventory:
+            extended = {}
+            for total, counts in loadings.items():
+                for count in range(pairs + 1):
+                    candidate = counts + (count,)
+                    key = total + plate * count
+                    current = extended.get(key)
+                    if current is None or self._better(candidate, current):
+                        extended[key] = candidate
+            loadings = extended
+        self.loadings = loadings
+
+        # floor[i] = heaviest reachable total <= i * step
+        self.step = reduce(gcd, self.plates, 0) or 1
+        self.max_total = max(loadings)
+        self.floor = []
+        best = 0
+        for i in range(self.max_total // self.step + 1):
+            if i * self.step in loadings:
+                best = i * self.step
+            self.floor.append(best)
+
+    @staticmethod
+    def _better(candidate, current):
+        return (sum(candidate), [-c for c in candidate]) < (sum(current), [-c for c in current])
+
+    def lookup(self, per_side_units):
+        """Heaviest reachable (total, counts) not above per_side_units"""
+        index = min(max(per_side_units, 0) // self.step, len(self.floor) - 1)
+        total = self.floor[index]
+        return total, self.loadings[total]
+
+
+@lru_cache(maxsize=64)
+def table_for(inventory):
+    return PlateTable(inventory)
+
+
+def solve(inventory, bar_weight, target_weight):
+    """
+    Loading for one target: plates per side, the weight actually loaded and
+    the per-side remainder (zero when the target is reachable exactly).
+    Raises ValueError if the target is lighter than the bar.
+    """
+    target_weight = Decimal(str(target_weight))
+    bar_weight = Decimal(str(bar_weight))
+    weight_per_side = (target_weight - bar_weight) / 2
+    if weight_per_side < 0:
+        raise ValueError('Target weight is less than bar weight')
+
+    table = table_for(inventory)
+    per_side_units = int(weight_per_side * _SCALE)
+    total, counts = table.lookup(per_side_units)
+    loaded_per_side = _from_units(total)
+    return {
+        'target_weight': float(target_weight),
+        'bar_weight': float(bar_weight),
+        'weight_per_side': float(weight_per_side),
+        'plates': [
+            {'weight': float(_from_units(plate)), 'count': count}
+            for plate, count in zip(table.plates, counts) if count
+        ],
+        'loaded_weight': float(bar_weight + loaded_per_side * 2),
+        'remainder': float(weight_per_side - loaded_per_side),
+        'exact': loaded_per_side == weight_per_side,
+    }
+
+
+def solve_many(inventory, bar_weight, target_weights):
+    """Loadings for several targets (e.g. a warm-up ramp) off one table"""
+    results = []
+    for target_weight in target_weights:
+        try:
+            results.append(solve(inventory, bar_weight, target_weight))
+        except ValueError as e:
+            results.append({'target_weight': float(target_weight), 'error': str(e), 'plates': []})
+    return results
+
+
+def _setup_key(user_id):
+    return f'tracker:plates:{user_id}'
+
+
+def _setup(settings):
+    return (
+        settings.default_bar_weight,
+        settings.weight_unit,
+        normalize_inventory(settings.weight_unit, settings.plate_inventory, settings.has_microplates),
+    )
+
+
+def setup_for(user):
+    """(bar_weight, unit, inventory) for a user, cached until their settings change"""
+    key = _setup_key(user.id)
+    setup = cache.get(key)
+    if setup is None:
+        settings, _ = UserSettings.objects.get_or_create(user=user)
+        setup = _setup(settings)
+        cache.set(key, setup, timeout=SETUP_TIMEOUT)
+    return setup
+
+
+def invalidate_user(user_id):
+    cache.delete(_setup_key(user_id))
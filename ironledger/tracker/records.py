@@ -0,0 +1,312 @@
+"""
+Personal record engine.
+
+Keeps PersonalRecord rows in sync as sets are logged, edited and deleted.
+New sets are checked against the user's current records for their
+exercises with a single locking query; editing or deleting a set that
+holds a record falls back to recomputing just that one exercise.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+from .models import LoggedSet, PersonalRecord
+
+
+WEIGHT_AT_REPS = 'weight_at_reps'
+ONE_REP_MAX = 'one_rep_max'
+_RECORD_FIELDS = ['weight', 'reps', 'estimated_1rm', 'achieved_at', 'logged_set']
+
+
+def estimate_1rm(weight, reps):
+    """Epley 1RM rounded to the precision of PersonalRecord.estimated_1rm"""
+    return Decimal(PersonalRecord.calculate_1rm(weight, reps)).quantize(Decimal('0.01'))
+
+
+def epley_1rm_expression(prefix=''):
+    """
+    SQL version of PersonalRecord.calculate_1rm for annotations.
+    `prefix` is the lookup path to the LoggedSet, e.g. 'logged_sets__'.
+    Computed as floats so integer-valued weights don't hit integer division.
+    """
+    weight = Cast(F(f'{prefix}weight'), FloatField())
+    reps = Cast(F(f'{prefix}reps'), FloatField())
+    return Case(
+        When(**{f'{prefix}reps': 1}, then=weight),
+        default=weight * (Value(1.0) + reps / Value(30.0)),
+        output_field=FloatField(),
+    )
+
+
+def _counts_for_records(weight, reps, is_warmup):
+    """Warmups and empty sets never count towards a PR"""
+    return not is_warmup and reps and reps > 0 and weight and weight > 0
+
+
+def _exercise_lookup(session_exercise):
+    """Filter kwargs identifying the exercise of a session exercise"""
+    return {
+        'global_exercise_id': session_exercise.global_exercise_id,
+        'custom_exercise_id': session_exercise.custom_exercise_id,
+    }
+
+
+def _has_exercise(lookup):
+    return lookup['global_exercise_id'] is not None or lookup['custom_exercise_id'] is not None
+
+
+def apply_set(logged_set, user_id=None):
+    """Incrementally update records with a newly logged set"""
+    apply_sets([logged_set], user_id=user_id)
+
+
+def apply_sets(logged_sets, user_id=None):
+    """
+    Incrementally update records with newly logged sets of one user.
+    One read for all the sets' exercises plus at most one insert and one
+    update, regardless of batch or history size. The records read are
+    locked until the caller's transaction ends, so concurrent sets for the
+    same exercise are compared one at a time.
+    """
+    candidates = _candidates(logged_sets)
+    if not candidates:
+        return
+    if user_id is None:
+        user_id = next(iter(candidates.values()))[-1].session_exercise.logged_workout.user_id
+
+    with transaction.atomic(savepoint=False):
+        _apply(user_id, candidates, _locked_records(user_id, candidates))
+
+
+def _apply(user_id, candidates, current):
+    """Create the candidates' missing records and raise those they beat"""
+    missing = [
+        _new_record(user_id, slot, candidates[slot])
+        for slot in candidates if slot not in current
+    ]
+    if missing:
+        # Rows a concurrent set created first are skipped; compare against those
+        PersonalRecord.objects.bulk_create(missing, ignore_conflicts=True)
+        current = _locked_records(user_id, candidates)
+
+    beaten = []
+    for slot, record in current.items():
+        weight, reps, one_rm, achieved_at, logged_set = candidates[slot]
+        if _score(slot, weight, one_rm) > _score(slot, record.weight, record.estimated_1rm or 0):
+            record.weight = weight
+            record.reps = reps
+            record.estimated_1rm = one_rm
+            record.achieved_at = achieved_at
+            record.logged_set = logged_set
+            beaten.append(record)
+    if beaten:
+        PersonalRecord.objects.bulk_update(beaten, _RECORD_FIELDS)
+
+
+def _slot(global_exercise_id, custom_exercise_id, pr_type, reps):
+    """
+    Key of the one record a set can hold per exercise and pr_type:
+    one per rep count for weight_at_reps, a single one_rep_max
+    """
+    return (global_exercise_id, custom_exercise_id, pr_type, reps if pr_type == WEIGHT_AT_REPS else None)
+
+
+def _score(slot, weight, one_rm):
+    """What a record in `slot` is ranked by"""
+    return weight if slot[2] == WEIGHT_AT_REPS else one_rm
+
+
+def _candidates(logged_sets):
+    """
+    The best of `logged_sets` for each slot, as (weight, reps, one_rm,
+    achieved_at, logged_set). On a tie the earlier set wins, as it would
+    if the sets had been logged one at a time.
+    """
+    best = {}
+    for logged_set in logged_sets:
+        lookup = _exercise_lookup(logged_set.session_exercise)
+        if not _has_exercise(lookup):
+            continue
+        if not _counts_for_records(logged_set.weight, logged_set.reps, logged_set.is_warmup):
+            continue
+        weight = Decimal(str(logged_set.weight))
+        one_rm = estimate_1rm(weight, logged_set.reps)
+        entry = (weight, logged_set.reps, one_rm, logged_set.completed_at or logged_set.started_at, logged_set)
+        for pr_type in (WEIGHT_AT_REPS, ONE_REP_MAX):
+            slot = _slot(lookup['global_exercise_id'], lookup['custom_exercise_id'], pr_type, logged_set.reps)
+            current = best.get(slot)
+            if current is None or _score(slot, weight, one_rm) > _score(slot, current[0], current[2]):
+                best[slot] = entry
+    return best
+
+
+def _new_record(user_id, slot, entry):
+    global_exercise_id, custom_exercise_id, pr_type, _ = slot
+    weight, reps, one_rm, achieved_at, logged_set = entry
+    return PersonalRecord(
+        user_id=user_id,
+        global_exercise_id=global_exercise_id,
+        custom_exercise_id=custom_exercise_id,
+        pr_type=pr_type,
+        weight=weight,
+        reps=reps,
+        estimated_1rm=one_rm,
+        achieved_at=achieved_at,
+        logged_set=logged_set,
+    )
+
+
+def _locked_records(user_id, slots, held_by=None):
+    """
+    The stored records for `slots`, by slot, locked for update. With
+    `held_by`, also any other records that set holds.
+    """
+    reps_by_exercise = defaultdict(set)
+    for global_exercise_id, custom_exercise_id, pr_type, reps in slots:
+        if pr_type == WEIGHT_AT_REPS:
+            reps_by_exercise[(global_exercise_id, custom_exercise_id)].add(reps)
+    competing = Q()
+    for (global_exercise_id, custom_exercise_id), reps in reps_by_exercise.items():
+        competing |= Q(global_exercise_id=global_exercise_id, custom_exercise_id=custom_exercise_id) & (
+            Q(pr_type=WEIGHT_AT_REPS, reps__in=sorted(reps)) | Q(pr_type=ONE_REP_MAX)
+        )
+    if held_by is not None:
+        competing |= Q(logged_set=held_by)
+    queryset = PersonalRecord.objects.select_for_update().filter(competing, user_id=user_id).order_by()
+    return {
+        _slot(pr.global_exercise_id, pr.custom_exercise_id, pr.pr_type, pr.reps): pr
+        for pr in queryset
+    }
+
+
+def update_set(logged_set, user_id=None):
+    """
+    Sync records after a set was edited.
+    If the set held a record its new values may no longer qualify, so the
+    exercise is recomputed; otherwise the edit is applied incrementally.
+    Both start from one read of the set's own and competing records.
+    """
+    session_exercise = logged_set.session_exercise
+    if user_id is None:
+        user_id = session_exercise.logged_workout.user_id
+    candidates = _candidates([logged_set])
+    with transaction.atomic(savepoint=False):
+        current = _locked_records(user_id, candidates, held_by=logged_set)
+        if any(record.logged_set_id == logged_set.id for record in current.values()):
+            rebuild_exercise(user_id, **_exercise_lookup(session_exercise))
+        elif candidates:
+            _apply(user_id, candidates, current)
+
+
+def remove_set(logged_set, user_id=None):
+    """
+    Sync records after a set was deleted.
+    Records pointing at a deleted set lose their logged_set (SET_NULL), so
+    orphaned records for the exercise mean it has to be recomputed.
+    """
+    session_exercise = logged_set.session_exercise
+    lookup = _exercise_lookup(session_exercise)
+    if not _has_exercise(lookup):
+        return
+    if user_id is None:
+        user_id = session_exercise.logged_workout.user_id
+    if PersonalRecord.objects.filter(user_id=user_id, logged_set__isnull=True, **lookup).exists():
+        rebuild_exercise(user_id, **lookup)
+
+
+def _best_records(rows):
+    """
+    Compute the record set for one exercise from
+    (set_id, weight, reps, is_warmup, achieved_at) rows.
+    """
+    best_at_reps = {}
+    best_1rm = None
+    for set_id, weight, reps, is_warmup, achieved_at in rows:
+        if not _counts_for_records(weight, reps, is_warmup):
+            continue
+        one_rm = estimate_1rm(weight, reps)
+        entry = (weight, reps, one_rm, achieved_at, set_id)
+        current = best_at_reps.get(reps)
+        if current is None or weight > current[0]:
+            best_at_reps[reps] = entry
+        if best_1rm is None or one_rm > best_1rm[2]:
+            best_1rm = entry
+
+    records = [(WEIGHT_AT_REPS, entry) for entry in best_at_reps.values()]
+    if best_1rm is not None:
+        records.append((ONE_REP_MAX, best_1rm))
+    return records
+
+
+def _build_records(user_id, lookup, best):
+    return [
+        PersonalRecord(
+            user_id=user_id,
+            pr_type=pr_type,
+            weight=weight,
+            reps=reps,
+            estimated_1rm=one_rm,
+            achieved_at=achieved_at,
+            logged_set_id=set_id,
+            **lookup
+        )
+        for pr_type, (weight, reps, one_rm, achieved_at, set_id) in best
+    ]
+
+
+_SET_ROW_FIELDS = ('id', 'weight', 'reps', 'is_warmup', 'completed_at', 'started_at')
+
+
+def _set_row(row):
+    set_id, weight, reps, is_warmup, completed_at, started_at = row
+    return set_id, weight, reps, is_warmup, completed_at or started_at
+
+
+def rebuild_exercise(user_id, global_exercise_id=None, custom_exercise_id=None):
+    """Recompute all records for one user/exercise pair from their logged sets"""
+    lookup = {
+        'global_exercise_id': global_exercise_id,
+        'custom_exercise_id': custom_exercise_id,
+    }
+    rows = LoggedSet.objects.filter(
+        session_exercise__logged_workout__user_id=user_id,
+        session_exercise__global_exercise_id=global_exercise_id,
+        session_exercise__custom_exercise_id=custom_exercise_id,
+        is_warmup=False,
+    ).values_list(*_SET_ROW_FIELDS)
+    best = _best_records(_set_row(row) for row in rows)
+
+    with transaction.atomic():
+        PersonalRecord.objects.filter(user_id=user_id, **lookup).delete()
+        PersonalRecord.objects.bulk_create(_build_records(user_id, lookup, best))
+
+
+def rebuild_user(user_id, chunk_size=2000):
+    """Recompute every record for a user in a single pass over their sets"""
+    rows_by_exercise = defaultdict(list)
+    rows = LoggedSet.objects.filter(
+        session_exercise__logged_workout__user_id=user_id,
+        is_warmup=False,
+    ).values_list(
+        'session_exercise__global_exercise_id',
+        'session_exercise__custom_exercise_id',
+        *_SET_ROW_FIELDS
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        global_id, custom_id = row[0], row[1]
+        if global_id is None and custom_id is None:
+            continue
+        rows_by_exercise[(global_id, custom_id)].append(_set_row(row[2:]))
+
+    records = []
+    for (global_id, custom_id), exercise_rows in rows_by_exercise.items():
+        lookup = {'global_exercise_id': global_id, 'custom_exercise_id': custom_id}
+        records.extend(_build_records(user_id, lookup, _best_records(exercise_rows)))
+
+    with transaction.atomic():
+        PersonalRecord.objects.filter(user_id=user_id).delete()
+        PersonalRecord.objects.bulk_create(records, batch_size=500)
+    return len(records)
@@ -0,0 +1,43 @@
+"""
+Session engine: cached_db with a bounded cache lifetime.
+
+Reads are served from the SESSION_CACHE_ALIAS cache and fall back to the
+database; every save writes through to both. Django's cached_db caches a
+session for its whole expiry age (two weeks by default), which with a
+per-process cache means a session deleted by one worker stays valid in
+the others. Here cache entries live at most SESSION_CACHE_TIMEOUT seconds.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class _CappedCache:
+    """Cache proxy that clamps every write to a maximum timeout"""
+
+    def __init__(self, cache, max_timeout):
+        self._cache = cache
+        self._max_timeout = max_timeout
+
+    def _clamp(self, timeout):
+        if timeout is None:
+            return self._max_timeout
+        return min(timeout, self._max_timeout)
+
+    def set(self, key, value, timeout=None, version=None):
+        return self._cache.set(key, value, self._clamp(timeout), version=version)
+
+    async def aset(self, key, value, timeout=None, version=None):
+        return await self._cache.aset(key, value, self._clamp(timeout), version=version)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+
+class SessionStore(CachedDBStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = _CappedCache(self._cache, settings.SESSION_CACHE_TIMEOUT)
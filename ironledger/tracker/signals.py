@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserSettings
+from . import catalog, plans, plates
+from .models import GlobalExercise, PlannedExercise, UserSettings, WorkoutPlan, plan_used
 
 
 @receiver(post_save, sender=User)
@@ -20,3 +22,39 @@ def save_user_settings(sender, instance, **kwargs):
     """
     if hasattr(instance, 'settings'):
         instance.settings.save()
+
+
+@receiver(post_save, sender=GlobalExercise)
+@receiver(post_delete, sender=GlobalExercise)
+def invalidate_exercise_catalog(sender, instance, **kwargs):
+    """
+    Bump the catalog version when an exercise changes.
+    Bumped again on commit so a catalog rebuilt by another request before
+    the transaction committed isn't kept.
+    """
+    catalog.invalidate()
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=UserSettings)
+def invalidate_plate_setup(sender, instance, **kwargs):
+    """Drop the cached bar weight and plate inventory when settings change"""
+    plates.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=WorkoutPlan)
+@receiver(post_delete, sender=WorkoutPlan)
+@receiver(post_save, sender=PlannedExercise)
+@receiver(post_delete, sender=PlannedExercise)
+def invalidate_popular_plans(sender, instance, **kwargs):
+    """Drop cached popular plan pages and the leaderboard when a plan or its exercise list changes"""
+    plans.invalidate()
+    plans.invalidate_leaderboard()
+    transaction.on_commit(plans.invalidate)
+    transaction.on_commit(plans.invalidate_leaderboard)
+
+
+@receiver(plan_used)
+def update_plan_leaderboard(sender, plan, **kwargs):
+    """Count a plan start on the cached leaderboard once it commits"""
+    transaction.on_commit(lambda: plans.record_use(plan))
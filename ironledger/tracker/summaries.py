@@ -0,0 +1,104 @@
+"""
+Denormalized per-workout summaries.
+
+LoggedWorkout carries set_count, total_volume, exercise_count and
+duration_seconds so listings never have to aggregate LoggedSet on a page
+view. Set writes adjust the counters with F() expressions, ending a
+workout recomputes its summary from the raw rows, and reconcile() checks
+and repairs drift in batches.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import LoggedWorkout
+
+
+SUMMARY_FIELDS = ['set_count', 'total_volume', 'exercise_count', 'duration_seconds']
+
+
+def set_volume(weight, reps, is_warmup):
+    """Volume a single set contributes to its workout (warmups count as zero)"""
+    if is_warmup:
+        return Decimal('0')
+    return Decimal(str(weight)) * int(reps)
+
+
+def adjust(workout_id, sets=0, volume=0):
+    """Apply a set count/volume delta to a workout with one atomic UPDATE"""
+    if not sets and not volume:
+        return
+    LoggedWorkout.objects.filter(pk=workout_id).update(
+        set_count=F('set_count') + sets,
+        total_volume=F('total_volume') + volume,
+    )
+
+
+def with_actual_summary(queryset):
+    """Annotate workouts with their summary computed from the raw rows"""
+    return queryset.annotate(
+        actual_set_count=Count('session_exercises__logged_sets'),
+        actual_total_volume=Coalesce(
+            Sum(
+                F('session_exercises__logged_sets__weight') * F('session_exercises__logged_sets__reps'),
+                filter=Q(session_exercises__logged_sets__is_warmup=False),
+            ),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        actual_exercise_count=Count('session_exercises', distinct=True),
+    )
+
+
+def _actual_duration(workout):
+    if workout.ended_at is None:
+        return None
+    return max(int((workout.ended_at - workout.started_at).total_seconds()), 0)
+
+
+def _apply_actual(workout):
+    """Copy annotated actual values onto the workout, returning True if anything drifted"""
+    actual = {
+        'set_count': workout.actual_set_count,
+        'total_volume': Decimal(str(workout.actual_total_volume)).quantize(Decimal('0.01')),
+        'exercise_count': workout.actual_exercise_count,
+        'duration_seconds': _actual_duration(workout),
+    }
+    drifted = False
+    for field, value in actual.items():
+        if getattr(workout, field) != value:
+            setattr(workout, field, value)
+            drifted = True
+    return drifted
+
+
+def refresh(workout):
+    """Recompute one workout's summary from its sets and save it"""
+    annotated = with_actual_summary(LoggedWorkout.objects.filter(pk=workout.pk)).get()
+    _apply_actual(annotated)
+    for field in SUMMARY_FIELDS:
+        setattr(workout, field, getattr(annotated, field))
+    workout.save(update_fields=SUMMARY_FIELDS)
+
+
+def reconcile(queryset=None, batch_size=500, dry_run=False):
+    """
+    Compare stored summaries with the raw data, batch by batch over
+    workout ids, and repair any that drifted.
+    Yields (checked, repaired_ids) per batch so callers can report progress.
+    """
+    if queryset is None:
+        queryset = LoggedWorkout.objects.all()
+    last_id = 0
+    while True:
+        batch = list(with_actual_summary(
+            queryset.filter(id__gt=last_id).order_by('id')
+        )[:batch_size])
+        if not batch:
+            return
+        drifted = [workout for workout in batch if _apply_actual(workout)]
+        if drifted and not dry_run:
+            LoggedWorkout.objects.bulk_update(drifted, SUMMARY_FIELDS)
+        last_id = batch[-1].id
+        yield len(batch), [workout.id for workout in drifted]
@@ -0,0 +1,412 @@
+"""
+Synthetic training histories for benchmarking.
+
+Each user gets a split (push/pull/legs, upper/lower or full body), a
+workout plan per split day, a few custom exercises and a multi-year log
+of workouts following those plans: weights progress over time with
+noise, some sessions start with a warm-up set, and sets carry realistic
+start/complete times and rest durations.
+
+Everything about user N is drawn from a Random seeded with (seed, N), so a
+given seed, end date and exercise catalog always produce the same
+dataset, however it is batched and whichever range of users is generated. Rows are written with
+bulk_create in chunks of about `batch_size` sets, one transaction per
+chunk; signals don't fire, so the summary fields, last_set_number,
+UserSettings and (unless disabled) personal records are filled in here.
+"""
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import catalog, plans, records, summaries
+from .models import (
+    CustomExercise, GlobalExercise, LoggedSet, LoggedWorkout, PlannedExercise,
+    SessionExercise, UserSettings, WorkoutPlan,
+)
+
+
+DEFAULT_BATCH_SIZE = 20000
+USER_CHUNK = 200
+
+# Created only if the catalog has fewer than MIN_CATALOG active exercises
+MIN_CATALOG = 12
+BASE_EXERCISES = [
+    ('Barbell Bench Press', 'barbell', 'chest'),
+    ('Incline Dumbbell Press', 'dumbbell', 'chest'),
+    ('Chest Fly', 'machine', 'chest'),
+    ('Barbell Row', 'barbell', 'back'),
+    ('Lat Pulldown', 'cable', 'back'),
+    ('Deadlift', 'barbell', 'back'),
+    ('Back Squat', 'barbell', 'legs'),
+    ('Leg Press', 'machine', 'legs'),
+    ('Leg Curl', 'machine', 'legs'),
+    ('Overhead Press', 'barbell', 'shoulders'),
+    ('Cable Lateral Raises', 'cable', 'shoulders'),
+    ('Preacher Curl', 'machine', 'arms'),
+    ('Tricep Pushdown', 'cable', 'arms'),
+    ('Hanging Leg Raise', 'bodyweight', 'core'),
+]
+
+CUSTOM_EXERCISES = [
+    ('Landmine Press', 'barbell', 'shoulders'),
+    ('Meadows Row', 'barbell', 'back'),
+    ('Sissy Squat', 'bodyweight', 'legs'),
+    ('Spider Curl', 'dumbbell', 'arms'),
+    ('Pec Deck', 'machine', 'chest'),
+    ('Cable Crunch', 'cable', 'core'),
+    ('Hip Thrust', 'barbell', 'legs'),
+    ('Seal Row', 'barbell', 'back'),
+]
+
+SPLITS = {
+    'ppl': [
+        ('Push', ['chest', 'shoulders', 'arms']),
+        ('Pull', ['back', 'arms']),
+        ('Legs', ['legs', 'core']),
+    ],
+    'upper_lower': [
+        ('Upper', ['chest', 'back', 'shoulders', 'arms']),
+        ('Lower', ['legs', 'core']),
+    ],
+    'full_body': [
+        ('Full Body A', ['legs', 'chest', 'back', 'core']),
+        ('Full Body B', ['legs', 'shoulders', 'back', 'arms']),
+    ],
+}
+
+# Starting working weight range (lbs) by equipment
+START_WEIGHTS = {
+    'barbell': (65, 185),
+    'dumbbell': (15, 50),
+    'cable': (30, 90),
+    'machine': (60, 200),
+    'bodyweight': (0, 0),
+    'other': (20, 80),
+}
+
+
+SET_COLUMNS = [
+    'session_exercise', 'set_number', 'weight', 'reps', 'is_warmup', 'is_dropset',
+    'started_at', 'completed_at', 'rest_duration', 'notes',
+]
+
+
+def _insert_sets_sql():
+    quote = connection.ops.quote_name
+    columns = [LoggedSet._meta.get_field(name).column for name in SET_COLUMNS]
+    return (
+        f'INSERT INTO {quote(LoggedSet._meta.db_table)} ({", ".join(quote(column) for column in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+
+
+def username(prefix, index):
+    return f'{prefix}{index:06d}'
+
+
+def _round_weight(weight, increment_type):
+    step = 1 if increment_type == 'pin' else 2.5
+    return Decimal(f'{max(round(weight / step) * step, 0):.2f}')
+
+
+class Generator:
+    """
+    Builds users `start`..`start + users - 1`. `progress` is called after
+    every committed chunk with the running stats dict.
+    """
+
+    def __init__(self, users, years=3, workouts_per_week=3.5, seed=0, start=0, end_date=None,
+                 prefix='synthetic', password='synthetic', shared_ratio=0.3,
+                 batch_size=DEFAULT_BATCH_SIZE, with_records=True, progress=None):
+        self.users = users
+        self.years = years
+        self.workouts_per_week = workouts_per_week
+        self.seed = seed
+        self.start = start
+        self.end = timezone.make_aware(datetime.combine(end_date or timezone.localdate(), time.min))
+        self.history_start = self.end - timedelta(days=round(365.25 * years))
+        self.prefix = prefix
+        self.password = password
+        self.shared_ratio = shared_ratio
+        self.batch_size = batch_size
+        self.with_records = with_records
+        self.progress = progress
+        self.stats = {
+            'users': 0,
+            'plans': 0,
+            'custom_exercises': 0,
+            'workouts': 0,
+            'session_exercises': 0,
+            'sets': 0,
+            'global_exercises_created': 0,
+        }
+        self._pending = []
+        self._pending_sets = 0
+
+    def username(self, index):
+        return username(self.prefix, index)
+
+    def run(self):
+        """Generate everything; returns the stats dict"""
+        pool = self._exercise_pool()
+        password = make_password(self.password)
+        indexes = range(self.start, self.start + self.users)
+        for offset in range(0, len(indexes), USER_CHUNK):
+            chunk = indexes[offset:offset + USER_CHUNK]
+            profiles = [self._profile(index, pool) for index in chunk]
+            self._create_users(profiles, password)
+            for profile in profiles:
+                self._history(profile)
+            self._flush()
+            WorkoutPlan.objects.bulk_update(
+                [plan for profile in profiles for plan in profile['plans']], ['times_used'], batch_size=1000
+            )
+            if self.with_records:
+                for profile in profiles:
+                    records.rebuild_user(profile['user'].id)
+        # Plans were bulk-created, which skips the signals that drop these
+        plans.invalidate()
+        plans.invalidate_leaderboard()
+        return self.stats
+
+    def _exercise_pool(self):
+        """Active global exercises as (id, muscle, equipment, increment) rows"""
+        exercises = catalog.active_exercises()
+        if len(exercises) < MIN_CATALOG:
+            existing = {exercise.name.lower() for exercise in catalog.exercises_by_id().values()}
+            created = GlobalExercise.objects.bulk_create([
+                GlobalExercise(
+                    name=name,
+                    equipment_type=equipment,
+                    primary_muscle_group=muscle,
+                    weight_increment_type='pin' if equipment in ('cable', 'machine') else 'plate',
+                )
+                for name, equipment, muscle in BASE_EXERCISES if name.lower() not in existing
+            ])
+            # bulk_create skips the post_save signal that normally does this
+            catalog.invalidate()
+            self.stats['global_exercises_created'] = len(created)
+            exercises = catalog.active_exercises()
+        return [
+            (exercise.id, exercise.primary_muscle_group, exercise.equipment_type, exercise.weight_increment_type)
+            for exercise in exercises
+        ]
+
+    def _profile(self, index, pool):
+        """Everything about one user, drawn from their own Random"""
+        rng = random.Random(f'{self.seed}:{index}')
+        customs = rng.sample(CUSTOM_EXERCISES, rng.randint(0, 3))
+        split = rng.choice(sorted(SPLITS))
+
+        days = []
+        for day_name, muscles in SPLITS[split]:
+            candidates = [('global', row) for row in pool if row[1] in muscles]
+            candidates += [('custom', (i, muscle, equipment, 'plate'))
+                           for i, (_, equipment, muscle) in enumerate(customs) if muscle in muscles]
+            if len(candidates) < 3:
+                candidates += [('global', row) for row in pool if row[1] not in muscles]
+            chosen = rng.sample(candidates, min(len(candidates), rng.randint(4, 6)))
+            days.append((day_name, [
+                {
+                    'kind': kind,
+                    'ref': row[0],
+                    'increment': row[3],
+                    'start_weight': rng.uniform(*START_WEIGHTS[row[2]]),
+                    'target_sets': rng.choice((3, 3, 4, 4, 5)),
+                    'target_reps': rng.choice((5, 8, 8, 10, 12)),
+                }
+                for kind, row in chosen
+            ]))
+
+        return {
+            'index': index,
+            'rng': rng,
+            'split': split,
+            'customs': customs,
+            'days': days,
+            'shared': rng.random() < self.shared_ratio,
+            'strength': rng.uniform(0.6, 1.4),
+            'growth': rng.uniform(0.1, 0.6),
+        }
+
+    def _create_users(self, profiles, password):
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=self.username(profile['index']), password=password, date_joined=self.history_start)
+                for profile in profiles
+            ])
+            # bulk_create skips the post_save signal that creates settings
+            UserSettings.objects.bulk_create([UserSettings(user=user) for user in users])
+
+            customs = []
+            for user, profile in zip(users, profiles):
+                profile['user'] = user
+                profile['custom_objects'] = [
+                    CustomExercise(user=user, name=name, equipment_type=equipment, primary_muscle_group=muscle)
+                    for name, equipment, muscle in profile['customs']
+                ]
+                customs.extend(profile['custom_objects'])
+            CustomExercise.objects.bulk_create(customs)
+
+            all_plans = []
+            for profile in profiles:
+                profile['plans'] = [
+                    WorkoutPlan(
+                        user=profile['user'],
+                        name=f'{day_name} ({profile["split"].replace("_", " ")})',
+                        privacy='shared' if profile['shared'] else 'private',
+                        tags=f'Synthetic,{day_name}',
+                    )
+                    for day_name, _ in profile['days']
+                ]
+                all_plans.extend(profile['plans'])
+            WorkoutPlan.objects.bulk_create(all_plans)
+
+            planned = []
+            for profile in profiles:
+                for plan, (_, exercises) in zip(profile['plans'], profile['days']):
+                    for order, exercise in enumerate(exercises, 1):
+                        planned.append(PlannedExercise(
+                            workout_plan=plan,
+                            order=order,
+                            target_sets=exercise['target_sets'],
+                            target_reps=exercise['target_reps'],
+                            **self._exercise_fields(profile, exercise),
+                        ))
+            PlannedExercise.objects.bulk_create(planned, batch_size=1000)
+
+        self.stats['users'] += len(users)
+        self.stats['custom_exercises'] += len(customs)
+        self.stats['plans'] += len(all_plans)
+
+    @staticmethod
+    def _exercise_fields(profile, exercise):
+        if exercise['kind'] == 'global':
+            return {'global_exercise_id': exercise['ref']}
+        return {'custom_exercise_id': profile['custom_objects'][exercise['ref']].id}
+
+    def _history(self, profile):
+        """Queue every workout of one user's history"""
+        rng = profile['rng']
+        total_days = (self.end - self.history_start).days
+        chance = min(self.workouts_per_week / 7, 1)
+        rotation = 0
+        for day in range(total_days):
+            if rng.random() >= chance:
+                continue
+            slot = rotation % len(profile['days'])
+            rotation += 1
+            started_at = self.history_start + timedelta(
+                days=day, hours=rng.randint(6, 20), minutes=rng.randint(0, 59)
+            )
+            self._workout(profile, slot, started_at, progress=day / total_days)
+
+    def _workout(self, profile, slot, started_at, progress):
+        rng = profile['rng']
+        plan = profile['plans'][slot]
+        exercises = profile['days'][slot][1]
+        plan.times_used += 1
+
+        workout = LoggedWorkout(
+            user=profile['user'],
+            workout_plan=plan,
+            name=plan.name,
+            started_at=started_at,
+        )
+        clock = started_at
+        volume = Decimal('0')
+        set_count = 0
+        sessions = []
+        for order, exercise in enumerate(exercises, 1):
+            # Now and then an exercise is skipped
+            if rng.random() < 0.08:
+                continue
+            rest_before = rng.randint(60, 240) if sessions else None
+            clock += timedelta(seconds=rest_before or rng.randint(60, 300))
+            session_ex = SessionExercise(
+                order=order,
+                started_at=clock,
+                rest_before_duration=rest_before,
+                **self._exercise_fields(profile, exercise),
+            )
+            working = exercise['start_weight'] * profile['strength'] * (1 + profile['growth'] * progress)
+
+            sets = []
+            plan_sets = [True] if rng.random() < 0.3 else []
+            plan_sets += [False] * max(exercise['target_sets'] + rng.choice((-1, 0, 0, 0, 1)), 1)
+            for set_number, is_warmup in enumerate(plan_sets, 1):
+                weight = _round_weight(
+                    working * (0.5 if is_warmup else rng.uniform(0.95, 1.03)), exercise['increment']
+                )
+                reps = max(exercise['target_reps'] + rng.randint(-2, 2) + (4 if is_warmup else 0), 1)
+                set_started = clock
+                clock += timedelta(seconds=rng.randint(15, 60))
+                rest = rng.randint(60, 180) if set_number < len(plan_sets) else None
+                sets.append((set_number, weight, reps, is_warmup, set_started, clock, rest))
+                volume += summaries.set_volume(weight, reps, is_warmup)
+                clock += timedelta(seconds=rest or 0)
+
+            session_ex.completed_at = clock
+            session_ex.last_set_number = len(sets)
+            sessions.append((session_ex, sets))
+            set_count += len(sets)
+
+        workout.ended_at = clock
+        workout.set_count = set_count
+        workout.total_volume = volume
+        workout.exercise_count = len(sessions)
+        workout.duration_seconds = int((clock - started_at).total_seconds())
+
+        self._pending.append((workout, sessions))
+        self._pending_sets += set_count
+        if self._pending_sets >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with transaction.atomic():
+            workouts = LoggedWorkout.objects.bulk_create(
+                [workout for workout, _ in self._pending], batch_size=1000
+            )
+            session_exercises = []
+            for workout, sessions in self._pending:
+                for session_ex, _ in sessions:
+                    session_ex.logged_workout = workout
+                    session_exercises.append(session_ex)
+            SessionExercise.objects.bulk_create(session_exercises, batch_size=1000)
+
+            set_count = self._insert_sets(self._pending)
+
+        self.stats['workouts'] += len(workouts)
+        self.stats['session_exercises'] += len(session_exercises)
+        self.stats['sets'] += set_count
+        self._pending = []
+        self._pending_sets = 0
+        if self.progress:
+            self.progress(self.stats)
+
+    @staticmethod
+    def _insert_sets(pending):
+        """
+        Write the queued sets with one executemany. Sets are ~85% of the
+        rows, and building LoggedSet instances for bulk_create costs several
+        times more than the insert itself.
+        """
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        adapt_decimal = connection.ops.adapt_decimalfield_value
+        rows = [
+            (session_ex.id, set_number, adapt_decimal(weight, 6, 2), reps, is_warmup, False,
+             adapt_datetime(started_at), adapt_datetime(completed_at), rest, '')
+            for _, sessions in pending
+            for session_ex, sets in sessions
+            for set_number, weight, reps, is_warmup, started_at, completed_at, rest in sets
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(_insert_sets_sql(), rows)
+        return len(rows)
@@ -1,11 +1,45 @@
-from django.test import TestCase, Client
+from django.conf import settings as django_settings
+from django.test import TestCase, LiveServerTestCase, Client, AsyncRequestFactory, RequestFactory, override_settings, tag
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.http import HttpResponse
 from django.urls import reverse
+from django.utils import timezone
+from datetime import datetime, timedelta
+from decimal import Decimal
+from asgiref.sync import iscoroutinefunction
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import SkipTest, mock
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
 from .models import (
     GlobalExercise, CustomExercise, WorkoutPlan, PlannedExercise,
-    LoggedWorkout, SessionExercise, LoggedSet, UserSettings
+    LoggedWorkout, SessionExercise, LoggedSet, UserSettings, PersonalRecord
 )
 from .forms import SignUpForm, LoginForm
+from .middleware import QueryBudgetExceeded, StaticFilesMiddleware
+from ironledger.log import QueueListenerHandler
+from .analytics import lttb
+from .sessions import SessionStore, _CappedCache
+from . import benchmarks, catalog, exports, live, loadtest, plans, plates, records, synthetic, views, workout_state
+from . import urls as tracker_urls
+from .management.commands import load_test as load_test_command
 
 
 class ModelTests(TestCase):
@@ -371,3 +405,2080 @@ class IntegrationTests(TestCase):
             reverse('active_workout', args=[workout.id])
         )
         self.assertEqual(response.status_code, 200)
+
+
+class IndexUsageTests(TestCase):
+    """Test that the hot lookup paths are served by the composite indexes"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        self.session_ex = SessionExercise.objects.create(
+            logged_workout=self.workout,
+            global_exercise=exercise,
+            order=1
+        )
+    
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+    
+    def test_recent_workouts_use_index(self):
+        """Test dashboard recent workouts query uses (user, -started_at) WHERE is_active"""
+        qs = LoggedWorkout.objects.filter(user=self.user, is_active=True).order_by('-started_at')[:5]
+        self.assertUsesIndex(qs, 'workout_user_recent_idx')
+    
+    def test_in_progress_workout_uses_partial_index(self):
+        """Test active workout lookup uses the partial in-progress index"""
+        qs = LoggedWorkout.objects.filter(user=self.user, ended_at__isnull=True)
+        self.assertUsesIndex(qs, 'workout_user_in_progress_idx')
+    
+    def test_current_exercise_uses_index(self):
+        """Test current exercise lookup uses (logged_workout, completed_at, order)"""
+        qs = SessionExercise.objects.filter(
+            logged_workout=self.workout,
+            completed_at__isnull=True
+        ).order_by('order')
+        self.assertUsesIndex(qs, 'session_ex_progress_idx')
+    
+    def test_sets_by_number_use_unique_constraint(self):
+        """Test set listing is served by the UNIQUE(session_exercise, set_number) index"""
+        qs = LoggedSet.objects.filter(session_exercise=self.session_ex).order_by('set_number')
+        if connection.vendor == 'sqlite':
+            # SQLite backs inline unique constraints with an anonymous autoindex
+            self.assertUsesIndex(qs, 'sqlite_autoindex_tracker_loggedset')
+            self.assertNotIn('TEMP B-TREE', qs.explain())
+        else:
+            self.assertUsesIndex(qs, 'unique_set_number')
+    
+    def test_shared_plans_use_index(self):
+        """Test shared plan listing uses (privacy, is_active, -times_used)"""
+        qs = WorkoutPlan.objects.filter(privacy='shared', is_active=True).order_by('-times_used')[:5]
+        self.assertUsesIndex(qs, 'plan_privacy_popular_idx')
+
+
+class PersonalRecordTests(TestCase):
+    """Test personal records stay in sync with set writes"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercise = GlobalExercise.objects.create(
+            name='Bench Press',
+            equipment_type='barbell',
+            primary_muscle_group='chest'
+        )
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        self.session_ex = SessionExercise.objects.create(
+            logged_workout=workout,
+            global_exercise=self.exercise,
+            order=1
+        )
+    
+    def log_set(self, weight, reps, **extra):
+        response = self.client.post(
+            reverse('add_set', args=[self.session_ex.id]),
+            data=json.dumps({'weight': weight, 'reps': reps, **extra}),
+            content_type='application/json'
+        )
+        return response.json()['set_id']
+    
+    def record(self, pr_type, reps=None):
+        qs = PersonalRecord.objects.filter(user=self.user, global_exercise=self.exercise, pr_type=pr_type)
+        if reps is not None:
+            qs = qs.filter(reps=reps)
+        return qs.get()
+    
+    def test_calculate_1rm_accepts_decimal(self):
+        """Test Epley 1RM works with DecimalField weights"""
+        self.assertEqual(PersonalRecord.calculate_1rm(Decimal('300'), 3), Decimal('330'))
+        self.assertEqual(PersonalRecord.calculate_1rm(Decimal('225'), 1), Decimal('225'))
+    
+    def test_add_set_creates_records(self):
+        """Test logging a set creates weight-at-reps and 1RM records"""
+        set_id = self.log_set(200, 5)
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, set_id)
+        self.assertEqual(self.record('one_rep_max').estimated_1rm, Decimal('233.33'))
+    
+    def test_warmup_sets_are_ignored(self):
+        """Test warmup sets never become records"""
+        self.log_set(135, 10, is_warmup=True)
+        self.assertFalse(PersonalRecord.objects.exists())
+    
+    def test_heavier_set_replaces_record(self):
+        """Test a heavier set at the same reps replaces the record"""
+        self.log_set(200, 5)
+        heavier_id = self.log_set(210, 5)
+        self.log_set(190, 5)
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, heavier_id)
+        self.assertEqual(self.record('one_rep_max').logged_set_id, heavier_id)
+    
+    def test_delete_record_set_falls_back(self):
+        """Test deleting the record-holding set recomputes from remaining sets"""
+        first_id = self.log_set(200, 5)
+        heavier_id = self.log_set(210, 5)
+        self.client.post(reverse('delete_set', args=[heavier_id]))
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, first_id)
+        self.assertEqual(self.record('one_rep_max').logged_set_id, first_id)
+    
+    def test_edit_record_set_recomputes(self):
+        """Test lowering the record-holding set hands the record to another set"""
+        first_id = self.log_set(200, 5)
+        heavier_id = self.log_set(210, 5)
+        self.client.post(
+            reverse('update_set', args=[heavier_id]),
+            data=json.dumps({'weight': 150}),
+            content_type='application/json'
+        )
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, first_id)
+    
+    def test_records_are_unique_per_key(self):
+        """Test the database rejects a second record for the same exercise and reps"""
+        self.log_set(200, 5)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PersonalRecord.objects.create(
+                user=self.user, global_exercise=self.exercise, pr_type='weight_at_reps', weight=150, reps=5
+            )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PersonalRecord.objects.create(
+                user=self.user, global_exercise=self.exercise, pr_type='one_rep_max', weight=150, reps=3
+            )
+    
+    def test_record_created_concurrently_is_compared(self):
+        """Test a set that loses the race to create a record is compared against the winner"""
+        self.log_set(200, 5)
+        logged_set = LoggedSet.objects.create(session_exercise=self.session_ex, set_number=2, weight=210, reps=5)
+        locked_records = records._locked_records
+        reads = []
+        
+        def stale_first_read(*args):
+            # As if this set's read ran before the other request's insert
+            reads.append(args)
+            return {} if len(reads) == 1 else locked_records(*args)
+        
+        records._locked_records = stale_first_read
+        try:
+            records.apply_set(logged_set)
+        finally:
+            records._locked_records = locked_records
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(PersonalRecord.objects.count(), 2)
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, logged_set.id)
+        self.assertEqual(self.record('one_rep_max').logged_set_id, logged_set.id)
+    
+    def test_batch_matches_sets_logged_one_at_a_time(self):
+        """Test a batch reads records once and keeps the best set per slot, earlier set on ties"""
+        existing = self.log_set(190, 5)
+        sets = [
+            {'session_exercise_id': self.session_ex.id, 'weight': weight, 'reps': reps}
+            for weight, reps in [(180, 5), (200, 5), (200, 5), (150, 8), (100, 12)]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('add_sets_bulk'), data=json.dumps({'sets': sets}), content_type='application/json'
+            )
+        set_ids = [result['set_id'] for result in response.json()['results']]
+        record_reads = [q for q in queries.captured_queries
+                        if q['sql'].startswith('SELECT') and 'tracker_personalrecord' in q['sql']]
+        # One read, and one more after inserting the records for 8 and 12 reps
+        self.assertEqual(len(record_reads), 2)
+        self.assertEqual(self.record('weight_at_reps', reps=5).logged_set_id, set_ids[1])
+        self.assertEqual(self.record('weight_at_reps', reps=8).logged_set_id, set_ids[3])
+        self.assertEqual(self.record('weight_at_reps', reps=12).logged_set_id, set_ids[4])
+        self.assertEqual(self.record('one_rep_max').logged_set_id, set_ids[1])
+        self.assertNotEqual(self.record('one_rep_max').logged_set_id, existing)
+    
+    def test_rebuild_command(self):
+        """Test rebuild_personal_records backfills records from existing sets"""
+        LoggedSet.objects.create(session_exercise=self.session_ex, set_number=1, weight=100, reps=8)
+        best = LoggedSet.objects.create(session_exercise=self.session_ex, set_number=2, weight=120, reps=8)
+        call_command('rebuild_personal_records', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.record('weight_at_reps', reps=8).logged_set_id, best.id)
+        self.assertEqual(self.record('one_rep_max').logged_set_id, best.id)
+
+
+class BulkSetTests(TestCase):
+    """Test the batch set-logging endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        self.squat = SessionExercise.objects.create(logged_workout=workout, global_exercise=exercise, order=1)
+        self.lunge = SessionExercise.objects.create(logged_workout=workout, global_exercise=exercise, order=2)
+    
+    def post_sets(self, sets):
+        response = self.client.post(
+            reverse('add_sets_bulk'),
+            data=json.dumps({'sets': sets}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+    
+    def test_sets_numbered_per_exercise(self):
+        """Test set numbers continue from existing sets for each exercise"""
+        LoggedSet.objects.create(
+            session_exercise=self.squat,
+            set_number=self.squat.allocate_set_numbers(),
+            weight=135,
+            reps=5
+        )
+        results = self.post_sets([
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5},
+            {'session_exercise_id': self.lunge.id, 'weight': 50, 'reps': 10, 'rest_duration': 120},
+            {'session_exercise_id': self.squat.id, 'weight': 205, 'reps': 3},
+        ])
+        self.assertEqual([r['set_number'] for r in results], [2, 1, 3])
+        self.assertTrue(all(r['status'] == 'created' and r['set_id'] for r in results))
+        self.lunge.refresh_from_db()
+        self.assertEqual(self.lunge.rest_before_duration, 120)
+    
+    def test_retry_with_idempotency_keys_is_deduplicated(self):
+        """Test replaying a batch does not create duplicate sets"""
+        batch = [
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5, 'idempotency_key': 'a'},
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5, 'idempotency_key': 'b'},
+        ]
+        first = self.post_sets(batch)
+        retry = self.post_sets(batch + [
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5, 'idempotency_key': 'c'},
+        ])
+        self.assertEqual([r['status'] for r in retry], ['duplicate', 'duplicate', 'created'])
+        self.assertEqual([r['set_id'] for r in retry[:2]], [r['set_id'] for r in first])
+        self.assertEqual(retry[2]['set_number'], 3)
+        self.assertEqual(LoggedSet.objects.filter(session_exercise=self.squat).count(), 3)
+    
+    def test_duplicate_key_within_batch(self):
+        """Test a key repeated inside one batch only logs one set"""
+        results = self.post_sets([
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5, 'idempotency_key': 'a'},
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5, 'idempotency_key': 'a'},
+        ])
+        self.assertEqual([r['status'] for r in results], ['created', 'duplicate'])
+        self.assertEqual(results[0]['set_id'], results[1]['set_id'])
+    
+    def test_per_item_errors(self):
+        """Test invalid items and other users' exercises fail individually"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        other_workout = LoggedWorkout.objects.create(user=other, name='Other')
+        other_ex = SessionExercise.objects.create(
+            logged_workout=other_workout,
+            global_exercise=self.squat.global_exercise,
+            order=1
+        )
+        results = self.post_sets([
+            {'session_exercise_id': other_ex.id, 'weight': 185, 'reps': 5},
+            {'weight': 185, 'reps': 5},
+            {'session_exercise_id': self.squat.id, 'weight': 185, 'reps': 5},
+        ])
+        self.assertEqual([r['status'] for r in results], ['error', 'error', 'created'])
+        self.assertFalse(LoggedSet.objects.filter(session_exercise=other_ex).exists())
+
+
+@tag('concurrency')
+class SetNumberConcurrencyTests(LiveServerTestCase):
+    """Test parallel add_set calls against a threaded server"""
+    
+    CSRF_TOKEN = 'a' * 32
+    
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest('needs a file database; set TEST_DATABASE_NAME=test_db.sqlite3')
+        super().setUpClass()
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        client = Client()
+        client.login(username='testuser', password='testpass123')
+        self.session_cookie = client.cookies[django_settings.SESSION_COOKIE_NAME].value
+        exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        self.session_ex = SessionExercise.objects.create(logged_workout=workout, global_exercise=exercise, order=1)
+    
+    def post_set(self, reps):
+        request = urllib.request.Request(
+            self.live_server_url + reverse('add_set', args=[self.session_ex.id]),
+            data=json.dumps({'weight': 135, 'reps': reps}).encode(),
+            headers={
+                'Content-Type': 'application/json',
+                'X-CSRFToken': self.CSRF_TOKEN,
+                'Cookie': f'{django_settings.SESSION_COOKIE_NAME}={self.session_cookie}; '
+                          f'{django_settings.CSRF_COOKIE_NAME}={self.CSRF_TOKEN}',
+            },
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read())['set_number']
+    
+    def test_parallel_add_set_has_no_gaps_or_duplicates(self):
+        """Test simultaneous taps get distinct, contiguous set numbers"""
+        total = 20
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            returned = sorted(pool.map(self.post_set, range(1, total + 1)))
+        
+        stored = sorted(LoggedSet.objects.filter(session_exercise=self.session_ex).values_list('set_number', flat=True))
+        self.assertEqual(returned, list(range(1, total + 1)))
+        self.assertEqual(stored, list(range(1, total + 1)))
+        self.session_ex.refresh_from_db()
+        self.assertEqual(self.session_ex.last_set_number, total)
+
+
+class ReorderTests(TestCase):
+    """Test exercise reordering during a workout"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+    
+    def make_workout(self, size):
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        exercises = [
+            SessionExercise.objects.create(logged_workout=workout, global_exercise=self.exercise, order=order)
+            for order in range(1, size + 1)
+        ]
+        return workout, [ex.id for ex in exercises]
+    
+    def orders(self, workout, incomplete_only=False):
+        exercises = workout.session_exercises.all()
+        if incomplete_only:
+            exercises = exercises.filter(completed_at__isnull=True)
+        return list(exercises.order_by('order').values_list('id', flat=True))
+    
+    def select_next(self, current_id, next_id):
+        return self.client.post(reverse('select_next_exercise', args=[current_id, next_id]))
+    
+    def test_select_next_exercise_moves_selection_first(self):
+        """Test the selected exercise becomes next and the rest keep their order"""
+        workout, ids = self.make_workout(5)
+        response = self.select_next(ids[0], ids[3])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.orders(workout, incomplete_only=True), [ids[3], ids[1], ids[2], ids[4]])
+    
+    def test_select_next_exercise_query_count_is_constant(self):
+        """Test reordering costs the same number of queries for small and large workouts"""
+        self.select_next(*self.make_workout(2)[1][:2])  # warm up session/auth caches
+        _, small = self.make_workout(3)
+        _, large = self.make_workout(15)
+        # session, user, both exercises, savepoint, completion, id list, reorder, release
+        with self.assertNumQueries(8):
+            self.select_next(small[0], small[2])
+        with self.assertNumQueries(8):
+            self.select_next(large[0], large[14])
+    
+    def test_move_exercise_to_position(self):
+        """Test moving one exercise to position k"""
+        workout, ids = self.make_workout(4)
+        response = self.client.post(
+            reverse('reorder_exercises', args=[workout.id]),
+            data=json.dumps({'session_exercise_id': ids[0], 'position': 3}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.orders(workout), [ids[1], ids[2], ids[0], ids[3]])
+    
+    def test_apply_full_order(self):
+        """Test applying a full drag-and-drop order in one request"""
+        workout, ids = self.make_workout(3)
+        new_order = [ids[2], ids[0], ids[1]]
+        with self.assertNumQueries(1):
+            workout.reorder_exercises(new_order)
+        response = self.client.post(
+            reverse('reorder_exercises', args=[workout.id]),
+            data=json.dumps({'order': list(reversed(new_order))}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.orders(workout), list(reversed(new_order)))
+    
+    def test_reorder_rejects_foreign_exercises(self):
+        """Test exercises from another workout cannot be reordered"""
+        workout, ids = self.make_workout(2)
+        _, other_ids = self.make_workout(1)
+        response = self.client.post(
+            reverse('reorder_exercises', args=[workout.id]),
+            data=json.dumps({'order': ids + other_ids}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_reorder_rejects_incomplete_order(self):
+        """Test a full order must list exactly the workout's exercises, each once"""
+        workout, ids = self.make_workout(3)
+        _, other_ids = self.make_workout(1)
+        for order in ([ids[2], ids[1]], [ids[2], ids[1], other_ids[0]], [ids[2], ids[1], ids[1]]):
+            response = self.client.post(
+                reverse('reorder_exercises', args=[workout.id]),
+                data=json.dumps({'order': order}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.orders(workout), ids)
+
+
+@override_settings(QUERY_INSTRUMENTATION=True, QUERY_BUDGETS_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Test every tracker URL stays within its QUERY_BUDGETS entry"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        exercises = [
+            GlobalExercise.objects.create(name=f'Exercise {i}', equipment_type='barbell', primary_muscle_group='chest')
+            for i in range(4)
+        ]
+        self.plan = WorkoutPlan.objects.create(user=self.user, name='Plan', privacy='shared')
+        for order, exercise in enumerate(exercises, 1):
+            PlannedExercise.objects.create(workout_plan=self.plan, global_exercise=exercise, order=order)
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        self.session_exercises = [
+            SessionExercise.objects.create(logged_workout=self.workout, global_exercise=exercise, order=order)
+            for order, exercise in enumerate(exercises, 1)
+        ]
+        self.sets = [
+            LoggedSet.objects.create(
+                session_exercise=session_ex,
+                set_number=session_ex.allocate_set_numbers(),
+                weight=100,
+                reps=5
+            )
+            for session_ex in self.session_exercises for _ in range(3)
+        ]
+    
+    def requests_by_url_name(self):
+        """One representative request per URL name: (method, args, JSON body)"""
+        first, second = self.session_exercises[:2]
+        set_body = {'weight': 105, 'reps': 5}
+        return {
+            'home': ('get', [], None),
+            'signup': ('get', [], None),
+            'login': ('get', [], None),
+            'logout': ('get', [], None),
+            'dashboard': ('get', [], None),
+            'workout_plans_list': ('get', [], None),
+            'start_workout': ('get', [], None),
+            'start_workout_from_plan': ('get', [self.plan.id], None),
+            'active_workout': ('get', [self.workout.id], None),
+            'end_workout': ('get', [self.workout.id], None),
+            'workout_detail': ('get', [self.workout.id], None),
+            'workout_history': ('get', [], None),
+            'api_workout_state': ('get', [self.workout.id], None),
+            'workout_events': ('get', [self.workout.id], None),
+            'api_workouts': ('get', [], {'limit': 2}),
+            'exercise_progress': ('get', [], {'exercise': first.global_exercise_id}),
+            'export_training_log': ('get', [], None),
+            'import_training_log': ('get', [], None),
+            'add_set': ('post', [first.id], set_body),
+            'add_sets_bulk': ('post', [], {'sets': [dict(set_body, session_exercise_id=first.id)] * 3}),
+            'update_set': ('post', [self.sets[0].id], set_body),
+            'delete_set': ('post', [self.sets[1].id], None),
+            'complete_exercise': ('post', [first.id], None),
+            'select_next_exercise': ('post', [first.id, second.id], None),
+            'reorder_exercises': ('post', [self.workout.id], {'session_exercise_id': second.id, 'position': 1}),
+            'calculate_plates': ('get', [], {'weight': 225}),
+        }
+    
+    def test_every_url_has_a_budget_and_a_request(self):
+        """Test new URLs can't be added without a budget"""
+        url_names = {pattern.name for pattern in tracker_urls.urlpatterns}
+        self.assertEqual(url_names, set(self.requests_by_url_name()))
+        self.assertEqual(url_names - set(django_settings.QUERY_BUDGETS), set())
+    
+    def test_views_within_query_budget(self):
+        """Test each view's query count against its budget (QueryBudgetExceeded fails the test)"""
+        for url_name, (method, args, body) in self.requests_by_url_name().items():
+            with self.subTest(url_name=url_name):
+                # logout ends the session, so start every request logged in
+                self.client.login(username='testuser', password='testpass123')
+                url = reverse(url_name, args=args)
+                if method == 'get':
+                    response = self.client.get(url, body or {})
+                else:
+                    response = self.client.post(url, data=json.dumps(body or {}), content_type='application/json')
+                self.assertIn('Server-Timing', response)
+                self.assertLess(response.status_code, 400)
+    
+    def test_over_budget_view_fails(self):
+        """Test strict mode raises when a view exceeds its budget"""
+        with override_settings(QUERY_BUDGETS={'dashboard': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('dashboard'))
+
+
+class WorkoutDetailTests(TestCase):
+    """Test the workout detail page"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def make_workout(self, size, sets_per_exercise=3):
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        custom = CustomExercise.objects.create(user=self.user, name=f'Custom {size}', primary_muscle_group='arms')
+        for order in range(1, size + 1):
+            exercise = GlobalExercise.objects.create(
+                name=f'Exercise {size}-{order}',
+                equipment_type='barbell',
+                primary_muscle_group='chest'
+            )
+            session_ex = SessionExercise.objects.create(
+                logged_workout=workout,
+                global_exercise=exercise if order % 2 else None,
+                custom_exercise=None if order % 2 else custom,
+                order=order
+            )
+            for set_number in range(1, sets_per_exercise + 1):
+                LoggedSet.objects.create(
+                    session_exercise=session_ex,
+                    set_number=set_number,
+                    weight=100 + set_number * 10,
+                    reps=5,
+                    rest_duration=90
+                )
+        return workout
+    
+    def test_constant_queries_regardless_of_size(self):
+        """Test workout detail runs the same queries for 2 and 12 exercises"""
+        small = self.make_workout(2)
+        large = self.make_workout(12, sets_per_exercise=5)
+        # session, user, workout, exercises with aggregates, prefetched sets
+        with self.assertNumQueries(5):
+            self.client.get(reverse('workout_detail', args=[small.id]))
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('workout_detail', args=[large.id]))
+        self.assertEqual(len(response.context['exercises_data']), 12)
+    
+    def test_per_exercise_aggregates(self):
+        """Test tonnage, top set, estimated 1RM and rest are computed per exercise"""
+        workout = self.make_workout(1)
+        LoggedSet.objects.create(
+            session_exercise=workout.session_exercises.get(),
+            set_number=4,
+            weight=300,
+            reps=10,
+            is_warmup=True
+        )
+        response = self.client.get(reverse('workout_detail', args=[workout.id]))
+        data = response.context['exercises_data'][0]
+        self.assertEqual([s.set_number for s in data['sets']], [1, 2, 3, 4])
+        self.assertEqual(data['tonnage'], Decimal('1800'))
+        self.assertEqual(data['top_weight'], Decimal('130'))
+        self.assertAlmostEqual(data['estimated_1rm'], 151.7)
+        self.assertEqual(data['total_rest'], 270)
+
+
+class WorkoutSummaryTests(TestCase):
+    """Test the denormalized per-workout summary stays in sync"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Test', exercise_count=1)
+        self.session_ex = SessionExercise.objects.create(logged_workout=self.workout, global_exercise=exercise, order=1)
+    
+    def post_json(self, url, body=None):
+        return self.client.post(url, data=json.dumps(body or {}), content_type='application/json')
+    
+    def log_set(self, weight, reps, **extra):
+        response = self.post_json(
+            reverse('add_set', args=[self.session_ex.id]),
+            {'weight': weight, 'reps': reps, **extra}
+        )
+        return response.json()['set_id']
+    
+    def assertSummary(self, set_count, total_volume):
+        self.workout.refresh_from_db()
+        self.assertEqual(self.workout.set_count, set_count)
+        self.assertEqual(self.workout.total_volume, Decimal(total_volume))
+    
+    def test_set_writes_update_summary(self):
+        """Test add, update and delete adjust set count and volume"""
+        self.log_set(45, 10, is_warmup=True)
+        first = self.log_set(100, 5)
+        self.log_set(110, 5)
+        self.assertSummary(3, '1050')
+        
+        self.post_json(reverse('update_set', args=[first]), {'weight': 120})
+        self.assertSummary(3, '1150')
+        
+        self.post_json(reverse('delete_set', args=[first]))
+        self.assertSummary(2, '550')
+        
+        self.post_json(reverse('add_sets_bulk'), {'sets': [
+            {'session_exercise_id': self.session_ex.id, 'weight': 100, 'reps': 2},
+            {'session_exercise_id': self.session_ex.id, 'weight': 100, 'reps': 3},
+        ]})
+        self.assertSummary(4, '1050')
+    
+    def test_end_workout_recomputes_summary(self):
+        """Test ending a workout repairs drift and records the duration"""
+        LoggedSet.objects.create(session_exercise=self.session_ex, set_number=1, weight=100, reps=5)
+        self.client.post(reverse('end_workout', args=[self.workout.id]))
+        self.assertSummary(1, '500')
+        self.assertIsNotNone(self.workout.duration_seconds)
+    
+    def test_start_workout_sets_exercise_count(self):
+        """Test starting a workout records its exercise count"""
+        exercise = self.session_ex.global_exercise
+        self.client.post(reverse('start_workout'), {'exercise_order': f'{exercise.id},{exercise.id}'})
+        self.assertEqual(LoggedWorkout.objects.latest('id').exercise_count, 2)
+    
+    def test_reconcile_command_repairs_drift(self):
+        """Test reconcile_workout_summaries finds and fixes drifted summaries"""
+        LoggedSet.objects.create(session_exercise=self.session_ex, set_number=1, weight=100, reps=5)
+        LoggedWorkout.objects.filter(pk=self.workout.pk).update(set_count=7, total_volume=3)
+        
+        out = StringIO()
+        call_command('reconcile_workout_summaries', dry_run=True, stdout=out)
+        self.assertIn('found 1', out.getvalue())
+        self.assertSummary(7, '3')
+        
+        call_command('reconcile_workout_summaries', batch_size=1, stdout=StringIO())
+        self.assertSummary(1, '500')
+
+
+class WorkoutHistoryTests(TestCase):
+    """Test keyset-paginated workout history"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercise = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        self.plan = WorkoutPlan.objects.create(user=self.user, name='Legs')
+        start = timezone.make_aware(datetime(2025, 1, 1, 9, 0))
+        self.workouts = []
+        for day in range(25):
+            workout = LoggedWorkout.objects.create(
+                user=self.user,
+                name=f'Workout {day}',
+                # Pairs of workouts share a start time to exercise the id tiebreaker
+                started_at=start + timedelta(days=day // 2),
+                workout_plan=self.plan if day % 5 == 0 else None,
+                set_count=day
+            )
+            if day % 3 == 0:
+                SessionExercise.objects.create(logged_workout=workout, global_exercise=self.exercise, order=1)
+            self.workouts.append(workout)
+        other = User.objects.create_user(username='other', password='testpass123')
+        LoggedWorkout.objects.create(user=other, name='Not mine', started_at=start)
+    
+    def fetch(self, **params):
+        response = self.client.get(reverse('api_workouts'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_pages_cover_history_without_overlap(self):
+        """Test following cursors returns every workout exactly once, newest first"""
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 7}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.fetch(**params)
+            seen.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = sorted(self.workouts, key=lambda w: (w.started_at, w.id), reverse=True)
+        self.assertEqual(seen, [w.id for w in expected])
+    
+    def test_deep_page_costs_same_as_first(self):
+        """Test a deep page runs the same queries as page one"""
+        first = self.fetch(limit=5)
+        deep_cursor = self.fetch(limit=5, cursor=self.fetch(limit=15)['next_cursor'])['next_cursor']
+        # session, user, page
+        with self.assertNumQueries(3):
+            self.client.get(reverse('api_workouts'), {'limit': 5, 'cursor': first['next_cursor']})
+        with self.assertNumQueries(3):
+            self.client.get(reverse('api_workouts'), {'limit': 5, 'cursor': deep_cursor})
+    
+    def test_filters(self):
+        """Test date range, plan and exercise filters"""
+        by_plan = self.fetch(plan=self.plan.id)['results']
+        self.assertEqual({row['id'] for row in by_plan}, {w.id for i, w in enumerate(self.workouts) if i % 5 == 0})
+        
+        by_exercise = self.fetch(exercise=self.exercise.id)['results']
+        self.assertEqual({row['id'] for row in by_exercise}, {w.id for i, w in enumerate(self.workouts) if i % 3 == 0})
+        
+        by_date = self.fetch(**{'from': '2025-01-02', 'to': '2025-01-03'})['results']
+        self.assertEqual({row['name'] for row in by_date}, {'Workout 2', 'Workout 3', 'Workout 4', 'Workout 5'})
+    
+    def test_invalid_cursor_rejected(self):
+        """Test malformed cursors and filters return 400"""
+        self.assertEqual(self.client.get(reverse('api_workouts'), {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_workouts'), {'from': 'yesterday'}).status_code, 400)
+    
+    def test_history_page_renders(self):
+        """Test the HTML history page lists workouts and links to older ones"""
+        response = self.client.get(reverse('workout_history'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Workout 24')
+        self.assertContains(response, 'cursor=')
+
+
+class ExerciseProgressTests(TestCase):
+    """Test the bucketed exercise progression endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercise = GlobalExercise.objects.create(
+            name='Bench Press',
+            equipment_type='barbell',
+            primary_muscle_group='chest'
+        )
+        # Mondays, so each workout starts its own week
+        self.start = timezone.make_aware(datetime(2025, 1, 6, 9, 0))
+    
+    def log_workout(self, started_at, sets, user=None):
+        workout = LoggedWorkout.objects.create(user=user or self.user, name='Push', started_at=started_at)
+        session_ex = SessionExercise.objects.create(logged_workout=workout, global_exercise=self.exercise, order=1)
+        for number, (weight, reps, is_warmup) in enumerate(sets, 1):
+            LoggedSet.objects.create(
+                session_exercise=session_ex,
+                set_number=number,
+                weight=weight,
+                reps=reps,
+                is_warmup=is_warmup
+            )
+        return workout
+    
+    def fetch(self, **params):
+        params.setdefault('exercise', self.exercise.id)
+        response = self.client.get(reverse('exercise_progress'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_weekly_buckets(self):
+        """Test per-week top set, 1RM, tonnage and hard sets, ignoring warmups"""
+        self.log_workout(self.start, [(45, 10, True), (100, 5, False), (110, 3, False)])
+        self.log_workout(self.start + timedelta(days=2), [(105, 5, False)])
+        self.log_workout(self.start + timedelta(days=7), [(120, 1, False)])
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.log_workout(self.start, [(300, 5, False)], user=other)
+        
+        data = self.fetch(bucket='week')
+        self.assertEqual(data['total_buckets'], 2)
+        self.assertFalse(data['downsampled'])
+        first, second = data['points']
+        self.assertEqual(first['date'], '2025-01-06')
+        self.assertEqual(first['top_weight'], 110)
+        self.assertAlmostEqual(first['estimated_1rm'], PersonalRecord.calculate_1rm(105, 5), places=2)
+        self.assertEqual(first['tonnage'], 100 * 5 + 110 * 3 + 105 * 5)
+        self.assertEqual(first['hard_sets'], 3)
+        self.assertEqual(second['estimated_1rm'], 120)
+        
+        self.assertEqual(len(self.fetch(bucket='day')['points']), 3)
+        self.assertEqual(len(self.fetch(bucket='month')['points']), 1)
+        self.assertEqual(len(self.fetch(**{'from': '2025-01-10'})['points']), 1)
+    
+    def test_long_history_is_downsampled(self):
+        """Test the payload is capped at the point budget in a constant number of queries"""
+        for day in range(60):
+            self.log_workout(self.start + timedelta(days=day), [(100 + day % 7, 5, False)])
+        # session, user, series
+        with self.assertNumQueries(3):
+            data = self.fetch(bucket='day', points=20)
+        self.assertEqual(data['total_buckets'], 60)
+        self.assertTrue(data['downsampled'])
+        self.assertEqual(len(data['points']), 20)
+        self.assertEqual(data['points'][0]['date'], '2025-01-06')
+        self.assertEqual(data['points'][-1]['date'], '2025-03-06')
+    
+    def test_lttb_keeps_extremes(self):
+        """Test LTTB keeps endpoints and spikes and preserves order"""
+        values = [0] * 50 + [100] + [0] * 49
+        sampled = lttb(list(enumerate(values)), 10, key=lambda point: point[1])
+        self.assertEqual(len(sampled), 10)
+        self.assertEqual(sampled[0][0], 0)
+        self.assertEqual(sampled[-1][0], 99)
+        self.assertIn((50, 100), sampled)
+        self.assertEqual(sampled, sorted(sampled))
+    
+    def test_invalid_params_rejected(self):
+        """Test missing exercise and unknown buckets return 400"""
+        url = reverse('exercise_progress')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'exercise': self.exercise.id, 'bucket': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'exercise': 'bench'}).status_code, 400)
+
+
+class ExerciseCatalogTests(TestCase):
+    """Test the versioned exercise catalog cache"""
+    
+    def setUp(self):
+        cache.clear()
+        self.bench = GlobalExercise.objects.create(
+            name='Bench Press',
+            equipment_type='barbell',
+            primary_muscle_group='chest'
+        )
+        self.squat = GlobalExercise.objects.create(
+            name='Squat',
+            equipment_type='barbell',
+            primary_muscle_group='legs'
+        )
+        self.retired = GlobalExercise.objects.create(
+            name='Old Press',
+            equipment_type='barbell',
+            primary_muscle_group='chest',
+            is_active=False
+        )
+    
+    def test_warm_reads_hit_no_database(self):
+        """Test the catalog is loaded once and then served from cache"""
+        with self.assertNumQueries(1):
+            catalog.exercises_by_id()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get_exercise(self.squat.id), self.squat)
+            self.assertEqual(catalog.get_exercise(str(self.bench.id)), self.bench)
+            self.assertIsNone(catalog.get_exercise('nope'))
+            self.assertEqual(
+                catalog.grouped_by_muscle(),
+                [('chest', [self.bench]), ('legs', [self.squat])]
+            )
+    
+    def test_save_and_delete_invalidate(self):
+        """Test post_save and post_delete bump the catalog version"""
+        catalog.exercises_by_id()
+        self.squat.name = 'Back Squat'
+        self.squat.save()
+        self.assertEqual(catalog.get_exercise(self.squat.id).name, 'Back Squat')
+        
+        squat_id = self.squat.id
+        self.squat.delete()
+        self.assertIsNone(catalog.get_exercise(squat_id))
+        self.assertEqual(catalog.active_exercises(), [self.bench])
+    
+    def test_survives_evicted_version(self):
+        """Test a cleared cache rebuilds instead of serving stale data"""
+        catalog.exercises_by_id()
+        cache.clear()
+        GlobalExercise.objects.filter(pk=self.bench.pk).update(name='Flat Bench')
+        catalog.invalidate()
+        self.assertEqual(catalog.get_exercise(self.bench.id).name, 'Flat Bench')
+    
+    def test_change_on_another_worker_shows_up_after_version_timeout(self):
+        """Test a process whose cache never saw the version bump reloads once its version expires"""
+        catalog.exercises_by_id()
+        # Saved on another worker: its invalidate() bumped that worker's locmem cache, not this one
+        GlobalExercise.objects.filter(pk=self.bench.pk).update(name='Flat Bench')
+        self.assertEqual(catalog.get_exercise(self.bench.id).name, 'Bench Press')
+        # A fresh process-local copy alone doesn't help; the old version still names the old catalog
+        catalog._local = (None, None)
+        self.assertEqual(catalog.get_exercise(self.bench.id).name, 'Bench Press')
+        
+        with mock.patch('time.time', return_value=time.time() + catalog.VERSION_TIMEOUT + 1):
+            self.assertEqual(catalog.get_exercise(self.bench.id).name, 'Flat Bench')
+    
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/ironledger-test-catalog-cache',
+    }})
+    def test_file_based_cache(self):
+        """Test the catalog works with the file-based cache backend"""
+        cache.clear()
+        self.assertEqual(catalog.get_exercise(self.bench.id), self.bench)
+        self.bench.name = 'Flat Bench'
+        self.bench.save()
+        self.assertEqual(catalog.get_exercise(self.bench.id).name, 'Flat Bench')
+        cache.clear()
+
+
+class StartWorkoutTests(TestCase):
+    """Test bulk session creation when starting a workout"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercises = [
+            GlobalExercise.objects.create(name=f'Exercise {i}', equipment_type='barbell', primary_muscle_group='chest')
+            for i in range(20)
+        ]
+    
+    def make_plan(self, size):
+        plan = WorkoutPlan.objects.create(user=self.user, name=f'Plan {size}')
+        for order, exercise in enumerate(self.exercises[:size], 1):
+            PlannedExercise.objects.create(workout_plan=plan, global_exercise=exercise, order=order, notes=f'n{order}')
+        return plan
+    
+    def test_query_count_independent_of_size(self):
+        """Test starting from a plan costs the same queries for 2 or 20 exercises"""
+        small, large = self.make_plan(2), self.make_plan(20)
+        self.client.post(reverse('start_workout_from_plan', args=[small.id]))  # warm up session
+        with self.assertNumQueries(9):
+            self.client.post(reverse('start_workout_from_plan', args=[small.id]))
+        with self.assertNumQueries(9):
+            self.client.post(reverse('start_workout_from_plan', args=[large.id]))
+        
+        workout = LoggedWorkout.objects.latest('id')
+        self.assertEqual(workout.exercise_count, 20)
+        self.assertEqual(
+            list(workout.session_exercises.order_by('order').values_list('global_exercise_id', 'notes')),
+            [(exercise.id, f'n{order}') for order, exercise in enumerate(self.exercises, 1)]
+        )
+        large.refresh_from_db()
+        self.assertEqual(large.times_used, 1)
+    
+    def test_quick_workout_keeps_order(self):
+        """Test drag-and-drop order is kept"""
+        ids = [self.exercises[3].id, self.exercises[1].id]
+        self.client.post(reverse('start_workout'), {'exercise_order': ','.join(map(str, ids))})
+        workout = LoggedWorkout.objects.get(user=self.user)
+        self.assertEqual(workout.exercise_count, 2)
+        self.assertEqual(
+            list(workout.session_exercises.order_by('order').values_list('global_exercise_id', 'order')),
+            [(self.exercises[3].id, 1), (self.exercises[1].id, 2)]
+        )
+    
+    def test_quick_workout_fetches_exercises_missing_from_catalog(self):
+        """Test an exercise this process's catalog doesn't hold yet is loaded from the database"""
+        cache.clear()
+        catalog.exercises_by_id()
+        # bulk_create skips the signal that invalidates the catalog, like a write on another worker
+        new = GlobalExercise.objects.bulk_create([
+            GlobalExercise(name='Hip Thrust', equipment_type='barbell', primary_muscle_group='legs')
+        ])[0]
+        self.assertIsNone(catalog.get_exercise(new.id))
+        
+        ids = [self.exercises[0].id, new.id]
+        # session, user, the one missing exercise, savepoint, workout, session exercises, release
+        with self.assertNumQueries(7):
+            self.client.post(reverse('start_workout'), {'exercise_order': ','.join(map(str, ids))})
+        workout = LoggedWorkout.objects.get(user=self.user)
+        self.assertEqual(workout.exercise_count, 2)
+        self.assertEqual(
+            list(workout.session_exercises.order_by('order').values_list('global_exercise_id', flat=True)), ids
+        )
+    
+    def test_quick_workout_rejects_unknown_ids(self):
+        """Test ids that don't exist at all start no workout and show an error"""
+        ids = [self.exercises[3].id, 999999]
+        response = self.client.post(
+            reverse('start_workout'), {'exercise_order': ','.join(map(str, ids)) + ',abc'}, follow=True
+        )
+        self.assertRedirects(response, reverse('start_workout'))
+        self.assertContains(response, 'no longer exist')
+        self.assertFalse(LoggedWorkout.objects.filter(user=self.user).exists())
+    
+    def test_increment_usage_is_atomic(self):
+        """Test increment_usage doesn't lose updates from stale instances"""
+        plan = self.make_plan(1)
+        stale = WorkoutPlan.objects.get(pk=plan.pk)
+        plan.increment_usage()
+        stale.increment_usage()
+        plan.refresh_from_db()
+        self.assertEqual(plan.times_used, 2)
+    
+    def test_benchmark_command(self):
+        """Test the benchmark runs and leaves no data behind"""
+        out = StringIO()
+        call_command('benchmark_start_workout', sizes=[3], repeat=2, stdout=out)
+        self.assertIn('plan', out.getvalue())
+        self.assertFalse(User.objects.filter(username='__benchmark_start_workout__').exists())
+        self.assertEqual(GlobalExercise.objects.count(), 20)
+
+
+@override_settings(SESSION_ENGINE='tracker.sessions')
+class SessionTests(TestCase):
+    """Test the cached_db session engine and expired session pruning"""
+    
+    def test_requests_read_session_from_cache(self):
+        """Test a logged-in request doesn't query django_session"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        with self.assertNumQueries(1):  # user only
+            self.client.get(reverse('home'))
+        # Writes still go through to the database
+        self.assertTrue(Session.objects.filter(session_key=self.client.session.session_key).exists())
+        self.assertEqual(self.client.session['_auth_user_id'], str(user.id))
+    
+    def test_cached_engine_needs_shared_cache(self):
+        """Test settings refuse a cached session engine on a per-process cache"""
+        env = {**os.environ, 'SESSION_ENGINE': 'tracker.sessions'}
+        env.pop('CACHE_LOCATION', None)
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'check'], cwd=django_settings.BASE_DIR, env=env,
+            capture_output=True, text=True, timeout=60,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('set CACHE_LOCATION', result.stderr)
+    
+    def test_cache_timeout_is_capped(self):
+        """Test session cache entries never outlive SESSION_CACHE_TIMEOUT"""
+        class RecordingCache:
+            timeouts = []
+            
+            def set(self, key, value, timeout=None, version=None):
+                self.timeouts.append(timeout)
+        
+        capped = _CappedCache(RecordingCache(), 300)
+        capped.set('a', 1, 1209600)
+        capped.set('b', 1, 60)
+        capped.set('c', 1, None)
+        self.assertEqual(RecordingCache.timeouts, [300, 60, 300])
+    
+    @override_settings(SESSION_CACHE_TIMEOUT=0)
+    def test_deleted_session_not_served_once_cache_expires(self):
+        """Test a session deleted in the database isn't served from a stale cache entry"""
+        store = SessionStore()
+        store['value'] = 1
+        store.save()
+        Session.objects.filter(session_key=store.session_key).delete()
+        self.assertNotIn('value', SessionStore(store.session_key).load())
+    
+    def test_clearsessions_deletes_only_expired(self):
+        """Test Django's clearsessions works with this engine and keeps live sessions"""
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        
+        call_command('clearsessions')
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+    
+    def test_benchmark_command(self):
+        """Test the session benchmark runs for every engine and leaves no data behind"""
+        out = StringIO()
+        call_command('benchmark_sessions', requests=2, stdout=out)
+        self.assertIn('cached_db', out.getvalue())
+        self.assertFalse(User.objects.filter(username='__benchmark_sessions__').exists())
+
+
+class LoggingTests(TestCase):
+    """Test tracker logging goes through leveled loggers and the queue handler"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        exercise = GlobalExercise.objects.create(name='Squat', equipment_type='barbell', primary_muscle_group='legs')
+        workout = LoggedWorkout.objects.create(user=self.user, name='Test')
+        self.session_ex = SessionExercise.objects.create(logged_workout=workout, global_exercise=exercise, order=1)
+    
+    def test_debug_disabled_by_default(self):
+        """Test view debug lines are filtered out before formatting at the default level"""
+        self.assertFalse(logging.getLogger('ironledger.tracker.views').isEnabledFor(logging.DEBUG))
+    
+    def test_add_set_logs_rest_duration(self):
+        """Test add_set reports the client rest duration at DEBUG"""
+        with self.assertLogs('ironledger.tracker.views', logging.DEBUG) as logs:
+            self.client.post(
+                reverse('add_set', args=[self.session_ex.id]),
+                data=json.dumps({'weight': 100, 'reps': 5, 'rest_duration': 90}),
+                content_type='application/json'
+            )
+        self.assertIn('Using rest duration from client: 90s', logs.output[0])
+    
+    def test_queue_handler_forwards_records(self):
+        """Test records put on the queue are written by the listener thread"""
+        stream = StringIO()
+        handler = QueueListenerHandler([logging.StreamHandler(stream)])
+        logger = logging.getLogger('ironledger.tracker.test_queue')
+        logger.addHandler(handler)
+        try:
+            logger.warning('logged %s', 'lazily')
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        self.assertEqual(stream.getvalue(), 'logged lazily\n')
+
+
+class PlateSolverTests(TestCase):
+    """Test the inventory-aware plate solver and calculate_plates endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def solve(self, target, unit='lbs', inventory=None, microplates=False, bar=45):
+        return plates.solve(plates.normalize_inventory(unit, inventory, microplates), bar, target)
+    
+    def test_exact_standard_loading(self):
+        """Test standard lbs loadings use the fewest plates"""
+        result = self.solve(225)
+        self.assertTrue(result['exact'])
+        self.assertEqual(result['plates'], [{'weight': 45.0, 'count': 2}])
+        self.assertEqual(self.solve(140)['plates'], [
+            {'weight': 45.0, 'count': 1}, {'weight': 2.5, 'count': 1}
+        ])
+    
+    def test_limited_inventory_falls_back_to_nearest_below(self):
+        """Test a small inventory returns the heaviest load it can reach"""
+        result = self.solve(315, inventory={'45': 2, '25': 1})
+        self.assertFalse(result['exact'])
+        self.assertEqual(result['loaded_weight'], 275.0)
+        self.assertEqual(result['remainder'], 20.0)
+        
+        # 70 per side needs 45 + 25 since there are no 35s or 10s
+        self.assertEqual(self.solve(185, inventory={'45': 2, '25': 1})['plates'], [
+            {'weight': 45.0, 'count': 1}, {'weight': 25.0, 'count': 1}
+        ])
+    
+    def test_greedy_counterexample(self):
+        """Test the solver finds loadings a greedy pass misses"""
+        # 60 per side: greedy takes 45 and can't finish with one 25 and one 10
+        result = self.solve(140, inventory={'45': 1, '35': 1, '25': 1}, bar=20)
+        self.assertTrue(result['exact'])
+        self.assertEqual(result['plates'], [{'weight': 35.0, 'count': 1}, {'weight': 25.0, 'count': 1}])
+    
+    def test_kg_microplates(self):
+        """Test kg sets reach fractional loads only with microplates"""
+        self.assertFalse(self.solve(101, unit='kg', bar=20)['exact'])
+        result = self.solve(101, unit='kg', bar=20, microplates=True)
+        self.assertTrue(result['exact'])
+        self.assertIn({'weight': 0.5, 'count': 1}, result['plates'])
+    
+    def test_invalid_inventory(self):
+        """Test malformed inventories are rejected"""
+        with self.assertRaises(plates.InvalidInventory):
+            plates.normalize_inventory('lbs', {'45': -1})
+        with self.assertRaises(plates.InvalidInventory):
+            plates.normalize_inventory('lbs', {'heavy': 2})
+    
+    def test_endpoint_uses_cached_settings(self):
+        """Test warm lookups skip UserSettings and changes invalidate the cache"""
+        url = reverse('calculate_plates')
+        self.client.get(url, {'weight': 225})
+        with self.assertNumQueries(2):  # session, user
+            data = self.client.get(url, {'weight': 225}).json()
+        self.assertEqual(data['plates'], [{'weight': 45.0, 'count': 2}])
+        
+        settings = UserSettings.objects.get(user=self.user)
+        settings.plate_inventory = {'45': 1, '25': 4}
+        settings.save()
+        data = self.client.get(url, {'weight': 225}).json()
+        # 90 per side: three 25s (75) beat 45 + 25 (70)
+        self.assertEqual(data['plates'], [{'weight': 25.0, 'count': 3}])
+        self.assertEqual(data['remainder'], 15.0)
+    
+    def test_endpoint_ramp(self):
+        """Test a warm-up ramp is solved in one request"""
+        data = self.client.get(reverse('calculate_plates'), {'weights': '45,95,135,185,225,20'}).json()
+        self.assertEqual([row['target_weight'] for row in data['loadings']], [45, 95, 135, 185, 225, 20])
+        self.assertEqual(data['loadings'][0]['plates'], [])
+        self.assertEqual(data['loadings'][2]['plates'], [{'weight': 45.0, 'count': 1}])
+        self.assertIn('error', data['loadings'][-1])
+        
+        self.assertEqual(self.client.get(reverse('calculate_plates'), {'weights': '45,abc'}).status_code, 400)
+        self.assertIn('error', self.client.get(reverse('calculate_plates'), {'weight': 20}).json())
+
+
+class ExportTests(TestCase):
+    """Test the streaming training log export"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        squat = GlobalExercise.objects.create(name='Squat', equipment_type='barbell', primary_muscle_group='legs')
+        curl = CustomExercise.objects.create(user=self.user, name='Cable Curl', equipment_type='cable',
+                                             primary_muscle_group='biceps')
+        start = timezone.make_aware(datetime(2025, 1, 1, 9, 0))
+        for day in range(3):
+            workout = LoggedWorkout.objects.create(user=self.user, name=f'Day {day}', started_at=start + timedelta(days=day))
+            for order, kwargs in enumerate([{'global_exercise': squat}, {'custom_exercise': curl}], 1):
+                session_ex = SessionExercise.objects.create(logged_workout=workout, order=order, **kwargs)
+                for number in (1, 2):
+                    LoggedSet.objects.create(
+                        session_exercise=session_ex,
+                        set_number=number,
+                        weight=100 + day,
+                        reps=5,
+                        notes='comma, "quoted"' if number == 2 else '',
+                        started_at=start + timedelta(days=day, minutes=order * 10 + number)
+                    )
+        other = User.objects.create_user(username='other', password='testpass123')
+        LoggedWorkout.objects.create(user=other, name='Not mine')
+    
+    def download(self, **params):
+        response = self.client.get(reverse('export_training_log'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+    
+    def test_csv_export(self):
+        """Test CSV rows come out in workout/exercise/set order with escaping intact"""
+        response, body = self.download()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(body.decode().splitlines()))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(
+            [(row['workout_name'], row['exercise'], row['set_number']) for row in rows[:4]],
+            [('Day 0', 'Squat', '1'), ('Day 0', 'Squat', '2'), ('Day 0', 'Cable Curl', '1'), ('Day 0', 'Cable Curl', '2')]
+        )
+        self.assertEqual(rows[1]['notes'], 'comma, "quoted"')
+        self.assertEqual(rows[2]['exercise_type'], 'custom')
+    
+    def test_jsonl_gzip_since(self):
+        """Test gzip JSON Lines export limited to recent sets"""
+        response, body = self.download(format='jsonl', gzip=1, since='2025-01-02')
+        self.assertIn('.jsonl.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({row['workout_name'] for row in rows}, {'Day 1', 'Day 2'})
+        self.assertEqual(rows[0]['weight'], '101.00')
+    
+    def test_empty_export_has_header(self):
+        """Test an export with no sets is just the CSV header"""
+        _, body = self.download(since='2030-01-01')
+        self.assertEqual(body.decode().strip(), ','.join(exports.COLUMNS))
+    
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_asgi_export_is_an_async_stream(self):
+        """Test under ASGI the export streams chunk by chunk instead of being read into memory first"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('export_training_log'), {'format': 'jsonl', 'gzip': 1})
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(gzip.decompress(body).decode().splitlines()), 12)
+    
+    def test_invalid_params(self):
+        """Test unknown formats and bad dates return 400"""
+        self.assertEqual(self.client.get(reverse('export_training_log'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_training_log'), {'since': 'last week'}).status_code, 400)
+    
+    def test_command(self):
+        """Test export_training_log streams to a file in small chunks"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'log.csv.gz')
+            call_command('export_training_log', 'testuser', output=path, gzip=True, chunk_size=3, stderr=StringIO())
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 12)
+        out = StringIO()
+        call_command('export_training_log', 'testuser', format='jsonl', stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 12)
+
+
+class ImportTests(TestCase):
+    """Test the bulk training log import"""
+    
+    HEADER = 'workout_started_at,workout_name,exercise,set_number,weight,reps,is_warmup\n'
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.squat = GlobalExercise.objects.create(name='Squat', equipment_type='barbell', primary_muscle_group='legs')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def csv_file(self, rows, name='log.csv'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(self.HEADER + ''.join(rows))
+        return path
+    
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_training_log', 'testuser', path, stdout=out, **options)
+        return out.getvalue()
+    
+    def workout_rows(self, day, weight=100):
+        started = f'2025-01-{day + 1:02d}T09:00:00+00:00'
+        return [
+            f'{started},Day {day},squat,1,{weight},5,true\n',
+            f'{started},Day {day},squat,2,{weight + 50},5,false\n',
+            f'{started},Day {day},Zercher Carry,1,60,30,false\n',
+        ]
+    
+    def test_import_creates_workouts_sets_and_custom_exercises(self):
+        """Test rows become workouts with summaries, matched and custom exercises, and PRs"""
+        rows = [row for day in range(3) for row in self.workout_rows(day)]
+        output = self.run_import(self.csv_file(rows), batch_size=4)
+        self.assertIn('Imported 9 sets in 3 workouts', output)
+        self.assertIn('rows/s', output)
+        
+        workout = LoggedWorkout.objects.get(user=self.user, name='Day 0')
+        self.assertEqual(workout.set_count, 3)
+        self.assertEqual(workout.total_volume, Decimal('150') * 5 + 60 * 30)
+        self.assertEqual(workout.exercise_count, 2)
+        self.assertIsNotNone(workout.ended_at)
+        sessions = list(workout.session_exercises.order_by('order'))
+        self.assertEqual(sessions[0].global_exercise, self.squat)
+        self.assertEqual(sessions[0].last_set_number, 2)
+        self.assertEqual(sessions[1].custom_exercise.name, 'Zercher Carry')
+        self.assertEqual(CustomExercise.objects.filter(user=self.user).count(), 1)
+        self.assertTrue(PersonalRecord.objects.filter(user=self.user, global_exercise=self.squat).exists())
+    
+    def test_import_resumes_after_failure(self):
+        """Test a failed import keeps committed chunks and a re-run skips them"""
+        good = [row for day in range(4) for row in self.workout_rows(day)]
+        bad = good[:7] + ['2025-01-03T09:00:00+00:00,Day 2,squat,2,heavy,5,false\n'] + good[8:]
+        with self.assertRaisesMessage(CommandError, 'weight must be a number'):
+            self.run_import(self.csv_file(bad), batch_size=3)
+        self.assertEqual(LoggedWorkout.objects.filter(user=self.user).count(), 2)
+        
+        output = self.run_import(self.csv_file(good), batch_size=3)
+        self.assertIn('in 2 workouts (2 already present', output)
+        self.assertEqual(LoggedSet.objects.filter(session_exercise__logged_workout__user=self.user).count(), 12)
+    
+    def test_scattered_workout_rows_fail(self):
+        """Test a workout whose rows aren't adjacent fails at the row where it comes back"""
+        day0, day1 = self.workout_rows(0), self.workout_rows(1)
+        scattered = self.csv_file(day0[:2] + day1 + day0[2:])
+        for batch_size in (3, 100):
+            with self.assertRaisesMessage(CommandError, "Row 7: workout 'Day 0' started 2025-01-01T09:00:00+00:00"):
+                self.run_import(scattered, batch_size=batch_size)
+            # The partly imported workout is removed so a fixed file imports it whole
+            self.assertFalse(LoggedWorkout.objects.filter(user=self.user, name='Day 0').exists())
+        
+        self.run_import(self.csv_file(day0 + day1))
+        self.assertEqual(LoggedWorkout.objects.get(user=self.user, name='Day 0').set_count, 3)
+        self.assertEqual(LoggedSet.objects.filter(session_exercise__logged_workout__user=self.user).count(), 6)
+    
+    def test_export_round_trip(self):
+        """Test an export imports back into another account unchanged"""
+        self.run_import(self.csv_file([row for day in range(2) for row in self.workout_rows(day)]))
+        path = os.path.join(self.tmp.name, 'export.jsonl.gz')
+        call_command('export_training_log', 'testuser', output=path, format='jsonl', gzip=True, stderr=StringIO())
+        
+        User.objects.create_user(username='copy', password='testpass123')
+        call_command('import_training_log', 'copy', path, stdout=StringIO())
+        
+        def summary(username):
+            return list(LoggedSet.objects.filter(session_exercise__logged_workout__user__username=username).order_by(
+                'session_exercise__logged_workout__started_at', 'session_exercise__order', 'set_number'
+            ).values_list('session_exercise__logged_workout__name', 'set_number', 'weight', 'reps', 'is_warmup'))
+        self.assertEqual(summary('copy'), summary('testuser'))
+    
+    def test_upload_endpoint(self):
+        """Test uploading a gzipped JSON Lines file"""
+        lines = [
+            json.dumps({'workout_started_at': '2025-02-01', 'exercise': 'Squat', 'weight': 200, 'reps': 3}),
+            json.dumps({'workout_started_at': '2025-02-01', 'exercise': 'Squat', 'weight': 210, 'reps': 2}),
+        ]
+        upload = SimpleUploadedFile('log.jsonl.gz', gzip.compress('\n'.join(lines).encode()))
+        response = self.client.post(reverse('import_training_log'), {'file': upload})
+        self.assertRedirects(response, reverse('workout_history'))
+        workout = LoggedWorkout.objects.get(user=self.user)
+        self.assertEqual(list(LoggedSet.objects.filter(session_exercise__logged_workout=workout).values_list(
+            'set_number', flat=True)), [1, 2])
+        
+        bad = SimpleUploadedFile('log.jsonl', b'{"exercise": "Squat"}\n')
+        response = self.client.post(reverse('import_training_log'), {'file': bad}, follow=True)
+        self.assertContains(response, 'missing workout_started_at, weight, reps')
+
+
+class SyntheticDataTests(TestCase):
+    """Test the synthetic dataset generator"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def generate(self, **options):
+        options = {'users': 2, 'years': 0.25, 'seed': 7, 'end_date': datetime(2026, 1, 1).date(),
+                   'batch_size': 50, **options}
+        return synthetic.Generator(**options).run()
+    
+    def history(self, username):
+        return list(LoggedSet.objects.filter(
+            session_exercise__logged_workout__user__username=username
+        ).order_by('started_at', 'set_number').values_list(
+            'session_exercise__global_exercise__name', 'session_exercise__custom_exercise__name',
+            'set_number', 'weight', 'reps', 'is_warmup', 'started_at', 'rest_duration',
+        ))
+    
+    def test_generates_consistent_histories(self):
+        """Test summaries, set numbers, settings, plans and records match the generated rows"""
+        stats = self.generate()
+        self.assertEqual(stats['users'], 2)
+        self.assertGreater(stats['sets'], 100)
+        self.assertEqual(stats['global_exercises_created'], len(synthetic.BASE_EXERCISES))
+        self.assertEqual(len(catalog.active_exercises()), len(synthetic.BASE_EXERCISES))
+        self.assertEqual(LoggedSet.objects.count(), stats['sets'])
+        
+        for user in User.objects.filter(username__startswith='synthetic'):
+            self.assertTrue(UserSettings.objects.filter(user=user).exists())
+            self.assertTrue(user.check_password('synthetic'))
+            self.assertTrue(PersonalRecord.objects.filter(user=user).exists())
+            for plan in WorkoutPlan.objects.filter(user=user):
+                self.assertEqual(plan.times_used, LoggedWorkout.objects.filter(workout_plan=plan).count())
+                self.assertTrue(plan.planned_exercises.exists())
+        
+        for workout in LoggedWorkout.objects.prefetch_related('session_exercises__logged_sets'):
+            sets = [s for ex in workout.session_exercises.all() for s in ex.logged_sets.all()]
+            self.assertEqual(workout.set_count, len(sets))
+            self.assertEqual(workout.exercise_count, workout.session_exercises.count())
+            self.assertEqual(workout.total_volume, sum((s.weight * s.reps for s in sets if not s.is_warmup), Decimal('0')))
+            self.assertEqual(workout.duration_seconds, int((workout.ended_at - workout.started_at).total_seconds()))
+            for session_ex in workout.session_exercises.all():
+                self.assertEqual(session_ex.last_set_number, max(s.set_number for s in session_ex.logged_sets.all()))
+    
+    def test_same_seed_gives_same_data(self):
+        """Test a user's history depends only on the seed and index, not batching or range"""
+        self.generate(users=1, start=1, prefix='a')
+        self.generate(users=2, prefix='b', batch_size=10000)
+        self.generate(users=1, start=1, prefix='c', seed=8)
+        self.assertEqual(self.history('a000001'), self.history('b000001'))
+        self.assertNotEqual(self.history('b000000'), self.history('b000001'))
+        self.assertNotEqual(self.history('a000001'), self.history('c000001'))
+    
+    def test_command_refuses_existing_users(self):
+        """Test the command won't reuse usernames that already exist"""
+        User.objects.create_user(username='synthetic000000')
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', users=1, stdout=StringIO())
+        
+        out = StringIO()
+        call_command('generate_synthetic_data', users=1, start=1, years=0.1, skip_records=True, stdout=out)
+        self.assertIn('Generated 1 users', out.getvalue())
+        self.assertFalse(PersonalRecord.objects.exists())
+
+
+class BenchmarkSuiteTests(TestCase):
+    """Test the view benchmark suite"""
+    
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.report_path = os.path.join(self.tmp.name, 'report.json')
+    
+    def run_suite(self, **options):
+        out = StringIO()
+        call_command('benchmark_suite', users=1, years=0.3, iterations=2, warmup=0, memory_iterations=1,
+                     output=self.report_path, stdout=out, **options)
+        return out.getvalue()
+    
+    def test_report_covers_scenarios_and_rolls_back(self):
+        """Test every scenario is measured, the report is written and no data is left behind"""
+        output = self.run_suite()
+        self.assertIn('Report written', output)
+        with open(self.report_path) as f:
+            report = json.load(f)
+        
+        self.assertEqual(sorted(report['results']), sorted(benchmarks.SCENARIO_NAMES))
+        for name, result in report['results'].items():
+            self.assertGreater(result['queries'], 0, name)
+            self.assertGreater(result['p50_ms'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'], name)
+            self.assertGreater(result['peak_memory_kb'], 0, name)
+        self.assertEqual(report['results']['add_set']['query_budget'], django_settings.QUERY_BUDGETS['add_set'])
+        self.assertGreater(report['meta']['dataset']['user_sets'], 0)
+        
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(LoggedSet.objects.exists())
+        # Rolled-back plans aren't left on the cached leaderboard
+        self.assertEqual(plans.leaderboard(), [])
+    
+    def test_compare_flags_regressions(self):
+        """Test query count increases and p50 slowdowns against a baseline fail the run"""
+        baseline = {'results': {'add_set': {'p50_ms': 10.0, 'p95_ms': 12.0, 'queries': 5}}}
+        same = {'results': {'add_set': {'p50_ms': 11.0, 'p95_ms': 30.0, 'queries': 5}}}
+        slower = {'results': {'add_set': {'p50_ms': 20.0, 'p95_ms': 30.0, 'queries': 6}}}
+        self.assertEqual(benchmarks.compare(baseline, same), [])
+        self.assertEqual(len(benchmarks.compare(baseline, slower)), 2)
+        
+        baseline_path = os.path.join(self.tmp.name, 'baseline.json')
+        with open(baseline_path, 'w') as f:
+            json.dump({'results': {'calculate_plates': {'p50_ms': 1000.0, 'p95_ms': 1000.0, 'queries': 0}}}, f)
+        with self.assertRaisesMessage(CommandError, 'calculate_plates: queries 0 ->'):
+            self.run_suite(scenarios=['calculate_plates'], compare=baseline_path)
+
+
+class LoadTestScenarioTests(LiveServerTestCase):
+    """Test the HTTP gym session replay against a live server"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lifter', password='testpass123')
+        plan = WorkoutPlan.objects.create(user=self.user, name='Push Day')
+        for order, name in enumerate(['Bench Press', 'Overhead Press', 'Dips'], 1):
+            exercise = GlobalExercise.objects.create(name=name, equipment_type='barbell', primary_muscle_group='chest')
+            PlannedExercise.objects.create(workout_plan=plan, global_exercise=exercise, order=order)
+        self.plan = plan
+    
+    def test_replays_a_full_session(self):
+        """Test a virtual user logs in, logs sets, moves between exercises and ends the workout"""
+        # One virtual user keeps requests sequential, which in-memory SQLite needs
+        summary = loadtest.run(self.live_server_url, [('lifter', self.plan.id)], 'testpass123', time_scale=0)
+        
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(summary['sessions_completed'], 1)
+        self.assertEqual(summary['endpoints']['select_next_exercise']['count'], 2)
+        self.assertEqual(summary['endpoints']['complete_exercise']['count'], 1)
+        self.assertGreater(summary['throughput_rps'], 0)
+        
+        workout = LoggedWorkout.objects.get(user=self.user)
+        self.assertIsNotNone(workout.ended_at)
+        self.assertEqual(workout.set_count, summary['endpoints']['add_set']['count'])
+        self.assertFalse(workout.session_exercises.filter(completed_at__isnull=True).exists())
+    
+    def test_wrong_password_fails_the_session(self):
+        """Test a failed login is counted instead of raising"""
+        summary = loadtest.run(self.live_server_url, [('lifter', self.plan.id)], 'wrong', time_scale=0)
+        self.assertEqual(summary['sessions_completed'], 0)
+        self.assertEqual(summary['sessions_failed'], 1)
+        self.assertEqual(summary['endpoints']['login']['errors'], 1)
+    
+    def test_memory_budget_options(self):
+        """Test the process-tree RSS the server comparison uses, and its option checks"""
+        if not os.path.exists('/proc/self/status'):
+            raise SkipTest('Needs /proc')
+        self.assertGreater(load_test_command._rss_mb(os.getpid()), 10)
+        with self.assertRaises(CommandError):
+            call_command('load_test', '--server', 'asgi', '--memory-budget', '0', stdout=StringIO())
+
+
+class PlanListingTests(TestCase):
+    """Test annotated plan listings and the cached popular plans pages"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.exercise = GlobalExercise.objects.create(name='Squat', equipment_type='barbell', primary_muscle_group='legs')
+    
+    def make_plans(self, count, user=None, privacy='shared', exercises=3):
+        owner = user or User.objects.create_user(username=f'owner{WorkoutPlan.objects.count()}')
+        created = WorkoutPlan.objects.bulk_create([
+            WorkoutPlan(user=owner, name=f'Plan {i}', privacy=privacy, times_used=i) for i in range(count)
+        ])
+        PlannedExercise.objects.bulk_create([
+            PlannedExercise(workout_plan=plan, global_exercise=self.exercise, order=order)
+            for plan in created for order in range(exercises)
+        ])
+        plans.invalidate()
+        return created
+    
+    def test_plan_list_query_count_is_fixed(self):
+        """Test the plans page costs the same queries for 2 or 60 shared plans"""
+        self.make_plans(2, user=self.user, privacy='private')
+        self.make_plans(2)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('workout_plans_list'))
+        
+        self.make_plans(60)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('workout_plans_list'))
+        self.assertEqual(len(response.context['shared_plans']), plans.PAGE_SIZE)
+        self.assertEqual(response.context['shared_plans'][0].times_used, 59)
+        self.assertEqual(response.context['shared_plans'][0].exercise_count, 3)
+        self.assertContains(response, '3 exercises')
+        self.assertContains(response, 'owner')
+        self.assertEqual(response.context['next_page'], 2)
+        
+        # Popular page now comes from the cache
+        with self.assertNumQueries(3):
+            self.client.get(reverse('workout_plans_list'))
+    
+    def test_pages_and_own_plans(self):
+        """Test later pages, and that the viewer's own shared plans only appear under their plans"""
+        mine = self.make_plans(1, user=self.user)[0]
+        self.make_plans(plans.PAGE_SIZE)
+        
+        response = self.client.get(reverse('workout_plans_list'))
+        self.assertEqual([p.id for p in response.context['user_plans']], [mine.id])
+        self.assertNotIn(mine.id, [p.id for p in response.context['shared_plans']])
+        
+        response = self.client.get(reverse('workout_plans_list'), {'page': 2})
+        self.assertEqual(response.context['user_plans'], [])
+        self.assertEqual(response.context['previous_page'], 1)
+        self.assertIsNone(response.context['next_page'])
+        self.assertEqual(plans.parse_page('nope'), 1)
+        self.assertEqual(plans.parse_page('99999'), plans.MAX_PAGE)
+    
+    def test_plan_changes_invalidate_pages(self):
+        """Test renaming a plan or adding an exercise shows up on the next load"""
+        plan = self.make_plans(1)[0]
+        self.client.get(reverse('workout_plans_list'))
+        
+        plan.name = 'Renamed Plan'
+        plan.save()
+        PlannedExercise.objects.create(workout_plan=plan, global_exercise=self.exercise, order=9)
+        response = self.client.get(reverse('workout_plans_list'))
+        self.assertContains(response, 'Renamed Plan')
+        self.assertEqual(response.context['shared_plans'][0].exercise_count, 4)
+    
+    def test_change_on_another_worker_shows_up_after_version_timeout(self):
+        """Test cached pages are reloaded once the version expires, even without a bump"""
+        plan = self.make_plans(1)[0]
+        self.client.get(reverse('workout_plans_list'))
+        # Renamed on another worker, whose invalidate() never reaches this cache
+        WorkoutPlan.objects.filter(pk=plan.pk).update(name='Renamed Plan')
+        self.assertNotContains(self.client.get(reverse('workout_plans_list')), 'Renamed Plan')
+        
+        with mock.patch('time.time', return_value=time.time() + plans.VERSION_TIMEOUT + 1):
+            self.assertContains(self.client.get(reverse('workout_plans_list')), 'Renamed Plan')
+    
+    def test_dashboard_shows_annotated_plans(self):
+        """Test the dashboard lists plans with counts in a fixed number of queries"""
+        self.make_plans(3, user=self.user, privacy='private', exercises=2)
+        self.make_plans(10)
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, '2 exercises')
+        self.assertEqual(len(response.context['workout_plans']), 8)
+
+
+class PlanLeaderboardTests(TestCase):
+    """Test the cached popular plans leaderboard"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.owner = User.objects.create_user(username='coach')
+        self.exercise = GlobalExercise.objects.create(name='Squat', equipment_type='barbell', primary_muscle_group='legs')
+        self.popular = self.make_plan('Popular', times_used=10)
+        self.niche = self.make_plan('Niche', times_used=2)
+        self.mine = self.make_plan('Mine', times_used=50, user=self.user)
+    
+    def make_plan(self, name, times_used=0, user=None, privacy='shared'):
+        plan = WorkoutPlan.objects.create(user=user or self.owner, name=name, privacy=privacy, times_used=times_used)
+        PlannedExercise.objects.create(workout_plan=plan, global_exercise=self.exercise, order=1)
+        return plan
+    
+    def start(self, plan):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('start_workout_from_plan', args=[plan.id]))
+    
+    def test_refresh_command_builds_board(self):
+        """Test the command ranks shared plans with owner names and exercise counts"""
+        self.make_plan('Private', times_used=99, privacy='private')
+        out = StringIO()
+        call_command('refresh_popular_plans', verbosity=2, stdout=out)
+        self.assertIn('3 shared plans', out.getvalue())
+        self.assertIn('Popular by coach (1 exercises, used 10 times)', out.getvalue())
+        self.assertEqual([entry['name'] for entry in plans.leaderboard()], ['Mine', 'Popular', 'Niche'])
+    
+    def test_dashboard_reads_board_without_own_plans(self):
+        """Test the dashboard skips the viewer's plans and doesn't query for shared plans"""
+        plans.refresh_leaderboard()
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('dashboard'))
+        names = [plan['name'] for plan in response.context['workout_plans'] if isinstance(plan, dict)]
+        self.assertEqual(names, ['Popular', 'Niche'])
+    
+    def test_plan_starts_update_board(self):
+        """Test starting a plan bumps its count and lets a new plan onto the board"""
+        plans.refresh_leaderboard()
+        for _ in range(9):
+            self.start(self.niche)
+        newcomer = self.make_plan('Newcomer')
+        plans.refresh_leaderboard()  # creating a plan drops the board
+        self.start(newcomer)
+        
+        board = {entry['name']: entry['times_used'] for entry in plans.leaderboard()}
+        self.assertEqual(board['Niche'], 11)
+        self.assertEqual(board['Newcomer'], 1)
+        self.assertEqual([entry['name'] for entry in plans.leaderboard()][:3], ['Mine', 'Niche', 'Popular'])
+        
+        WorkoutPlan.objects.filter(pk=self.popular.pk).update(times_used=0)
+        self.assertEqual(plans.leaderboard()[2]['name'], 'Popular')
+        self.assertEqual([entry['name'] for entry in plans.refresh_leaderboard()][2], 'Newcomer')
+    
+    def test_editing_a_plan_drops_board(self):
+        """Test renaming a plan shows on the next dashboard load"""
+        plans.refresh_leaderboard()
+        self.popular.name = 'Renamed'
+        self.popular.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Renamed')
+
+
+class WorkoutStateTests(TestCase):
+    """Test the fixed-query active workout state and its JSON endpoint"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        UserSettings.objects.update_or_create(user=self.user, defaults={'default_rest_time': 120})
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Push Day')
+    
+    def add_exercises(self, count, sets=3):
+        created = []
+        for i in range(count):
+            exercise = GlobalExercise.objects.create(
+                name=f'Exercise {SessionExercise.objects.count()}', equipment_type='barbell', primary_muscle_group='chest'
+            )
+            session_ex = SessionExercise.objects.create(
+                logged_workout=self.workout, global_exercise=exercise, order=SessionExercise.objects.count() + 1
+            )
+            for _ in range(sets):
+                LoggedSet.objects.create(session_exercise=session_ex, set_number=session_ex.allocate_set_numbers(),
+                                         weight=100, reps=5)
+            created.append(session_ex)
+        catalog.invalidate()
+        return created
+    
+    def test_query_count_is_fixed(self):
+        """Test the state costs the same queries for 2 or 12 exercises"""
+        first = self.add_exercises(2)[0]
+        catalog.get_exercise(first.global_exercise_id)
+        # First view stamps the current exercise's started_at
+        with self.assertNumQueries(3):
+            workout_state.build(self.user, self.workout.id)
+        with self.assertNumQueries(2):
+            state = workout_state.build(self.user, self.workout.id)
+        self.assertEqual(state['total_exercises'], 2)
+        
+        self.add_exercises(10, sets=5)
+        catalog.get_exercise(first.global_exercise_id)
+        with self.assertNumQueries(2):
+            state = workout_state.build(self.user, self.workout.id)
+            names = [ex.get_exercise_name() for ex in state['exercises']]
+        self.assertEqual(len(names), 12)
+        self.assertEqual([ex.set_count for ex in state['exercises']], [3, 3] + [5] * 10)
+        self.assertEqual(len(state['current_sets']), 3)
+        self.assertEqual(state['settings'].default_rest_time, 120)
+    
+    def test_exercise_missing_from_catalog_is_fetched(self):
+        """Test an exercise the process's catalog hasn't seen yet is loaded from the database"""
+        self.add_exercises(1)
+        catalog.exercises_by_id()
+        # bulk_create skips the signal that invalidates the catalog, like a write on another worker
+        exercise, = GlobalExercise.objects.bulk_create([
+            GlobalExercise(name='Incline Press', equipment_type='barbell', primary_muscle_group='chest')
+        ])
+        SessionExercise.objects.create(logged_workout=self.workout, global_exercise_id=exercise.id, order=2)
+        workout_state.build(self.user, self.workout.id)
+        with self.assertNumQueries(3):
+            state = workout_state.build(self.user, self.workout.id)
+        self.assertEqual(state['exercises'][1].global_exercise_id, exercise.id)
+        self.assertEqual(workout_state.serialize(state)['exercises'][1]['name'], 'Incline Press')
+    
+    def test_current_exercise_and_progress(self):
+        """Test the first incomplete exercise is current and gets its started_at"""
+        first, second, third = self.add_exercises(3)
+        first.completed_at = timezone.now()
+        first.save()
+        state = workout_state.build(self.user, self.workout.id)
+        self.assertEqual(state['current_exercise'], second)
+        self.assertEqual(state['completed_exercises'], 1)
+        self.assertFalse(state['all_completed'])
+        second.refresh_from_db()
+        self.assertIsNotNone(second.started_at)
+        
+        SessionExercise.objects.filter(logged_workout=self.workout).update(completed_at=timezone.now())
+        state = workout_state.build(self.user, self.workout.id)
+        self.assertTrue(state['all_completed'])
+        self.assertEqual(state['current_exercise'], first)
+    
+    def test_active_workout_page_uses_state(self):
+        """Test the page renders set counts from the annotation"""
+        self.add_exercises(4)
+        self.client.get(reverse('active_workout', args=[self.workout.id]))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('active_workout', args=[self.workout.id]))
+        self.assertContains(response, '3 sets logged', count=4)
+        self.assertEqual(response.context['total_exercises'], 4)
+    
+    def test_empty_workout_redirects(self):
+        """Test a workout without exercises still sends the user to end it"""
+        response = self.client.get(reverse('active_workout', args=[self.workout.id]))
+        self.assertRedirects(response, reverse('end_workout', args=[self.workout.id]))
+        response = self.client.get(reverse('api_workout_state', args=[self.workout.id]))
+        self.assertEqual(response.json()['total_exercises'], 0)
+        self.assertIsNone(response.json()['current_exercise'])
+    
+    def test_state_api(self):
+        """Test the JSON state matches the page"""
+        first, second = self.add_exercises(2)
+        response = self.client.get(reverse('api_workout_state', args=[self.workout.id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['workout']['name'], 'Push Day')
+        self.assertEqual(data['settings']['default_rest_time'], 120)
+        self.assertEqual(data['current_exercise']['id'], first.id)
+        self.assertEqual(data['current_exercise']['name'], first.global_exercise.name)
+        self.assertEqual([s['set_number'] for s in data['current_exercise']['sets']], [1, 2, 3])
+        self.assertEqual(data['current_exercise']['sets'][0]['weight'], '100.00')
+        self.assertEqual([(ex['id'], ex['set_count'], ex['is_current']) for ex in data['exercises']],
+                         [(first.id, 3, True), (second.id, 3, False)])
+    
+    def test_other_users_workout_is_not_found(self):
+        """Test another user's workout 404s on the page and the API"""
+        self.add_exercises(1)
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(reverse('active_workout', args=[self.workout.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_workout_state', args=[self.workout.id])).status_code, 404)
+
+
+class LiveEventsTests(TestCase):
+    """Test live workout events: the broker, the publishing views and the ASGI stream"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.cookie = f'{django_settings.SESSION_COOKIE_NAME}={self.client.cookies[django_settings.SESSION_COOKIE_NAME].value}'
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Push Day')
+        exercise = GlobalExercise.objects.create(name='Bench Press', equipment_type='barbell', primary_muscle_group='chest')
+        self.first, self.second = [
+            SessionExercise.objects.create(logged_workout=self.workout, global_exercise=exercise, order=order)
+            for order in (1, 2)
+        ]
+        self.loop = asyncio.new_event_loop()
+        self.queue = live.broker.subscribe(self.workout.id, loop=self.loop)
+        # As Django's test client does: recycling connections would end the test's transaction
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+    
+    def tearDown(self):
+        live.broker.unsubscribe(self.workout.id, self.queue)
+        self.loop.close()
+    
+    def next_event(self):
+        return self.loop.run_until_complete(asyncio.wait_for(self.queue.get(), 1))
+    
+    def test_views_publish_after_commit(self):
+        """Test set and exercise changes reach subscribers once committed"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('add_set', args=[self.first.id]),
+                                        {'weight': 135, 'reps': 5}, content_type='application/json')
+        self.assertTrue(self.queue.empty())
+        for callback in callbacks:
+            callback()
+        _, event, data = self.next_event()
+        self.assertEqual(event, 'set-added')
+        self.assertEqual(data['set']['id'], response.json()['set_id'])
+        self.assertEqual(data['set']['weight'], '135.00')
+        self.assertEqual(data['session_exercise_id'], self.first.id)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_set', args=[data['set']['id']]))
+        self.assertEqual(self.next_event()[1:], ('set-deleted', {
+            'session_exercise_id': self.first.id, 'set_id': data['set']['id'], 'set_number': 1,
+        }))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('select_next_exercise', args=[self.first.id, self.second.id]))
+        _, event, data = self.next_event()
+        self.assertEqual((event, data['session_exercise_id'], data['next_exercise_id']),
+                         ('exercise-completed', self.first.id, self.second.id))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('complete_exercise', args=[self.second.id]))
+        _, event, data = self.next_event()
+        self.assertEqual((event, data['session_exercise_id'], data['next_exercise_id']),
+                         ('exercise-completed', self.second.id, None))
+    
+    def test_slow_subscriber_is_closed(self):
+        """Test a stream that falls QUEUE_SIZE events behind gets the close marker"""
+        for i in range(live.QUEUE_SIZE + 1):
+            live.broker.publish(self.workout.id, 'set-added', {'i': i})
+        self.assertIsNone(self.next_event())
+        self.assertTrue(self.queue.empty())
+    
+    def test_wsgi_fallback_stops_event_source(self):
+        """Test the Django view answers 204 for the owner and 404 for anyone else"""
+        response = self.client.get(reverse('workout_events', args=[self.workout.id]))
+        self.assertEqual(response.status_code, 204)
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        response = self.client.get(reverse('workout_events', args=[self.workout.id]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_page_opens_stream_only_under_asgi(self):
+        """Test the active workout page only starts an EventSource when async views are on"""
+        url = reverse('active_workout', args=[self.workout.id])
+        self.assertNotContains(self.client.get(url), 'new EventSource')
+        with self.settings(ASYNC_VIEWS=True):
+            self.assertContains(self.client.get(url), 'new EventSource')
+    
+    async def open_stream(self, cookie=None, path=None, root_path=''):
+        """Run the ASGI router on one request; returns (task, inbox for receive(), sent messages)"""
+        async def django_app(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'django'})
+        
+        inbox = asyncio.Queue()
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {
+            'type': 'http', 'method': 'GET',
+            'path': root_path + (path or reverse('workout_events', args=[self.workout.id])),
+            'root_path': root_path,
+            'headers': [(b'cookie', (cookie or self.cookie).encode())],
+        }
+        task = asyncio.ensure_future(live.EventsRouter(django_app)(scope, inbox.get, send))
+        while len(sent) < 2 and not task.done():
+            await asyncio.sleep(0.01)
+        return task, inbox, sent
+    
+    async def test_stream_delivers_events(self):
+        """Test the ASGI stream sends published events as SSE frames until the client disconnects"""
+        task, inbox, sent = await self.open_stream()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertEqual(sent[1]['body'], f'retry: {live.RETRY_MS}\n\n'.encode())
+        self.assertEqual(live.broker.subscriber_count(self.workout.id), 2)
+        
+        live.broker.publish(self.workout.id, 'set-added', {'set': {'id': 7}})
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        frame = sent[2]['body'].decode()
+        self.assertIn('event: set-added\n', frame)
+        self.assertIn('data: {"set": {"id": 7}}\n\n', frame)
+        self.assertTrue(sent[2]['more_body'])
+        
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(live.broker.subscriber_count(self.workout.id), 1)
+    
+    async def test_stream_requires_the_owner(self):
+        """Test streams for anonymous users and other users' workouts are refused"""
+        task, _, sent = await self.open_stream(cookie='sessionid=missing')
+        await task
+        self.assertEqual(sent[0]['status'], 404)
+        
+        await User.objects.acreate(username='other')
+        other = await LoggedWorkout.objects.acreate(user=await User.objects.aget(username='other'), name='Legs')
+        task, _, sent = await self.open_stream(path=reverse('workout_events', args=[other.id]))
+        await task
+        self.assertEqual(sent[0]['status'], 404)
+        self.assertEqual(live.broker.subscriber_count(other.id), 0)
+    
+    async def test_stream_runs_request_signals(self):
+        """Test opening a stream sends request_started/finished, so old connections are closed"""
+        senders = []
+        
+        def receiver(sender, **kwargs):
+            senders.append(sender)
+        
+        for signal in (request_started, request_finished):
+            signal.connect(receiver)
+            self.addCleanup(signal.disconnect, receiver)
+        task, inbox, sent = await self.open_stream()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(senders, [live.EventsRouter, live.EventsRouter])
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+    
+    async def test_stream_under_root_path(self):
+        """Test streams are found when the site is mounted below a root_path"""
+        task, inbox, sent = await self.open_stream(root_path='/gym')
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+    
+    async def test_other_paths_go_to_django(self):
+        """Test the router only intercepts event streams"""
+        task, _, sent = await self.open_stream(path=reverse('active_workout', args=[self.workout.id]))
+        await task
+        self.assertEqual(sent[1]['body'], b'django')
+    
+    async def test_many_idle_streams(self):
+        """Test hundreds of idle streams on one loop share a single publish"""
+        streams = [await self.open_stream() for _ in range(300)]
+        self.assertEqual(live.broker.subscriber_count(self.workout.id), 301)
+        self.assertEqual(live.broker.publish(self.workout.id, 'exercise-completed', {}), 301)
+        await asyncio.sleep(0.05)
+        self.assertTrue(all(len(sent) == 3 for _, _, sent in streams))
+        for task, inbox, _ in streams:
+            await inbox.put({'type': 'http.disconnect'})
+        await asyncio.gather(*(task for task, _, _ in streams))
+        self.assertEqual(live.broker.subscriber_count(self.workout.id), 1)
+
+
+class AsyncViewTests(TestCase):
+    """Test the site served under ASGI"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.workout = LoggedWorkout.objects.create(user=self.user, name='Push Day')
+        exercise = GlobalExercise.objects.create(name='Bench Press', equipment_type='barbell', primary_muscle_group='chest')
+        self.session_exercise = SessionExercise.objects.create(
+            logged_workout=self.workout, global_exercise=exercise, order=1
+        )
+        self.factory = AsyncRequestFactory()
+    
+    def test_only_exports_and_events_are_async(self):
+        """Test every tracker URL resolves to a sync view, whatever ASYNC_VIEWS says"""
+        for pattern in tracker_urls.urlpatterns:
+            with self.subTest(url_name=pattern.name):
+                self.assertFalse(iscoroutinefunction(pattern.callback))
+    
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_set_lifecycle(self):
+        """Test the sync set endpoints keep summaries, records and numbering in step through the ASGI handler"""
+        await self.async_client.aforce_login(self.user)
+        
+        async def post(url_name, args, body=None):
+            response = await self.async_client.post(
+                reverse(url_name, args=args), json.dumps(body or {}), content_type='application/json'
+            )
+            return response.json()
+        
+        data = await post('add_set', [self.session_exercise.id], {'weight': 100, 'reps': 5, 'rest_duration': 90})
+        self.assertEqual((data['set_number'], data['rest_duration']), (1, 90))
+        workout = await LoggedWorkout.objects.aget(id=self.workout.id)
+        self.assertEqual((workout.set_count, workout.total_volume), (1, Decimal('500')))
+        self.assertEqual(await PersonalRecord.objects.filter(user=self.user).acount(), 2)
+        
+        set_id = data['set_id']
+        self.assertEqual(await post('update_set', [set_id], {'weight': 120}), {'success': True})
+        workout = await LoggedWorkout.objects.aget(id=self.workout.id)
+        self.assertEqual(workout.total_volume, Decimal('600'))
+        
+        self.assertEqual(await post('delete_set', [set_id]), {'success': True})
+        session_exercise = await SessionExercise.objects.aget(id=self.session_exercise.id)
+        self.assertEqual(session_exercise.last_set_number, 0)
+        workout = await LoggedWorkout.objects.aget(id=self.workout.id)
+        self.assertEqual((workout.set_count, workout.total_volume), (0, Decimal('0')))
+    
+    async def test_static_files_middleware_stays_async(self):
+        """Test the WhiteNoise wrapper joins an async middleware chain"""
+        async def get_response(request):
+            return HttpResponse('view')
+        
+        middleware = StaticFilesMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(self.factory.get('/dashboard/'))
+        self.assertEqual(response.content, b'view')
+        
+        sync_middleware = StaticFilesMiddleware(lambda request: HttpResponse('sync view'))
+        self.assertFalse(iscoroutinefunction(sync_middleware))
+        self.assertEqual(sync_middleware(RequestFactory().get('/dashboard/')).content, b'sync view')
@@ -17,12 +17,21 @@ urlpatterns = [
     path('workout/<int:workout_id>/', views.active_workout, name='active_workout'),
     path('workout/<int:workout_id>/end/', views.end_workout, name='end_workout'),
     path('workout/<int:workout_id>/detail/', views.workout_detail, name='workout_detail'),
+    path('workouts/', views.workout_history, name='workout_history'),
+    path('export/', views.export_training_log, name='export_training_log'),
+    path('import/', views.import_training_log, name='import_training_log'),
     
     # AJAX Endpoints
     path('api/set/add/<int:session_exercise_id>/', views.add_set, name='add_set'),
+    path('api/set/add/batch/', views.add_sets_bulk, name='add_sets_bulk'),
     path('api/set/<int:set_id>/update/', views.update_set, name='update_set'),
     path('api/set/<int:set_id>/delete/', views.delete_set, name='delete_set'),
     path('api/exercise/<int:session_exercise_id>/complete/', views.complete_exercise, name='complete_exercise'),
     path('api/exercise/<int:session_exercise_id>/select/<int:next_exercise_id>/', views.select_next_exercise, name='select_next_exercise'),
+    path('api/workout/<int:workout_id>/reorder/', views.reorder_exercises, name='reorder_exercises'),
+    path('api/workout/<int:workout_id>/state/', views.api_workout_state, name='api_workout_state'),
+    path('api/workout/<int:workout_id>/events/', views.workout_events, name='workout_events'),
+    path('api/workouts/', views.api_workouts, name='api_workouts'),
+    path('api/exercise/progress/', views.exercise_progress, name='exercise_progress'),
     path('api/plates/calculate/', views.calculate_plates, name='calculate_plates'),
 ]
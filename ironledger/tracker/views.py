@@ -1,18 +1,28 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Max, Prefetch, Q, Sum
 from .forms import SignUpForm, LoginForm
+from . import analytics, catalog, exports, history, imports, live, plans, plates, records, summaries, workout_state
 from .models import (
     WorkoutPlan, PlannedExercise, LoggedWorkout, SessionExercise, 
     LoggedSet, GlobalExercise, CustomExercise, UserSettings
 )
+import csv
+import gzip
+import io
 import json
+import logging
+from collections import defaultdict
 from decimal import Decimal
 
+logger = logging.getLogger('ironledger.tracker.views')
+
 
 def home(request):
     """Home page view"""
@@ -81,19 +91,12 @@ def dashboard(request):
         is_active=True
     ).first()
     
-    # Get available workout plans (user's own and shared plans)
-    user_plans = WorkoutPlan.objects.filter(
-        user=request.user,
-        is_active=True
-    ).prefetch_related('planned_exercises').order_by('-updated_at')[:5]
-    
-    shared_plans = WorkoutPlan.objects.filter(
-        privacy='shared',
-        is_active=True
-    ).exclude(user=request.user).prefetch_related('planned_exercises').order_by('-times_used')[:5]
+    # Get available workout plans (user's own, then the shared plans leaderboard)
+    user_plans = plans.user_plans(request.user)[:5]
+    shared_plans = plans.leaderboard_for(request.user, limit=5)
     
     # Combine for display
-    workout_plans = list(user_plans) + list(shared_plans)
+    workout_plans = list(user_plans) + shared_plans
     
     context = {
         'recent_workouts': recent_workouts,
@@ -105,20 +108,17 @@ def dashboard(request):
 
 @login_required
 def workout_plans_list(request):
-    """List all available workout plans"""
-    user_plans = WorkoutPlan.objects.filter(
-        user=request.user,
-        is_active=True
-    ).order_by('-updated_at')
-    
-    shared_plans = WorkoutPlan.objects.filter(
-        privacy='shared',
-        is_active=True
-    ).exclude(user=request.user).order_by('-times_used')
+    """List the user's plans and a page of popular shared plans"""
+    page = plans.parse_page(request.GET.get('page'))
+    user_plans = plans.user_plans(request.user) if page == 1 else []
+    shared_plans, has_next = plans.popular_for(request.user, page)
     
     context = {
         'user_plans': user_plans,
         'shared_plans': shared_plans,
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if has_next and page < plans.MAX_PAGE else None,
     }
     return render(request, 'tracker/workout_plans_list.html', context)
 
@@ -130,7 +130,7 @@ def start_workout(request, plan_id=None):
     if plan_id:
         plan = get_object_or_404(WorkoutPlan, id=plan_id, is_active=True)
         # Check if user can access this plan
-        if plan.user != request.user and plan.privacy != 'shared':
+        if plan.user_id != request.user.id and plan.privacy != 'shared':
             messages.error(request, 'You do not have access to this workout plan.')
             return redirect('dashboard')
     
@@ -139,59 +139,62 @@ def start_workout(request, plan_id=None):
         selected_exercises = request.POST.getlist('exercises')  # For quick workout
         exercise_order = request.POST.get('exercise_order', '')  # Ordered list from drag-and-drop
         
-        # Create the logged workout
-        workout = LoggedWorkout.objects.create(
-            user=request.user,
-            workout_plan=plan,
-            name=workout_name or (plan.name if plan else 'Quick Workout'),
-            started_at=timezone.now()
-        )
-        
-        # If starting from a plan, copy exercises
+        # Build the session rows first so the workout, its exercises and the
+        # plan usage bump go in as one transaction with a fixed number of queries
         if plan:
-            planned_exercises = plan.planned_exercises.all().order_by('order')
-            for planned_ex in planned_exercises:
-                SessionExercise.objects.create(
-                    logged_workout=workout,
-                    global_exercise=planned_ex.global_exercise,
-                    custom_exercise=planned_ex.custom_exercise,
+            session_exercises = [
+                SessionExercise(
+                    global_exercise_id=planned_ex.global_exercise_id,
+                    custom_exercise_id=planned_ex.custom_exercise_id,
                     order=planned_ex.order,
                     notes=planned_ex.notes
                 )
-            # Increment plan usage
-            plan.increment_usage()
-        elif exercise_order:
-            # Use the custom order from drag-and-drop
-            exercise_ids = exercise_order.split(',')
-            for idx, exercise_id in enumerate(exercise_ids, 1):
-                try:
-                    global_exercise = GlobalExercise.objects.get(id=exercise_id)
-                    SessionExercise.objects.create(
-                        logged_workout=workout,
-                        global_exercise=global_exercise,
-                        order=idx
-                    )
-                except GlobalExercise.DoesNotExist:
-                    continue
-        elif selected_exercises:
-            # Fallback: Quick workout - add selected global exercises (original order)
-            for idx, exercise_id in enumerate(selected_exercises, 1):
-                global_exercise = GlobalExercise.objects.get(id=exercise_id)
-                SessionExercise.objects.create(
-                    logged_workout=workout,
-                    global_exercise=global_exercise,
-                    order=idx
+                for planned_ex in plan.planned_exercises.all().order_by('order')
+            ]
+        else:
+            # Drag-and-drop order if given, else the checkbox order (quick workout).
+            # Ids are looked up in the cached catalog first.
+            exercise_ids = exercise_order.split(',') if exercise_order else selected_exercises
+            exercises = [catalog.get_exercise(exercise_id) for exercise_id in exercise_ids]
+            missing = [exercise_id for exercise_id, exercise in zip(exercise_ids, exercises) if exercise is None]
+            if missing:
+                # This process's catalog may predate them (added on another worker)
+                fetched = GlobalExercise.objects.in_bulk(
+                    [int(exercise_id) for exercise_id in missing if exercise_id.isdigit()]
                 )
+                exercises = [
+                    exercise or (fetched.get(int(exercise_id)) if exercise_id.isdigit() else None)
+                    for exercise_id, exercise in zip(exercise_ids, exercises)
+                ]
+                if None in exercises:
+                    messages.error(request, 'Some of the selected exercises no longer exist. Please choose again.')
+                    return redirect('start_workout')
+            session_exercises = [
+                SessionExercise(global_exercise=global_exercise, order=idx)
+                for idx, global_exercise in enumerate(exercises, 1)
+            ]
+        
+        with transaction.atomic():
+            workout = LoggedWorkout.objects.create(
+                user=request.user,
+                workout_plan=plan,
+                name=workout_name or (plan.name if plan else 'Quick Workout'),
+                started_at=timezone.now(),
+                exercise_count=len(session_exercises)
+            )
+            for session_ex in session_exercises:
+                session_ex.logged_workout = workout
+            SessionExercise.objects.bulk_create(session_exercises)
+            if plan:
+                plan.increment_usage()
         
         messages.success(request, f'Workout started: {workout.name}')
         return redirect('active_workout', workout_id=workout.id)
     
-    # Get all global exercises for quick workout selection
-    global_exercises = GlobalExercise.objects.filter(is_active=True).order_by('primary_muscle_group', 'name')
-    
+    # Catalog for quick workout selection, grouped by muscle (served from cache)
     context = {
         'plan': plan,
-        'global_exercises': global_exercises,
+        'exercises_by_group': catalog.grouped_by_muscle(),
     }
     return render(request, 'tracker/start_workout.html', context)
 
@@ -199,68 +202,56 @@ def start_workout(request, plan_id=None):
 @login_required
 def active_workout(request, workout_id):
     """Active workout session - main logging interface (one exercise at a time)"""
-    workout = get_object_or_404(LoggedWorkout, id=workout_id, user=request.user)
-    
-    # Get user settings for plate calculator
-    settings, created = UserSettings.objects.get_or_create(user=request.user)
-    
-    # Get all exercises in this workout
-    session_exercises = workout.session_exercises.all().order_by('order')
-    
-    if not session_exercises.exists():
+    state = workout_state.build(request.user, workout_id)
+    if not state['exercises']:
         messages.warning(request, 'No exercises in this workout. Add some exercises to get started!')
-        return redirect('end_workout', workout_id=workout.id)
-    
-    # Determine current exercise (first one without completed_at, or first if all completed)
-    current_exercise = session_exercises.filter(completed_at__isnull=True).first()
-    if not current_exercise:
-        # All exercises completed
-        current_exercise = session_exercises.first()
-        all_completed = True
-    else:
-        all_completed = False
-        # Set started_at if this is the first time viewing this exercise
-        if not current_exercise.started_at:
-            current_exercise.started_at = timezone.now()
-            # DON'T set rest_before_duration here - it will be set when first set is logged
-            current_exercise.save(update_fields=['started_at'])
-            print(f"DEBUG: Started exercise {current_exercise.id} at {current_exercise.started_at} - rest will be calculated when first set is logged")
+        return redirect('end_workout', workout_id=workout_id)
 
-    
-    # Get sets for current exercise
-    current_sets = current_exercise.logged_sets.all().order_by('set_number') if current_exercise else []
-    
-    # Get exercise details for weight increment type
-    exercise_obj = current_exercise.global_exercise or current_exercise.custom_exercise if current_exercise else None
-    
-    # Calculate progress
-    completed_exercises = session_exercises.filter(completed_at__isnull=False).count()
-    total_exercises = session_exercises.count()
-    
     context = {
-        'workout': workout,
-        'current_exercise': current_exercise,
-        'exercise_obj': exercise_obj,
-        'current_sets': current_sets,
-        'settings': settings,
-        'all_exercises': session_exercises,
-        'completed_exercises': completed_exercises,
-        'total_exercises': total_exercises,
-        'all_completed': all_completed,
+        'workout': state['workout'],
+        'current_exercise': state['current_exercise'],
+        'exercise_obj': state['exercise_obj'],
+        'current_sets': state['current_sets'],
+        'settings': state['settings'],
+        'all_exercises': state['exercises'],
+        'completed_exercises': state['completed_exercises'],
+        'total_exercises': state['total_exercises'],
+        'all_completed': state['all_completed'],
+        # Event streams need ASGI; under WSGI each one would cost a worker request answering 204
+        'live_updates': settings.ASYNC_VIEWS,
     }
     return render(request, 'tracker/active_workout.html', context)
 
 
+@login_required
+def api_workout_state(request, workout_id):
+    """Active workout state as JSON, so the page can refresh without a full render"""
+    return JsonResponse(workout_state.serialize(workout_state.build(request.user, workout_id)))
+
+
+@login_required
+def workout_events(request, workout_id):
+    """
+    Live workout events (Server-Sent Events). Under ASGI tracker.live serves
+    this URL before it reaches Django; getting here means a WSGI server, so
+    answer 204 No Content, which tells EventSource not to reconnect.
+    """
+    get_object_or_404(LoggedWorkout, id=workout_id, user=request.user)
+    return HttpResponse(status=204)
+
+
 @login_required
 def add_set(request, session_exercise_id):
     """Add a set to a session exercise (AJAX endpoint)"""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
     
-    session_exercise = get_object_or_404(SessionExercise, id=session_exercise_id)
+    session_exercise = get_object_or_404(
+        SessionExercise.objects.select_related('logged_workout'), id=session_exercise_id
+    )
     
     # Verify ownership
-    if session_exercise.logged_workout.user != request.user:
+    if session_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     # Verify workout is still active
@@ -268,34 +259,46 @@ def add_set(request, session_exercise_id):
         return JsonResponse({'error': 'Workout already ended'}, status=400)
     
     try:
-        data = json.loads(request.body)
-        weight = Decimal(str(data.get('weight', 0)))
-        reps = int(data.get('reps', 0))
-        is_warmup = data.get('is_warmup', False)
-        is_dropset = data.get('is_dropset', False)
-        notes = data.get('notes', '')
-        # Accept rest_duration from frontend if provided (from actual timer)
-        rest_duration_from_client = data.get('rest_duration', None)
-        
-        # Get the next set number
-        last_set = session_exercise.logged_sets.order_by('-set_number').first()
-        set_number = (last_set.set_number + 1) if last_set else 1
-        
-        # For first set, handle rest_before_duration
-        if set_number == 1 and session_exercise.rest_before_duration is None:
-            # If client provided rest duration, use it (from timer between exercises)
-            if rest_duration_from_client is not None:
-                session_exercise.rest_before_duration = rest_duration_from_client
-                session_exercise.save(update_fields=['rest_before_duration'])
-                print(f"DEBUG: First set - using rest duration from client timer: {rest_duration_from_client}s")
+        fields = _parse_set(request.body)
+        logged_set = _log_set(session_exercise, **fields)
         
-        # Use rest duration from client (actual timer) if provided
-        rest_duration = rest_duration_from_client
-        
-        if rest_duration is not None:
-            print(f"DEBUG: Using rest duration from client: {rest_duration}s")
-        else:
-            print(f"DEBUG: No rest duration - first set of workout or timer not used")
+        return JsonResponse({
+            'success': True,
+            'set_id': logged_set.id,
+            'set_number': logged_set.set_number,
+            'rest_duration': logged_set.rest_duration,
+        })
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+def _parse_set(body):
+    """Fields of a new set from an add_set JSON body"""
+    data = json.loads(body)
+    # Accept rest_duration from frontend if provided (from actual timer)
+    rest_duration = data.get('rest_duration', None)
+    if rest_duration is not None:
+        logger.debug('Using rest duration from client: %ss', rest_duration)
+    else:
+        logger.debug('No rest duration - first set of workout or timer not used')
+    return {
+        'weight': Decimal(str(data.get('weight', 0))),
+        'reps': int(data.get('reps', 0)),
+        'is_warmup': data.get('is_warmup', False),
+        'is_dropset': data.get('is_dropset', False),
+        'notes': data.get('notes', ''),
+        'rest_duration': rest_duration,
+    }
+
+
+def _log_set(session_exercise, weight, reps, is_warmup, is_dropset, notes, rest_duration):
+    """Number, store and count one set and update records in a single transaction; returns the LoggedSet"""
+    with transaction.atomic():
+        # Get the next set number from the atomic per-exercise counter; on the
+        # first set the client's rest duration (timer between exercises) also
+        # becomes the exercise's rest_before_duration
+        set_number = session_exercise.allocate_set_numbers(rest_before=rest_duration)
         
         # Create the set
         logged_set = LoggedSet.objects.create(
@@ -310,16 +313,154 @@ def add_set(request, session_exercise_id):
             completed_at=timezone.now(),
             rest_duration=rest_duration
         )
-        
-        return JsonResponse({
-            'success': True,
-            'set_id': logged_set.id,
-            'set_number': set_number,
-            'rest_duration': rest_duration,
-        })
+        summaries.adjust(
+            session_exercise.logged_workout_id,
+            sets=1,
+            volume=summaries.set_volume(weight, reps, is_warmup)
+        )
+        records.apply_set(logged_set)
+        live.set_added(logged_set, session_exercise.logged_workout_id)
+    return logged_set
+
+
+def _parse_set_item(item):
+    """Validate one set from a batch payload, raising ValueError on bad input"""
+    if not isinstance(item, dict):
+        raise ValueError('Each set must be an object')
+    rest_duration = item.get('rest_duration', None)
+    key = item.get('idempotency_key') or None
+    if key is not None and len(str(key)) > 64:
+        raise ValueError('idempotency_key must be at most 64 characters')
+    return {
+        'session_exercise_id': int(item['session_exercise_id']),
+        'weight': Decimal(str(item.get('weight', 0))),
+        'reps': int(item.get('reps', 0)),
+        'is_warmup': bool(item.get('is_warmup', False)),
+        'is_dropset': bool(item.get('is_dropset', False)),
+        'notes': item.get('notes', ''),
+        'rest_duration': int(rest_duration) if rest_duration is not None else None,
+        'idempotency_key': str(key) if key is not None else None,
+    }
+
+
+@login_required
+def add_sets_bulk(request):
+    """
+    Add many sets in one request (AJAX endpoint).
+    Used by clients replaying sets queued while offline. Each item may carry
+    an idempotency_key so a retried batch never logs the same set twice.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=400)
     
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        items = json.loads(request.body).get('sets')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': 'sets must be a non-empty list'}, status=400)
+    
+    results = [None] * len(items)
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            parsed[index] = _parse_set_item(item)
+        except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+            results[index] = {'index': index, 'status': 'error', 'error': str(e) or 'Invalid set'}
+    
+    exercise_ids = {data['session_exercise_id'] for data in parsed.values()}
+    keys = {data['idempotency_key'] for data in parsed.values() if data['idempotency_key']}
+    
+    try:
+        with transaction.atomic():
+            # Ownership check for every exercise in one query
+            session_exercises = SessionExercise.objects.filter(
+                id__in=exercise_ids,
+                logged_workout__user=request.user,
+                logged_workout__ended_at__isnull=True,
+            ).in_bulk()
+            
+            # Sets already stored under one of the batch's keys, by (exercise, key)
+            existing = {
+                (logged_set.session_exercise_id, logged_set.idempotency_key): logged_set
+                for logged_set in LoggedSet.objects.filter(
+                    session_exercise_id__in=session_exercises.keys(),
+                    idempotency_key__in=keys,
+                ).only('id', 'session_exercise_id', 'idempotency_key', 'set_number')
+            } if keys else {}
+            
+            now = timezone.now()
+            to_create = []
+            duplicates = []
+            for index, data in parsed.items():
+                session_exercise = session_exercises.get(data['session_exercise_id'])
+                if session_exercise is None:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'error': 'Session exercise not found or workout ended'}
+                    continue
+                
+                key = data['idempotency_key']
+                if key and (session_exercise.id, key) in existing:
+                    duplicates.append((index, existing[(session_exercise.id, key)]))
+                    continue
+                
+                logged_set = LoggedSet(
+                    session_exercise=session_exercise,
+                    weight=data['weight'],
+                    reps=data['reps'],
+                    is_warmup=data['is_warmup'],
+                    is_dropset=data['is_dropset'],
+                    notes=data['notes'],
+                    started_at=now,
+                    completed_at=now,
+                    rest_duration=data['rest_duration'],
+                    idempotency_key=key,
+                )
+                to_create.append((index, logged_set))
+                if key:
+                    # Later items in this batch with the same key are duplicates of this one
+                    existing[(session_exercise.id, key)] = logged_set
+            
+            # Reserve a contiguous block of set numbers per exercise from its counter
+            new_sets = defaultdict(list)
+            for _, logged_set in to_create:
+                new_sets[logged_set.session_exercise_id].append(logged_set)
+            for session_exercise_id, exercise_sets in new_sets.items():
+                session_exercise = session_exercises[session_exercise_id]
+                first = session_exercise.allocate_set_numbers(
+                    len(exercise_sets), rest_before=exercise_sets[0].rest_duration
+                )
+                for set_number, logged_set in enumerate(exercise_sets, first):
+                    logged_set.set_number = set_number
+            
+            LoggedSet.objects.bulk_create([logged_set for _, logged_set in to_create])
+            
+            workout_deltas = defaultdict(lambda: [0, 0])
+            for _, logged_set in to_create:
+                delta = workout_deltas[logged_set.session_exercise.logged_workout_id]
+                delta[0] += 1
+                delta[1] += summaries.set_volume(logged_set.weight, logged_set.reps, logged_set.is_warmup)
+            for workout_id, (sets, volume) in workout_deltas.items():
+                summaries.adjust(workout_id, sets=sets, volume=volume)
+            
+            records.apply_sets([logged_set for _, logged_set in to_create], user_id=request.user.id)
+            for index, logged_set in to_create:
+                live.set_added(logged_set, logged_set.session_exercise.logged_workout_id)
+    except IntegrityError:
+        # A concurrent request stored one of these keys first; a retry will report duplicates
+        return JsonResponse({'error': 'Conflicting concurrent request, please retry'}, status=409)
+    
+    for status, entries in (('created', to_create), ('duplicate', duplicates)):
+        for index, logged_set in entries:
+            results[index] = {
+                'index': index,
+                'status': status,
+                'idempotency_key': logged_set.idempotency_key,
+                'set_id': logged_set.id,
+                'set_number': logged_set.set_number,
+            }
+    
+    return JsonResponse({'success': True, 'results': results})
 
 
 @login_required
@@ -328,27 +469,15 @@ def update_set(request, set_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
     
-    logged_set = get_object_or_404(LoggedSet, id=set_id)
+    logged_set = get_object_or_404(LoggedSet.objects.select_related('session_exercise__logged_workout'), id=set_id)
     
     # Verify ownership
-    if logged_set.session_exercise.logged_workout.user != request.user:
+    if logged_set.session_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     try:
-        data = json.loads(request.body)
-        
-        if 'weight' in data:
-            logged_set.weight = Decimal(str(data['weight']))
-        if 'reps' in data:
-            logged_set.reps = int(data['reps'])
-        if 'is_warmup' in data:
-            logged_set.is_warmup = data['is_warmup']
-        if 'is_dropset' in data:
-            logged_set.is_dropset = data['is_dropset']
-        if 'notes' in data:
-            logged_set.notes = data['notes']
-        
-        logged_set.save()
+        volume_change = _update_set_fields(logged_set, request.body)
+        _save_set_update(logged_set, volume_change, request.user.id)
         
         return JsonResponse({'success': True})
     
@@ -356,6 +485,33 @@ def update_set(request, set_id):
         return JsonResponse({'error': str(e)}, status=400)
 
 
+def _update_set_fields(logged_set, body):
+    """Apply an update_set JSON body to the set (unsaved); returns the change in its volume"""
+    data = json.loads(body)
+    old_volume = summaries.set_volume(logged_set.weight, logged_set.reps, logged_set.is_warmup)
+    
+    if 'weight' in data:
+        logged_set.weight = Decimal(str(data['weight']))
+    if 'reps' in data:
+        logged_set.reps = int(data['reps'])
+    if 'is_warmup' in data:
+        logged_set.is_warmup = data['is_warmup']
+    if 'is_dropset' in data:
+        logged_set.is_dropset = data['is_dropset']
+    if 'notes' in data:
+        logged_set.notes = data['notes']
+    
+    return summaries.set_volume(logged_set.weight, logged_set.reps, logged_set.is_warmup) - old_volume
+
+
+def _save_set_update(logged_set, volume_change, user_id):
+    """Save an edited set and sync its workout summary and records in a single transaction"""
+    with transaction.atomic():
+        logged_set.save()
+        summaries.adjust(logged_set.session_exercise.logged_workout_id, volume=volume_change)
+        records.update_set(logged_set, user_id=user_id)
+
+
 @login_required
 def complete_exercise(request, session_exercise_id):
     """Mark an exercise as complete and move to next (AJAX endpoint)"""
@@ -365,12 +521,13 @@ def complete_exercise(request, session_exercise_id):
     session_exercise = get_object_or_404(SessionExercise, id=session_exercise_id)
     
     # Verify ownership
-    if session_exercise.logged_workout.user != request.user:
+    if session_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     # Mark as completed
     session_exercise.completed_at = timezone.now()
     session_exercise.save()
+    live.exercise_completed(session_exercise)
     
     return JsonResponse({'success': True})
 
@@ -381,56 +538,73 @@ def select_next_exercise(request, session_exercise_id, next_exercise_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
     
-    session_exercise = get_object_or_404(SessionExercise, id=session_exercise_id)
-    next_exercise = get_object_or_404(SessionExercise, id=next_exercise_id)
+    # Both exercises in one query
+    exercises = SessionExercise.objects.select_related('logged_workout').in_bulk(
+        [session_exercise_id, next_exercise_id]
+    )
+    if session_exercise_id not in exercises or next_exercise_id not in exercises:
+        raise Http404('Session exercise not found')
+    session_exercise = exercises[session_exercise_id]
+    next_exercise = exercises[next_exercise_id]
     
     # Verify ownership
-    if session_exercise.logged_workout.user != request.user:
+    if session_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    if next_exercise.logged_workout.user != request.user:
+    if next_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     # Verify both exercises are in the same workout
     if session_exercise.logged_workout_id != next_exercise.logged_workout_id:
         return JsonResponse({'error': 'Exercises must be in same workout'}, status=400)
     
-    # Mark current exercise as completed
-    current_completion_time = timezone.now()
-    session_exercise.completed_at = current_completion_time
-    session_exercise.save()
-    print(f"DEBUG: Completed exercise {session_exercise.id} at {current_completion_time}")
-    
-    # Reorder: Make the selected exercise the next one
-    # Get all incomplete exercises
-    incomplete_exercises = SessionExercise.objects.filter(
-        logged_workout=session_exercise.logged_workout,
-        completed_at__isnull=True
-    ).order_by('order')
+    with transaction.atomic():
+        # Mark current exercise as completed
+        current_completion_time = timezone.now()
+        session_exercise.completed_at = current_completion_time
+        session_exercise.save(update_fields=['completed_at'])
+        logger.debug('Completed exercise %s at %s', session_exercise.id, current_completion_time)
+        
+        # Reorder: selected exercise first among the incomplete ones, the rest keep their order
+        session_exercise.logged_workout.move_exercise(next_exercise_id, 1, incomplete_only=True)
+        live.exercise_completed(session_exercise, next_exercise_id=next_exercise_id)
     
-    # Reorder so selected exercise is first
-    current_order = 1
-    for ex in incomplete_exercises:
-        if ex.id == next_exercise_id:
-            # Selected exercise gets order 1
-            ex.order = 0  # Temporarily set to 0 to avoid conflicts
-            ex.save()
-        else:
-            ex.order = current_order
-            ex.save()
-            current_order += 1
+    return JsonResponse({'success': True})
+
+
+@login_required
+def reorder_exercises(request, workout_id):
+    """
+    Reorder a workout's exercises (AJAX endpoint).
+    Accepts either {"session_exercise_id": id, "position": k} to move one
+    exercise, or {"order": [id, ...]} to apply a full drag-and-drop order,
+    which must list every exercise in the workout exactly once.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=400)
     
-    # Now update the selected exercise to order 1
-    next_exercise.order = 1
-    next_exercise.save()
+    workout = get_object_or_404(LoggedWorkout, id=workout_id, user=request.user)
     
-    # Renumber remaining to start from 2
-    other_exercises = incomplete_exercises.exclude(id=next_exercise_id).order_by('order')
-    for idx, ex in enumerate(other_exercises, 2):
-        ex.order = idx
-        ex.save()
+    try:
+        data = json.loads(request.body)
+        if 'order' in data:
+            exercise_ids = [int(pk) for pk in data['order']]
+            # A partial list would give the listed exercises orders already held by the rest
+            workout_ids = workout.session_exercises.values_list('id', flat=True)
+            if sorted(exercise_ids) != sorted(workout_ids):
+                return JsonResponse({'error': "Order must list each of the workout's exercises once"}, status=400)
+            workout.reorder_exercises(exercise_ids)
+        else:
+            exercise_id = int(data['session_exercise_id'])
+            position = int(data['position'])
+            if not workout.session_exercises.filter(id=exercise_id).exists():
+                return JsonResponse({'error': 'Exercise not in this workout'}, status=400)
+            workout.move_exercise(exercise_id, position)
+        
+        return JsonResponse({'success': True})
     
-    return JsonResponse({'success': True})
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
 
 @login_required
@@ -439,16 +613,32 @@ def delete_set(request, set_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
     
-    logged_set = get_object_or_404(LoggedSet, id=set_id)
+    logged_set = get_object_or_404(LoggedSet.objects.select_related('session_exercise__logged_workout'), id=set_id)
     
     # Verify ownership
-    if logged_set.session_exercise.logged_workout.user != request.user:
+    if logged_set.session_exercise.logged_workout.user_id != request.user.id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    logged_set.delete()
+    _delete_set(logged_set, request.user.id)
     return JsonResponse({'success': True})
 
 
+def _delete_set(logged_set, user_id):
+    """Delete a set and release its number, shrink the summary and sync records in a single transaction"""
+    set_id = logged_set.id
+    session_exercise = logged_set.session_exercise
+    with transaction.atomic():
+        logged_set.delete()
+        session_exercise.release_set_number(logged_set.set_number)
+        summaries.adjust(
+            session_exercise.logged_workout_id,
+            sets=-1,
+            volume=-summaries.set_volume(logged_set.weight, logged_set.reps, logged_set.is_warmup)
+        )
+        records.remove_set(logged_set, user_id=user_id)
+        live.set_deleted(session_exercise.logged_workout_id, session_exercise.id, set_id, logged_set.set_number)
+
+
 @login_required
 def end_workout(request, workout_id):
     """End an active workout"""
@@ -461,7 +651,10 @@ def end_workout(request, workout_id):
     if request.method == 'POST':
         workout.ended_at = timezone.now()
         workout.notes = request.POST.get('workout_notes', workout.notes)
-        workout.save()
+        # Only save what changed here; the summary counters are updated by set writes
+        workout.save(update_fields=['ended_at', 'notes'])
+        # Recompute the summary from the raw sets so a finished workout never carries drift
+        summaries.refresh(workout)
         
         messages.success(request, f'Workout completed! Duration: {workout.duration}')
         return redirect('workout_detail', workout_id=workout.id)
@@ -475,15 +668,33 @@ def workout_detail(request, workout_id):
     """View a completed workout"""
     workout = get_object_or_404(LoggedWorkout, id=workout_id, user=request.user)
     
-    session_exercises = workout.session_exercises.all().order_by('order')
+    # One query for exercises (names + per-exercise aggregates), one for all their sets
+    working = Q(logged_sets__is_warmup=False)
+    session_exercises = workout.session_exercises.select_related(
+        'global_exercise', 'custom_exercise'
+    ).prefetch_related(
+        Prefetch('logged_sets', queryset=LoggedSet.objects.order_by('set_number'))
+    ).annotate(
+        tonnage=Sum(
+            F('logged_sets__weight') * F('logged_sets__reps'),
+            filter=working,
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        top_weight=Max('logged_sets__weight', filter=working),
+        best_1rm=Max(records.epley_1rm_expression('logged_sets__'), filter=working),
+        total_rest=Sum('logged_sets__rest_duration'),
+    ).order_by('order')
     
     exercises_data = []
     for session_ex in session_exercises:
-        sets = session_ex.logged_sets.all().order_by('set_number')
         exercises_data.append({
             'session_exercise': session_ex,
             'exercise_name': session_ex.get_exercise_name(),
-            'sets': sets,
+            'sets': session_ex.logged_sets.all(),
+            'tonnage': session_ex.tonnage or 0,
+            'top_weight': session_ex.top_weight,
+            'estimated_1rm': round(session_ex.best_1rm, 1) if session_ex.best_1rm else None,
+            'total_rest': session_ex.total_rest or 0,
         })
     
     context = {
@@ -494,44 +705,176 @@ def workout_detail(request, workout_id):
 
 
 @login_required
-def calculate_plates(request):
-    """Calculate plate distribution for a target weight (AJAX endpoint)"""
+def workout_history(request):
+    """Paginated list of all of the user's workouts"""
+    try:
+        filters = history.parse_filters(request.GET)
+    except history.InvalidHistoryQuery as e:
+        messages.error(request, str(e))
+        return redirect('workout_history')
+    
+    workouts, next_cursor = history.workout_page(request.user, filters)
+    
+    # Keep the active filters on the "older" link, swapping in the new cursor
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    
+    context = {
+        'workouts': workouts,
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
+        'filters': request.GET,
+        'plans': WorkoutPlan.objects.filter(user=request.user, is_active=True).only('id', 'name'),
+        'exercises': catalog.active_exercises(),
+    }
+    return render(request, 'tracker/workout_history.html', context)
+
+
+@login_required
+def api_workouts(request):
+    """Workout history as JSON, keyset paginated via ?cursor= (AJAX endpoint)"""
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=400)
     
     try:
-        target_weight = Decimal(request.GET.get('weight', 0))
-        settings = UserSettings.objects.get(user=request.user)
-        bar_weight = settings.default_bar_weight
-        
-        # Calculate weight per side
-        weight_per_side = (target_weight - bar_weight) / 2
-        
-        if weight_per_side < 0:
-            return JsonResponse({
-                'error': 'Target weight is less than bar weight',
-                'plates': []
-            })
+        filters = history.parse_filters(request.GET)
+    except history.InvalidHistoryQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    workouts, next_cursor = history.workout_page(request.user, filters)
+    return JsonResponse({
+        'results': [history.serialize(workout) for workout in workouts],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def exercise_progress(request):
+    """Bucketed progression series for one exercise, downsampled to ?points= (AJAX endpoint)"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=400)
+    
+    try:
+        params = analytics.parse_params(request.GET)
+    except analytics.InvalidAnalyticsQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    series = analytics.progression(
+        request.user,
+        global_exercise_id=params['global_exercise_id'],
+        custom_exercise_id=params['custom_exercise_id'],
+        bucket=params['bucket'],
+        date_from=params['date_from'],
+        date_to=params['date_to'],
+    )
+    points = analytics.lttb(series, params['points'], key=lambda point: point['estimated_1rm'])
+    return JsonResponse({
+        'bucket': params['bucket'],
+        'total_buckets': len(series),
+        'downsampled': len(points) < len(series),
+        'points': points,
+    })
+
+
+@login_required
+def export_training_log(request):
+    """
+    Stream the user's whole training log as a download.
+    ?format=csv|jsonl, ?since=YYYY-MM-DD for incremental exports, ?gzip=1 to compress.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return JsonResponse({'error': f'format must be one of {", ".join(exports.FORMATS)}'}, status=400)
+    
+    try:
+        since = exports.parse_since(request.GET.get('since'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    stream = exports.encode(exports.set_rows(request.user, since=since), fmt)
+    filename = f'ironledger-{request.user.username}.{fmt}'
+    content_type = exports.CONTENT_TYPES[fmt]
+    if request.GET.get('gzip'):
+        stream = exports.gzip_stream(stream)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    
+    if settings.ASYNC_VIEWS:
+        # ASGI would otherwise buffer the whole sync stream before sending it
+        stream = exports.aiter_chunks(stream)
+    
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def import_training_log(request):
+    """Upload a CSV/JSONL training log (same format as the export) and import it"""
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Choose a file to import.')
+            return redirect('import_training_log')
         
-        # Available plate weights (in lbs)
-        available_plates = [45, 35, 25, 10, 5, 2.5]
-        plates_needed = []
-        remaining = float(weight_per_side)
+        name = upload.name[:-3] if upload.name.endswith('.gz') else upload.name
+        fmt = 'jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv'
+        raw = gzip.GzipFile(fileobj=upload.file) if upload.name.endswith('.gz') else upload.file
+        lines = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
         
-        for plate in available_plates:
-            count = int(remaining / plate)
-            if count > 0:
-                plates_needed.append({'weight': plate, 'count': count})
-                remaining -= plate * count
+        importer = imports.Importer(request.user)
+        try:
+            stats = importer.run(imports.read_rows(lines, fmt))
+        except (imports.ImportFailed, UnicodeDecodeError, OSError, csv.Error) as e:
+            messages.error(
+                request,
+                f'Import stopped: {e}. {importer.stats["workouts_created"]} workouts were imported '
+                f'before the error; upload the fixed file again to import the rest.'
+            )
+            return redirect('import_training_log')
         
+        messages.success(
+            request,
+            f'Imported {stats["sets_created"]} sets in {stats["workouts_created"]} workouts'
+            f' ({stats["workouts_skipped"]} already present).'
+        )
+        return redirect('workout_history')
+    
+    return render(request, 'tracker/import_training_log.html')
+
+
+@login_required
+def calculate_plates(request):
+    """
+    Plate loading for a target weight (AJAX endpoint).
+    ?weight= solves one target; ?weights=a,b,c solves a whole warm-up ramp.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=400)
+    
+    try:
+        return _plate_loading(request, *plates.setup_for(request.user))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+def _plate_loading(request, bar_weight, unit, inventory):
+    if request.GET.get('weights'):
+        targets = [Decimal(weight) for weight in request.GET['weights'].split(',')]
         return JsonResponse({
             'success': True,
-            'target_weight': float(target_weight),
+            'unit': unit,
             'bar_weight': float(bar_weight),
-            'weight_per_side': float(weight_per_side),
-            'plates': plates_needed,
-            'remainder': round(remaining, 2)
+            'loadings': plates.solve_many(inventory, bar_weight, targets),
         })
     
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+    target_weight = Decimal(request.GET.get('weight', 0))
+    try:
+        loading = plates.solve(inventory, bar_weight, target_weight)
+    except ValueError as e:
+        return JsonResponse({'error': str(e), 'plates': []})
+    return JsonResponse({'success': True, 'unit': unit, **loading})
+
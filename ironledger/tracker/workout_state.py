@@ -0,0 +1,163 @@
+"""
+Active workout state in a fixed number of queries.
+
+One query loads the workout's exercises with their set counts annotated,
+joined to the workout, its owner's UserSettings and any custom exercise;
+global exercises come from the cached catalog. A second query loads the
+current exercise's sets. Only an empty workout, missing settings, an
+exercise newer than this process's catalog or the first view of an
+exercise (which stamps its started_at) cost one more.
+
+The active workout page renders this state, and /api/workout/<id>/state/
+returns it as JSON so the client can refresh without a full page render.
+"""
+from decimal import Decimal
+
+from django.db.models import Count
+from django.http import Http404
+from django.utils import timezone
+
+from . import catalog
+from .models import GlobalExercise, LoggedSet, LoggedWorkout, SessionExercise, UserSettings
+
+
+def build(user, workout_id):
+    """
+    State for one of `user`'s workouts as a dict. Raises Http404 if the
+    workout doesn't exist or belongs to someone else.
+    """
+    exercises = list(
+        SessionExercise.objects.filter(logged_workout_id=workout_id, logged_workout__user=user)
+        .select_related('logged_workout__user__settings', 'custom_exercise')
+        .annotate(set_count=Count('logged_sets'))
+        .order_by('order')
+    )
+    if not exercises:
+        try:
+            workout = LoggedWorkout.objects.get(id=workout_id, user=user)
+        except LoggedWorkout.DoesNotExist:
+            raise Http404('No workout matches the given query.')
+        return {
+            'workout': workout,
+            'settings': _settings(user),
+            'exercises': [],
+            'current_exercise': None,
+            'exercise_obj': None,
+            'current_sets': [],
+            'completed_exercises': 0,
+            'total_exercises': 0,
+            'all_completed': False,
+        }
+
+    workout = exercises[0].logged_workout
+    missing = []
+    for session_ex in exercises:
+        # Fill the relation from the catalog so get_exercise_name() doesn't query
+        if session_ex.global_exercise_id:
+            global_exercise = catalog.get_exercise(session_ex.global_exercise_id)
+            if global_exercise is None:
+                missing.append(session_ex)
+            else:
+                session_ex.global_exercise = global_exercise
+        session_ex.logged_workout = workout
+    if missing:
+        # This process's catalog predates these exercises (added on another worker)
+        fetched = GlobalExercise.objects.in_bulk({session_ex.global_exercise_id for session_ex in missing})
+        for session_ex in missing:
+            if session_ex.global_exercise_id in fetched:
+                session_ex.global_exercise = fetched[session_ex.global_exercise_id]
+
+    # Current exercise: first one not completed, or the first if all are
+    current_exercise = next((ex for ex in exercises if ex.completed_at is None), None)
+    all_completed = current_exercise is None
+    if all_completed:
+        current_exercise = exercises[0]
+    elif not current_exercise.started_at:
+        # First view of this exercise; rest_before_duration is set when its first set is logged
+        current_exercise.started_at = timezone.now()
+        current_exercise.save(update_fields=['started_at'])
+
+    try:
+        settings = workout.user.settings
+    except UserSettings.DoesNotExist:
+        settings = _settings(user)
+
+    return {
+        'workout': workout,
+        'settings': settings,
+        'exercises': exercises,
+        'current_exercise': current_exercise,
+        'exercise_obj': current_exercise.global_exercise or current_exercise.custom_exercise,
+        'current_sets': list(LoggedSet.objects.filter(session_exercise=current_exercise).order_by('set_number')),
+        'completed_exercises': sum(1 for ex in exercises if ex.completed_at is not None),
+        'total_exercises': len(exercises),
+        'all_completed': all_completed,
+    }
+
+
+def _settings(user):
+    settings, _ = UserSettings.objects.get_or_create(user=user)
+    return settings
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def set_data(logged_set):
+    """JSON-ready fields of one set"""
+    return {
+        'id': logged_set.id,
+        'set_number': logged_set.set_number,
+        'weight': f'{Decimal(logged_set.weight):.2f}',
+        'reps': logged_set.reps,
+        'is_warmup': logged_set.is_warmup,
+        'is_dropset': logged_set.is_dropset,
+        'rest_duration': logged_set.rest_duration,
+        'started_at': _iso(logged_set.started_at),
+        'completed_at': _iso(logged_set.completed_at),
+    }
+
+
+def serialize(state):
+    """JSON-ready form of build()'s state"""
+    workout = state['workout']
+    current = state['current_exercise']
+    exercise_obj = state['exercise_obj']
+    return {
+        'workout': {
+            'id': workout.id,
+            'name': workout.name,
+            'started_at': _iso(workout.started_at),
+            'ended_at': _iso(workout.ended_at),
+        },
+        'settings': {
+            'default_rest_time': state['settings'].default_rest_time,
+            'weight_unit': state['settings'].weight_unit,
+        },
+        'completed_exercises': state['completed_exercises'],
+        'total_exercises': state['total_exercises'],
+        'all_completed': state['all_completed'],
+        'current_exercise': current and {
+            'id': current.id,
+            'name': current.get_exercise_name(),
+            'weight_increment_type': exercise_obj.weight_increment_type if exercise_obj else None,
+            'rest_before_duration': current.rest_before_duration,
+            'started_at': _iso(current.started_at),
+            'sets': [
+                set_data(logged_set)
+                for logged_set in state['current_sets']
+            ],
+        },
+        'exercises': [
+            {
+                'id': session_ex.id,
+                'name': session_ex.get_exercise_name(),
+                'order': session_ex.order,
+                'set_count': session_ex.set_count,
+                'completed_at': _iso(session_ex.completed_at),
+                'is_current': session_ex.id == current.id,
+            }
+            for session_ex in state['exercises']
+        ],
+    }